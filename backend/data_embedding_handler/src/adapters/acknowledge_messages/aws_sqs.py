@@ -0,0 +1,150 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from usecases import AcknowledgeMessagesUseCase
+from typing import ClassVar, Sequence, overload, TypeVar, Iterator, Callable
+from typing_extensions import override
+from mypy_boto3_sqs import SQSClient
+import logging
+
+T = TypeVar("T")
+
+
+class AWSSQSAcknowledgeMessagesClient(AcknowledgeMessagesUseCase):
+    """Delete received messages from an SQS queue by their receipt handles.
+
+    Receipt handles are deleted in `delete_message_batch` calls of at most 10
+    entries, the SQS limit, and the calls are sent concurrently. A receipt
+    handle is only acknowledged if its own entry succeeded.
+    """
+
+    _success_status_codes: ClassVar[tuple[int, ...]] = (200, 202, 204)
+    _client_revoke_timeout: ClassVar[int] = 30 * 60  # 30 minutes
+    _max_delete_batch_size: ClassVar[int] = 10
+
+    def __init__(
+        self,
+        client_creator: Callable[[], SQSClient],
+        queue_url: str,
+        delete_batch_size: int = 10,
+        max_concurrent_batches: int = 10,
+    ) -> None:
+        super().__init__()
+        self._client_creator = client_creator
+        self._queue_url = queue_url
+        self._delete_batch_size = min(delete_batch_size, self._max_delete_batch_size)
+        self._max_concurrent_batches = max_concurrent_batches
+        self._client = self._client_creator()
+        self._last_revoke_time = datetime.now()
+
+    @overload
+    def acknowledge(self, receipt_handle: str) -> bool:
+        ...
+
+    @overload
+    def acknowledge(self, receipt_handle: Sequence[str]) -> list[bool]:
+        ...
+
+    @override
+    def acknowledge(self, receipt_handle: str | Sequence[str]) -> bool | list[bool]:
+        if isinstance(receipt_handle, str):
+            return self._acknowledge_single(receipt_handle)
+        return self._acknowledge_batch(receipt_handle)
+
+    @contextmanager
+    def _get_client(self) -> Iterator[SQSClient]:
+        """Get SQS client and revoke after use"""
+
+        if (
+            datetime.now() - timedelta(seconds=self._client_revoke_timeout)
+        ) > self._last_revoke_time:
+            self._client = self._client_creator()
+            self._last_revoke_time = datetime.now()
+        yield self._client
+
+    def _batch_generator(
+        self, data: Sequence[T], batch_size: int
+    ) -> Iterator[Sequence[T]]:
+        """Separate sequence of data into several batches based on batch sizes"""
+
+        for i in range(0, len(data), batch_size):
+            yield data[i : i + batch_size]
+
+    def _acknowledge_single(self, receipt_handle: str) -> bool:
+        """Delete a single message from SQS"""
+        try:
+            with self._get_client() as client:
+                response = client.delete_message(
+                    QueueUrl=self._queue_url,
+                    ReceiptHandle=receipt_handle,
+                )
+                if (
+                    response["ResponseMetadata"]["HTTPStatusCode"]
+                    not in self._success_status_codes
+                ):
+                    raise Exception(
+                        f"Found error status code {response['ResponseMetadata']['HTTPStatusCode']}!"
+                    )
+                return True
+        except Exception as e:
+            logging.exception(e)
+            logging.error(f"Error deleting message {receipt_handle}!")
+            return False
+
+    def _acknowledge_delete_batch(self, receipt_handles: Sequence[str]) -> list[bool]:
+        """Delete up to 10 messages from SQS with a single delete_message_batch call"""
+        try:
+            with self._get_client() as client:
+                #! Entry ids only have to be unique within the call
+                response = client.delete_message_batch(
+                    QueueUrl=self._queue_url,
+                    Entries=[
+                        {"Id": str(index), "ReceiptHandle": receipt_handle}
+                        for index, receipt_handle in enumerate(receipt_handles)
+                    ],
+                )
+                if (
+                    response["ResponseMetadata"]["HTTPStatusCode"]
+                    not in self._success_status_codes
+                ):
+                    raise Exception(
+                        f"Found error status code {response['ResponseMetadata']['HTTPStatusCode']}!"
+                    )
+
+                successes = [False] * len(receipt_handles)
+                for successful_entry in response.get("Successful", []):
+                    successes[int(successful_entry["Id"])] = True
+                for failed_entry in response.get("Failed", []):
+                    logging.error(
+                        f"Error deleting message {receipt_handles[int(failed_entry['Id'])]}: "
+                        f"{failed_entry['Code']} {failed_entry.get('Message', '')}!"
+                    )
+                return successes
+        except Exception as e:
+            logging.exception(e)
+            logging.error(f"Error deleting messages {','.join(receipt_handles)}!")
+            return [False] * len(receipt_handles)
+
+    def _acknowledge_batch(self, receipt_handles: Sequence[str]) -> list[bool]:
+        """Delete a batch of messages from SQS, sending the delete calls concurrently"""
+
+        successes: list[bool] = []
+        with ThreadPoolExecutor(max_workers=self._max_concurrent_batches) as executor:
+            for delete_batch_successes in executor.map(
+                self._acknowledge_delete_batch,
+                self._batch_generator(receipt_handles, self._delete_batch_size),
+            ):
+                successes.extend(delete_batch_successes)
+        return successes
+
+    @override
+    def close(self) -> bool:
+        try:
+            if self._client is None:
+                return True
+            self._client.close()
+            return True
+        except Exception as e:
+            logging.exception(e)
+            logging.error("Error closing SQS client!")
+            return False
@@ -9,12 +9,15 @@ from typing import ClassVar, Iterator, Optional, overload, Sequence, TypeVar
 from typing_extensions import override
 from typing import Callable
 from mypy_boto3_sagemaker_runtime import SageMakerRuntimeClient
+from mypy_boto3_sagemaker_runtime.type_defs import InvokeEndpointOutputTypeDef
+import numpy as np
 
 T = TypeVar("T")
 
 
 class AWSSageMakerEmbedRawProductDetailsClient(EmbedRawProductDetailsUseCase):
     _client_revoke_timeout: ClassVar[int] = 30 * 60  # 30 minutes
+    _binary_content_type: ClassVar[str] = "application/octet-stream"
 
     def __init__(
         self,
@@ -60,6 +63,35 @@ class AWSSageMakerEmbedRawProductDetailsClient(EmbedRawProductDetailsUseCase):
             self._last_revoke_time = datetime.now()
         yield self._client
 
+    def _invoke_endpoint(
+        self, client: SageMakerRuntimeClient, body: dict
+    ) -> InvokeEndpointOutputTypeDef:
+        """Invoke the endpoint, asking for binary float32 embeddings"""
+
+        return client.invoke_endpoint(
+            EndpointName=self._endpoint_name,
+            Body=json.dumps(body),
+            ContentType="application/json",
+            Accept=f"{self._binary_content_type}, application/json",
+        )
+
+    def _decode_embeddings(
+        self, response: InvokeEndpointOutputTypeDef, num_embeddings: int
+    ) -> list[list[float]]:
+        """Decode the endpoint response into one embedding per input text.
+
+        Binary responses are little-endian float32 rows, anything else is
+        parsed as the JSON response format."""
+
+        body = response["Body"].read()
+        if response.get("ContentType", "").startswith(self._binary_content_type):
+            return np.frombuffer(body, dtype="<f4").reshape(num_embeddings, -1).tolist()
+
+        embeddings: list = json.loads(body.decode("utf-8"))["result"]
+        if embeddings and not isinstance(embeddings[0], list):
+            embeddings = [embeddings]
+        return embeddings
+
     def _batch_generator(
         self, data: Sequence[T], batch_size: int
     ) -> Iterator[Sequence[T]]:
@@ -74,14 +106,12 @@ class AWSSageMakerEmbedRawProductDetailsClient(EmbedRawProductDetailsUseCase):
         """Embed a single RawProductDetails"""
         try:
             with self._get_client() as client:
-                embedding: list[float] = json.loads(
-                    client.invoke_endpoint(
-                        EndpointName=self._endpoint_name,
-                        Body=json.dumps({"text": raw_product_details.name.lower()}),
-                    )["Body"]
-                    .read()
-                    .decode("utf-8")
-                )["result"]
+                embedding: list[float] = self._decode_embeddings(
+                    self._invoke_endpoint(
+                        client, {"text": raw_product_details.name.lower()}
+                    ),
+                    1,
+                )[0]
 
                 return EmbeddedProductDetails(
                     product_id=raw_product_details.product_id,
@@ -94,14 +124,62 @@ class AWSSageMakerEmbedRawProductDetailsClient(EmbedRawProductDetailsUseCase):
             logging.error(f"Error embedding product {raw_product_details.product_id}!")
             return None
 
+    def _embed_chunk(
+        self, raw_product_details: Sequence[RawProductDetails]
+    ) -> list[Optional[EmbeddedProductDetails]]:
+        """Embed a chunk of RawProductDetails with a single endpoint invocation"""
+        try:
+            with self._get_client() as client:
+                embeddings = self._decode_embeddings(
+                    self._invoke_endpoint(
+                        client,
+                        {
+                            "texts": [
+                                raw_product_detail.name.lower()
+                                for raw_product_detail in raw_product_details
+                            ]
+                        },
+                    ),
+                    len(raw_product_details),
+                )
+
+                if len(embeddings) != len(raw_product_details):
+                    raise ValueError(
+                        f"Expected {len(raw_product_details)} embeddings, got {len(embeddings)}!"
+                    )
+
+                created_date = datetime.now()
+                return [
+                    EmbeddedProductDetails(
+                        product_id=raw_product_detail.product_id,
+                        embedding=embedding,
+                        modified_date=raw_product_detail.modified_date,
+                        created_date=created_date,
+                    )
+                    for raw_product_detail, embedding in zip(
+                        raw_product_details, embeddings
+                    )
+                ]
+        except Exception as e:
+            failed_product_ids = [
+                raw_product_detail.product_id
+                for raw_product_detail in raw_product_details
+            ]
+            logging.exception(e)
+            logging.error(f"Error embedding products {failed_product_ids}!")
+            return [None] * len(raw_product_details)
+
     def _embed_batch(
         self, raw_product_details: Sequence[RawProductDetails]
     ) -> list[Optional[EmbeddedProductDetails]]:
         embedded_product_details: list[Optional[EmbeddedProductDetails]] = []
 
-        for batch in self._batch_generator(raw_product_details, self._embed_batch_size):
-            with ThreadPoolExecutor(max_workers=10) as executor:
-                embedded_product_details.extend(executor.map(self._embed_single, batch))
+        with ThreadPoolExecutor(max_workers=10) as executor:
+            for embedded_products_chunk in executor.map(
+                self._embed_chunk,
+                self._batch_generator(raw_product_details, self._embed_batch_size),
+            ):
+                embedded_product_details.extend(embedded_products_chunk)
         return embedded_product_details
 
     @override
@@ -1,12 +1,15 @@
 from datetime import datetime
 from usecases import EmbedRawProductDetailsUseCase
 from entities import RawProductDetails, EmbeddedProductDetails
-from typing import Optional, overload, Sequence
+from typing import Iterator, Optional, overload, Sequence, TypeVar
 from typing_extensions import override
 from onnxruntime import InferenceSession
 from transformers import AutoTokenizer
 import numpy.typing as npt
 import numpy as np
+import logging
+
+T = TypeVar("T")
 
 
 class OnnxEmbedRawProductDetailsClient(EmbedRawProductDetailsUseCase):
@@ -14,10 +17,12 @@ class OnnxEmbedRawProductDetailsClient(EmbedRawProductDetailsUseCase):
         self,
         inference_session: InferenceSession,
         tokenizer: AutoTokenizer,
+        embed_batch_size: int,
     ) -> None:
         super().__init__()
         self._inference_session = inference_session
         self._tokenizer = tokenizer
+        self._embed_batch_size = embed_batch_size
 
     @overload
     def embed(
@@ -37,10 +42,15 @@ class OnnxEmbedRawProductDetailsClient(EmbedRawProductDetailsUseCase):
     ) -> Optional[EmbeddedProductDetails] | list[Optional[EmbeddedProductDetails]]:
         if isinstance(raw_product_details, RawProductDetails):
             return self._embed_single(raw_product_details)
-        return [
-            self._embed_single(raw_product_detail)
-            for raw_product_detail in raw_product_details
-        ]
+        return self._embed_batch(raw_product_details)
+
+    def _batch_generator(
+        self, data: Sequence[T], batch_size: int
+    ) -> Iterator[Sequence[T]]:
+        """Separate sequence of data into several batches based on batch sizes"""
+
+        for i in range(0, len(data), batch_size):
+            yield data[i : i + batch_size]
 
     def _embed_single(
         self, raw_product_details: RawProductDetails
@@ -67,6 +77,68 @@ class OnnxEmbedRawProductDetailsClient(EmbedRawProductDetailsUseCase):
             created_date=datetime.now(),
         )
 
+    def _embed_batch(
+        self, raw_product_details: Sequence[RawProductDetails]
+    ) -> list[Optional[EmbeddedProductDetails]]:
+        """Embed a batch of RawProductDetails, one inference run per chunk.
+
+        Products are sorted by token length before chunking so that each
+        chunk is padded to a similar length, and the embeddings are mapped
+        back to the original order afterwards."""
+
+        embedded_product_details: list[Optional[EmbeddedProductDetails]] = [None] * len(
+            raw_product_details
+        )
+        if len(raw_product_details) == 0:
+            return embedded_product_details
+
+        encodings = self._tokenizer(
+            [
+                raw_product_detail.name.lower()
+                for raw_product_detail in raw_product_details
+            ],
+            truncation=True,
+        )
+        sorted_indices = sorted(
+            range(len(raw_product_details)),
+            key=lambda index: len(encodings["input_ids"][index]),
+        )
+
+        for indices_batch in self._batch_generator(
+            sorted_indices, self._embed_batch_size
+        ):
+            try:
+                tokenized_input: dict[str, npt.NDArray[np.float_]] = dict(
+                    self._tokenizer.pad(
+                        {
+                            key: [values[index] for index in indices_batch]
+                            for key, values in encodings.items()
+                        },
+                        padding=True,
+                        return_tensors="np",
+                    )
+                )
+
+                embeddings: npt.NDArray[np.float_] = self._inference_session.run(
+                    ["output"], tokenized_input
+                )[0]
+
+                created_date = datetime.now()
+                for index, embedding in zip(indices_batch, embeddings):
+                    embedded_product_details[index] = EmbeddedProductDetails(
+                        product_id=raw_product_details[index].product_id,
+                        embedding=embedding.tolist(),
+                        modified_date=raw_product_details[index].modified_date,
+                        created_date=created_date,
+                    )
+            except Exception as e:
+                failed_product_ids = [
+                    raw_product_details[index].product_id for index in indices_batch
+                ]
+                logging.exception(e)
+                logging.error(f"Error embedding products {failed_product_ids}!")
+        return embedded_product_details
+
     @override
     def close(self) -> bool:
         return True
@@ -1,4 +1,5 @@
 from contextlib import contextmanager
+from threading import Lock
 from usecases import FetchRawProductDetailsUseCase
 from entities import RawProductDetails
 import psycopg2
@@ -30,6 +31,8 @@ class PostgresFetchRawProductDetailsClient(FetchRawProductDetailsUseCase):
         self._raw_product_table_name = raw_product_table_name
         self._fetch_batch_size = fetch_batch_size
         self._conn: Optional[connection] = None
+        #! The connection is shared, so concurrent callers take turns using it
+        self._conn_lock = Lock()
 
     @overload
     def fetch(self, product_id: str) -> Optional[RawProductDetails]:
@@ -57,15 +60,16 @@ class PostgresFetchRawProductDetailsClient(FetchRawProductDetailsUseCase):
 
     @contextmanager
     def _get_conn(self) -> Iterator[connection]:
-        if self._conn is None or self._conn.closed:
-            self._conn = psycopg2.connect(
-                database=self._database,
-                user=self._username,
-                password=self._password,
-                host=self._host,
-                port=self._port,
-            )
-        yield self._conn
+        with self._conn_lock:
+            if self._conn is None or self._conn.closed:
+                self._conn = psycopg2.connect(
+                    database=self._database,
+                    user=self._username,
+                    password=self._password,
+                    host=self._host,
+                    port=self._port,
+                )
+            yield self._conn
 
     def _batch_generator(
         self, data: Sequence[T], batch_size: int
@@ -126,13 +130,16 @@ class PostgresFetchRawProductDetailsClient(FetchRawProductDetailsUseCase):
                             table_name=self._raw_product_table_name
                         )
                         cursor.execute(stmt, (list(product_ids_batch),))
-                        result = cursor.fetchall()
+                        #! Rows come back in any order and missing products have
+                        #! no row, so they are mapped back to the requested ids
+                        fetched_raw_product_details = {
+                            row[0]: self._sql_tuple_to_raw_product_details(row)
+                            for row in cursor.fetchall()
+                        }
                         raw_product_details.extend(
                             [
-                                self._sql_tuple_to_raw_product_details(row)
-                                if row is not None
-                                else None
-                                for row in result
+                                fetched_raw_product_details.get(product_id)
+                                for product_id in product_ids_batch
                             ]
                         )
                     except Exception as e:
@@ -1,3 +1,4 @@
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from usecases import UpsertEmbeddedProductDetailsUseCase
 from entities import EmbeddedProductDetails
@@ -25,6 +26,7 @@ class OpenSearchUpsertEmbeddedProductDetailsClient(UpsertEmbeddedProductDetailsU
         master_auth: AWSV4SignerAuth | tuple[str, str],
         upsert_batch_size: int,
         timeout: Optional[int] = None,
+        max_concurrent_batches: int = 1,
     ) -> None:
         super().__init__()
         self._client = OpenSearch(
@@ -40,6 +42,7 @@ class OpenSearchUpsertEmbeddedProductDetailsClient(UpsertEmbeddedProductDetailsU
         )
         self._index_name = index_name
         self._upsert_batch_size = upsert_batch_size
+        self._max_concurrent_batches = max_concurrent_batches
 
     @overload
     def upsert(self, embedded_product_details: EmbeddedProductDetails) -> bool:
@@ -124,83 +127,101 @@ class OpenSearchUpsertEmbeddedProductDetailsClient(UpsertEmbeddedProductDetailsU
             )
             return False
 
-    def _upsert_batch(
-        self, embedded_product_details: Sequence[EmbeddedProductDetails]
+    def _upsert_bulk(
+        self, embedded_products_batch: Sequence[EmbeddedProductDetails]
     ) -> list[bool]:
-        """Upsert a batch of embedded product details to OpenSearch. Ignore Conflict Error"""
+        """Upsert one batch of embedded product details with a single bulk request"""
 
-        successes: list[bool] = []
-        for embedded_products_batch in self._batch_generator(
-            embedded_product_details, self._upsert_batch_size
-        ):
-            try:
-                batch_successes_map: dict[str, bool] = {
-                    embedded_product_details.product_id: True
+        try:
+            batch_successes_map: dict[str, bool] = {
+                embedded_product_details.product_id: True
+                for embedded_product_details in embedded_products_batch
+            }
+
+            bulk_index_result = opensearch_helpers.bulk(
+                self._client,
+                [
+                    {
+                        "_op_type": "index",
+                        "_index": self._index_name,
+                        "_id": embedded_product_details.product_id,
+                        #! We can make use of the microsecond timestamp of the modified
+                        #! date of the product details as the version of the document,
+                        #! OpenSearch, check: https://opensearch.org/docs/latest/api-reference/document-apis/index-document/
+                        #! so we can avoid the error of race conditions when upserting in
+                        "_version": self._get_product_details_modified_micro_timestamp(
+                            embedded_product_details
+                        ),
+                        "_version_type": "external_gte",
+                        "_source": self._serialize_embedded_product_details(
+                            embedded_product_details
+                        ),
+                    }
                     for embedded_product_details in embedded_products_batch
-                }
-
-                bulk_index_result = opensearch_helpers.bulk(
-                    self._client,
-                    [
-                        {
-                            "_op_type": "index",
-                            "_index": self._index_name,
-                            "_id": embedded_product_details.product_id,
-                            #! We can make use of the microsecond timestamp of the modified
-                            #! date of the product details as the version of the document,
-                            #! OpenSearch, check: https://opensearch.org/docs/latest/api-reference/document-apis/index-document/
-                            #! so we can avoid the error of race conditions when upserting in
-                            "_version": self._get_product_details_modified_micro_timestamp(
-                                embedded_product_details
-                            ),
-                            "_version_type": "external_gte",
-                            "_source": self._serialize_embedded_product_details(
-                                embedded_product_details
-                            ),
-                        }
-                        for embedded_product_details in embedded_products_batch
-                    ],
-                    raise_on_error=False,
-                )
-                failed_product_ids: list[str] = []
-
-                for index_error in bulk_index_result[1]:
-                    error_id = index_error["index"]["_id"]
-                    error_status = index_error["index"]["status"]
-                    error_type = index_error["index"]["error"]["type"]
-                    error_reason = index_error["index"]["error"]["reason"]
-                    error_msg = f"{error_type} {error_reason}"
-                    if error_status in self._allowed_error_codes:
-                        logging.info(
-                            f"Newer version of document {embedded_product_details.product_id} already exists!"
-                        )
-                    else:
-                        logging.error(error_msg)
-                        batch_successes_map[error_id] = False
-                        failed_product_ids.append(error_id)
-
-                successes.extend(
-                    [
-                        batch_successes_map[embedded_product_details.product_id]
-                        for embedded_product_details in embedded_products_batch
-                    ]
-                )
-
-                if failed_product_ids:
-                    logging.error(
-                        f"Failed to upsert products {failed_product_ids} to opensearch"
+                ],
+                raise_on_error=False,
+            )
+            failed_product_ids: list[str] = []
+
+            for index_error in bulk_index_result[1]:
+                error_id = index_error["index"]["_id"]
+                error_status = index_error["index"]["status"]
+                error_type = index_error["index"]["error"]["type"]
+                error_reason = index_error["index"]["error"]["reason"]
+                error_msg = f"{error_type} {error_reason}"
+                if error_status in self._allowed_error_codes:
+                    logging.info(
+                        f"Newer version of document {error_id} already exists!"
                     )
+                else:
+                    logging.error(error_msg)
+                    batch_successes_map[error_id] = False
+                    failed_product_ids.append(error_id)
 
-            except Exception as e:
-                failed_product_ids = [
-                    embedded_product_details.product_id
-                    for embedded_product_details in embedded_products_batch
-                ]
-                logging.exception(e)
+            if failed_product_ids:
                 logging.error(
-                    f"Failed to upsert jobs {failed_product_ids} to opensearch"
+                    f"Failed to upsert products {failed_product_ids} to opensearch"
                 )
-                successes.extend([False] * (len(embedded_products_batch)))
+
+            return [
+                batch_successes_map[embedded_product_details.product_id]
+                for embedded_product_details in embedded_products_batch
+            ]
+
+        except Exception as e:
+            failed_product_ids = [
+                embedded_product_details.product_id
+                for embedded_product_details in embedded_products_batch
+            ]
+            logging.exception(e)
+            logging.error(f"Failed to upsert jobs {failed_product_ids} to opensearch")
+            return [False] * (len(embedded_products_batch))
+
+    def _upsert_batch(
+        self, embedded_product_details: Sequence[EmbeddedProductDetails]
+    ) -> list[bool]:
+        """Upsert a batch of embedded product details to OpenSearch. Ignore Conflict Error"""
+
+        embedded_products_batches = list(
+            self._batch_generator(embedded_product_details, self._upsert_batch_size)
+        )
+        successes: list[bool] = []
+        if self._max_concurrent_batches <= 1 or len(embedded_products_batches) <= 1:
+            for embedded_products_batch in embedded_products_batches:
+                successes.extend(self._upsert_bulk(embedded_products_batch))
+            return successes
+
+        #! Bulk requests of different batches are independent, the client is
+        #! thread-safe and executor.map keeps the batches in order
+        with ThreadPoolExecutor(
+            max_workers=min(
+                self._max_concurrent_batches, len(embedded_products_batches)
+            )
+        ) as executor:
+            for batch_successes in executor.map(
+                self._upsert_bulk, embedded_products_batches
+            ):
+                successes.extend(batch_successes)
         return successes
 
     @override
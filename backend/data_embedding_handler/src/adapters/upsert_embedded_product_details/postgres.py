@@ -1,14 +1,23 @@
 from contextlib import contextmanager
+from threading import Lock
+from datetime import datetime, timezone
 from usecases import UpsertEmbeddedProductDetailsUseCase
 from entities import EmbeddedProductDetails
 import psycopg2
 from psycopg2.extensions import connection
 from typing import Optional, Sequence, overload, TypeVar, Iterator
 from typing_extensions import override
+import io
 import logging
+import struct
 
 T = TypeVar("T")
 
+#! Binary COPY header: signature, flags and header extension length
+_COPY_BINARY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack(">ii", 0, 0)
+_COPY_BINARY_TRAILER = struct.pack(">h", -1)
+_POSTGRES_EPOCH = datetime(2000, 1, 1)
+
 
 class PostgresUpsertEmbeddedProductDetailsClient(UpsertEmbeddedProductDetailsUseCase):
     def __init__(
@@ -20,6 +29,7 @@ class PostgresUpsertEmbeddedProductDetailsClient(UpsertEmbeddedProductDetailsUse
         database: str,
         embedded_product_table_name: str,
         upsert_batch_size: int,
+        use_copy: bool = True,
     ) -> None:
         super().__init__()
         self._host = host
@@ -29,7 +39,10 @@ class PostgresUpsertEmbeddedProductDetailsClient(UpsertEmbeddedProductDetailsUse
         self._database = database
         self._embedded_product_table_name = embedded_product_table_name
         self._upsert_batch_size = upsert_batch_size
+        self._use_copy = use_copy
         self._conn: Optional[connection] = None
+        #! The connection is shared, so concurrent callers take turns using it
+        self._conn_lock = Lock()
 
     @overload
     def upsert(self, embedded_product_details: EmbeddedProductDetails) -> bool:
@@ -62,17 +75,61 @@ class PostgresUpsertEmbeddedProductDetailsClient(UpsertEmbeddedProductDetailsUse
             embedded_product_details.created_date,
         )
 
+    def _timestamp_to_copy_binary(self, timestamp: datetime) -> bytes:
+        """Serialize a datetime to the binary format of a TIMESTAMP column,
+        microseconds since 2000-01-01"""
+
+        if timestamp.tzinfo is not None:
+            timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+        delta = timestamp - _POSTGRES_EPOCH
+        return struct.pack(
+            ">q",
+            (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds,
+        )
+
+    def _embedded_product_details_to_copy_binary(
+        self, embedded_product_details: EmbeddedProductDetails
+    ) -> bytes:
+        """Serialize EmbeddedProductDetails to a binary COPY tuple"""
+
+        product_id = embedded_product_details.product_id.encode("utf-8")
+        dimension = len(embedded_product_details.embedding)
+        #! pgvector's binary format: int16 dimension, int16 unused, float32 values
+        embedding = struct.pack(
+            f">hh{dimension}f", dimension, 0, *embedded_product_details.embedding
+        )
+        modified_date = self._timestamp_to_copy_binary(
+            embedded_product_details.modified_date
+        )
+        created_date = self._timestamp_to_copy_binary(
+            embedded_product_details.created_date
+        )
+        return b"".join(
+            [
+                struct.pack(">h", 4),
+                struct.pack(">i", len(product_id)),
+                product_id,
+                struct.pack(">i", len(embedding)),
+                embedding,
+                struct.pack(">i", len(modified_date)),
+                modified_date,
+                struct.pack(">i", len(created_date)),
+                created_date,
+            ]
+        )
+
     @contextmanager
     def _get_conn(self) -> Iterator[connection]:
-        if self._conn is None or self._conn.closed:
-            self._conn = psycopg2.connect(
-                database=self._database,
-                user=self._username,
-                password=self._password,
-                host=self._host,
-                port=self._port,
-            )
-        yield self._conn
+        with self._conn_lock:
+            if self._conn is None or self._conn.closed:
+                self._conn = psycopg2.connect(
+                    database=self._database,
+                    user=self._username,
+                    password=self._password,
+                    host=self._host,
+                    port=self._port,
+                )
+            yield self._conn
 
     def _batch_generator(
         self, data: Sequence[T], batch_size: int
@@ -123,11 +180,110 @@ class PostgresUpsertEmbeddedProductDetailsClient(UpsertEmbeddedProductDetailsUse
             logging.error("Error getting Postgres connection!")
             return False
 
+    def _upsert_batch_copy(
+        self, embedded_products_batch: Sequence[EmbeddedProductDetails]
+    ) -> list[bool]:
+        """Stream a batch into a staging table with binary COPY and merge it with a
+        single INSERT ... SELECT. The batch succeeds or fails as a whole."""
+        try:
+            with self._get_conn() as conn, conn.cursor() as cur:
+                try:
+                    staging_table_name = f"{self._embedded_product_table_name}_staging"
+                    #! The temp table lives as long as the connection, and is
+                    #! emptied by every commit
+                    cur.execute(
+                        """
+                        CREATE TEMP TABLE IF NOT EXISTS {staging_table_name}
+                            (LIKE {table_name} INCLUDING DEFAULTS)
+                            ON COMMIT DELETE ROWS
+                        """.format(
+                            staging_table_name=staging_table_name,
+                            table_name=self._embedded_product_table_name,
+                        )
+                    )
+                    cur.copy_expert(
+                        """
+                        COPY {staging_table_name} (
+                            product_id,
+                            embedding,
+                            modified_date,
+                            created_date
+                        ) FROM STDIN (FORMAT binary)
+                        """.format(
+                            staging_table_name=staging_table_name
+                        ),
+                        io.BytesIO(
+                            b"".join(
+                                [
+                                    _COPY_BINARY_HEADER,
+                                    *(
+                                        self._embedded_product_details_to_copy_binary(
+                                            embedded_product_detail
+                                        )
+                                        for embedded_product_detail in embedded_products_batch
+                                    ),
+                                    _COPY_BINARY_TRAILER,
+                                ]
+                            )
+                        ),
+                    )
+
+                    #! ON CONFLICT cannot update the same row twice in one statement,
+                    #! so only the latest version of a duplicated product is merged
+                    stmt = """
+                        INSERT INTO {table_name} (
+                            product_id,
+                            embedding,
+                            modified_date,
+                            created_date
+                        ) SELECT DISTINCT ON (product_id)
+                            product_id,
+                            embedding,
+                            modified_date,
+                            created_date
+                        FROM {staging_table_name}
+                            ORDER BY product_id, modified_date DESC
+                        ON CONFLICT (product_id) DO UPDATE SET
+                            embedding = EXCLUDED.embedding,
+                            modified_date = EXCLUDED.modified_date,
+                            created_date = EXCLUDED.created_date
+                        WHERE EXCLUDED.modified_date > {table_name}.modified_date
+                    """.format(
+                        table_name=self._embedded_product_table_name,
+                        staging_table_name=staging_table_name,
+                    )
+                    cur.execute(stmt)
+                    conn.commit()
+                    return [True] * len(embedded_products_batch)
+                except Exception as e:
+                    failed_product_ids = [
+                        embedded_product_detail.product_id
+                        for embedded_product_detail in embedded_products_batch
+                    ]
+                    logging.exception(e)
+                    logging.error(
+                        f"Error upserting embedded product details {','.join(failed_product_ids)}!"
+                    )
+                    conn.rollback()
+                    return [False] * len(embedded_products_batch)
+        except Exception as e:
+            logging.exception(e)
+            logging.error("Error getting Postgres connection!")
+            return [False] * len(embedded_products_batch)
+
     def _upsert_batch(
         self, embedded_product_details: Sequence[EmbeddedProductDetails]
     ) -> list[bool]:
         """Upsert a batch of embedded products to Postgres."""
-        successes: list[bool] = []
+        if self._use_copy:
+            successes: list[bool] = []
+            for embedded_products_batch in self._batch_generator(
+                embedded_product_details, self._upsert_batch_size
+            ):
+                successes.extend(self._upsert_batch_copy(embedded_products_batch))
+            return successes
+
+        successes = []
         for embedded_products_batch in self._batch_generator(
             embedded_product_details, self._upsert_batch_size
         ):
@@ -1,6 +1,9 @@
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Optional, cast
+from typing import Optional, Sequence, cast
+from entities import EmbeddedProductDetails, RawProductDetails
 from usecases import (
+    AcknowledgeMessagesUseCase,
     FetchRawProductDetailsUseCase,
     UpsertEmbeddedProductDetailsUseCase,
     EmbedRawProductDetailsUseCase,
@@ -19,6 +22,7 @@ from adapters.upsert_embedded_product_details.postgres import (
 from adapters.upsert_embedded_product_details.opensearch import (
     OpenSearchUpsertEmbeddedProductDetailsClient,
 )
+from adapters.acknowledge_messages.aws_sqs import AWSSQSAcknowledgeMessagesClient
 from onnxruntime import InferenceSession
 from transformers import AutoTokenizer
 from .config import (
@@ -28,7 +32,9 @@ from .config import (
     OpenSearchConfig,
     ProjectConfig,
     AWSSQSConfig,
+    PipelineConfig,
 )
+from .pipeline import PipelineChunk, run_pipeline
 import boto3
 import json
 from aws_lambda_powertools.logging import Logger, utils as log_utils
@@ -49,7 +55,11 @@ postgres_upsert_embedded_product_details_client: Optional[
 opensearch_upsert_embedded_product_details_client: Optional[
     UpsertEmbeddedProductDetailsUseCase
 ] = None
-sqs_client = boto3.client("sqs")
+acknowledge_messages_client: Optional[AcknowledgeMessagesUseCase] = None
+#! Postgres and OpenSearch are independent sinks, so they are written concurrently
+sink_upsert_executor = ThreadPoolExecutor(
+    max_workers=2 * max(PipelineConfig.UPSERT_CONCURRENCY, 1)
+)
 
 
 def get_secrets_manager_secrets(secret_name: str) -> dict[str, str]:
@@ -74,6 +84,7 @@ def init_embed_raw_product_details_client() -> None:
     # embed_raw_product_details_client = OnnxEmbedRawProductDetailsClient(
     #     inference_session=inference_session,
     #     tokenizer=tokenizer,
+    #     embed_batch_size=OnnxEmbedConfig.EMBED_BATCH_SIZE,
     # )
 
     embed_raw_product_details_client = AWSSageMakerEmbedRawProductDetailsClient(
@@ -147,10 +158,48 @@ def init_opensearch_upsert_embedded_product_details_client() -> None:
             ),
             upsert_batch_size=OpenSearchConfig.UPSERT_BATCH_SIZE,
             timeout=OpenSearchConfig.TIMEOUT,
+            max_concurrent_batches=OpenSearchConfig.UPSERT_MAX_CONCURRENT_BATCHES,
         )
     )
 
 
+def init_acknowledge_messages_client() -> None:
+    global acknowledge_messages_client
+
+    if acknowledge_messages_client is not None:
+        return
+
+    acknowledge_messages_client = AWSSQSAcknowledgeMessagesClient(
+        client_creator=lambda: boto3.client("sqs"),
+        queue_url=AWSSQSConfig.SUBSCRIBED_QUEUE_URL,
+        delete_batch_size=AWSSQSConfig.DELETE_BATCH_SIZE,
+        max_concurrent_batches=AWSSQSConfig.DELETE_MAX_CONCURRENT_BATCHES,
+    )
+
+
+def upsert_embedded_products_to_sinks(
+    embedded_product_details: Sequence[EmbeddedProductDetails],
+) -> tuple[list[bool], list[bool]]:
+    """Upsert embedded product details to Postgres and OpenSearch concurrently,
+    returning the results of each sink"""
+
+    postgres_upsert_future = sink_upsert_executor.submit(
+        cast(
+            UpsertEmbeddedProductDetailsUseCase,
+            postgres_upsert_embedded_product_details_client,
+        ).upsert,
+        embedded_product_details,
+    )
+    opensearch_upsert_future = sink_upsert_executor.submit(
+        cast(
+            UpsertEmbeddedProductDetailsUseCase,
+            opensearch_upsert_embedded_product_details_client,
+        ).upsert,
+        embedded_product_details,
+    )
+    return postgres_upsert_future.result(), opensearch_upsert_future.result()
+
+
 def pipeline_embed_product(product_id: str, product_modified_date: datetime) -> bool:
     """Pipeline for fetching, embeding, and upserting a single product details"""
 
@@ -174,15 +223,12 @@ def pipeline_embed_product(product_id: str, product_modified_date: datetime) ->
         logger.error(f"Failed to embed raw product details for product {product_id}!")
         return False
 
-    postgres_upsert_result = cast(
-        UpsertEmbeddedProductDetailsUseCase,
-        postgres_upsert_embedded_product_details_client,
-    ).upsert(embedded_product_details=embedded_product_details)
-
-    opensearch_upsert_result = cast(
-        UpsertEmbeddedProductDetailsUseCase,
-        opensearch_upsert_embedded_product_details_client,
-    ).upsert(embedded_product_details=embedded_product_details)
+    (
+        postgres_upsert_results,
+        opensearch_upsert_results,
+    ) = upsert_embedded_products_to_sinks([embedded_product_details])
+    postgres_upsert_result = postgres_upsert_results[0]
+    opensearch_upsert_result = opensearch_upsert_results[0]
 
     if not postgres_upsert_result or not opensearch_upsert_result:
         logger.error(
@@ -197,218 +243,290 @@ def pipeline_embed_product(product_id: str, product_modified_date: datetime) ->
     return True
 
 
-def pipeline_embed_products(
-    product_id_modified_date_pairs: list[tuple[str, datetime]]
-) -> list[bool]:
-    """Pipeline for fetching, embeding, and upserting a batch of product details"""
-
-    successes: list[bool] = [True] * len(product_id_modified_date_pairs)
-
-    product_ids: list[str]
-    product_modified_dates: list[datetime]
-    product_ids, product_modified_dates = zip(*product_id_modified_date_pairs)
-
-    # Fetch raw product details
+def fetch_products_stage(
+    chunk: PipelineChunk[tuple[str, datetime]]
+) -> PipelineChunk[RawProductDetails]:
+    """Fetch the raw product details of a chunk, keeping the up to date ones"""
 
     raw_products_details = cast(
         FetchRawProductDetailsUseCase, fetch_raw_product_details_client
-    ).fetch(product_ids)
-
-    valid_raw_products_details = [
-        raw_product_details
-        for raw_product_details, modified_date in zip(
-            raw_products_details, product_modified_dates
-        )
+    ).fetch([product_id for product_id, _ in chunk.items])
+
+    valid_indices: list[int] = []
+    valid_raw_products_details: list[RawProductDetails] = []
+    invalid_raw_products_ids: list[str] = []
+    for index, (product_id, modified_date), raw_product_details in zip(
+        chunk.indices, chunk.items, raw_products_details
+    ):
         if (
-            raw_product_details is not None
-            and raw_product_details.modified_date <= modified_date
-        )
-    ]
+            raw_product_details is None
+            or raw_product_details.modified_date > modified_date
+        ):
+            invalid_raw_products_ids.append(product_id)
+            continue
+        valid_indices.append(index)
+        valid_raw_products_details.append(raw_product_details)
 
-    valid_raw_products_details_indices = [
-        index
-        for index, raw_product_details in enumerate(raw_products_details)
-        if (
-            raw_product_details is not None
-            and raw_product_details.modified_date <= product_modified_dates[index]
+    if invalid_raw_products_ids:
+        logger.error(
+            f"Failed to fetch raw product details for products {invalid_raw_products_ids}!"
         )
-    ]
 
-    invalid_raw_products_details_indices = [
-        index
-        for index, raw_product_details in enumerate(raw_products_details)
-        if (
-            raw_product_details is None
-            or raw_product_details.modified_date > product_modified_dates[index]
-        )
-    ]
+    return PipelineChunk(indices=valid_indices, items=valid_raw_products_details)
 
-    for invalid_raw_products_details_index in invalid_raw_products_details_indices:
-        successes[invalid_raw_products_details_index] = False
 
-    # Embed raw product details
+def embed_products_stage(
+    chunk: PipelineChunk[RawProductDetails],
+) -> PipelineChunk[EmbeddedProductDetails]:
+    """Embed the raw product details of a chunk"""
 
     embedded_raw_products_details = cast(
         EmbedRawProductDetailsUseCase, embed_raw_product_details_client
-    ).embed(raw_product_details=valid_raw_products_details)
+    ).embed(raw_product_details=chunk.items)
+
+    valid_indices: list[int] = []
+    valid_embedded_raw_products_details: list[EmbeddedProductDetails] = []
+    failed_embed_raw_products_ids: list[str] = []
+    for index, raw_product_details, embedded_raw_product_details in zip(
+        chunk.indices, chunk.items, embedded_raw_products_details
+    ):
+        if embedded_raw_product_details is None:
+            failed_embed_raw_products_ids.append(raw_product_details.product_id)
+            continue
+        valid_indices.append(index)
+        valid_embedded_raw_products_details.append(embedded_raw_product_details)
 
-    valid_embedded_raw_products_details = [
-        embedded_raw_product_details
-        for embedded_raw_product_details, modified_date in zip(
-            embedded_raw_products_details, product_modified_dates
+    if failed_embed_raw_products_ids:
+        logger.error(
+            f"Failed to embed raw product details for products {failed_embed_raw_products_ids}!"
         )
-        if embedded_raw_product_details is not None
-    ]
 
-    valid_embedded_raw_products_details_indices = [
-        index
-        for index, embedded_raw_product_details in zip(
-            valid_raw_products_details_indices, embedded_raw_products_details
-        )
-        if embedded_raw_product_details is not None
-    ]
+    return PipelineChunk(
+        indices=valid_indices, items=valid_embedded_raw_products_details
+    )
 
-    invalid_embedded_raw_products_details_indices = [
-        index
-        for index, embedded_raw_product_details in enumerate(
-            embedded_raw_products_details
-        )
-        if embedded_raw_product_details is None
-    ]
 
+def upsert_products_stage(
+    chunk: PipelineChunk[EmbeddedProductDetails],
+) -> PipelineChunk[EmbeddedProductDetails]:
+    """Upsert the embedded product details of a chunk to Postgres and OpenSearch"""
+
+    (
+        postgres_upsert_results,
+        opensearch_upsert_results,
+    ) = upsert_embedded_products_to_sinks(chunk.items)
+
+    valid_indices: list[int] = []
+    valid_embedded_products_details: list[EmbeddedProductDetails] = []
+    upsert_failed_products_ids: list[str] = []
     for (
-        invalid_embedded_raw_products_details_index
-    ) in invalid_embedded_raw_products_details_indices:
-        successes[invalid_embedded_raw_products_details_index] = False
-
-    # Upsert embedded product details to Postgres and OpenSearch
-
-    postgres_upsert_results = cast(
-        UpsertEmbeddedProductDetailsUseCase,
-        postgres_upsert_embedded_product_details_client,
-    ).upsert(embedded_product_details=valid_embedded_raw_products_details)
-
-    opensearch_upsert_results = cast(
-        UpsertEmbeddedProductDetailsUseCase,
-        opensearch_upsert_embedded_product_details_client,
-    ).upsert(embedded_product_details=valid_embedded_raw_products_details)
-
-    overall_upsert_results = [
-        postgres_upsert_result and opensearch_upsert_result
-        for postgres_upsert_result, opensearch_upsert_result in zip(
-            postgres_upsert_results, opensearch_upsert_results
+        index,
+        embedded_product_details,
+        postgres_upsert_result,
+        opensearch_upsert_result,
+    ) in zip(
+        chunk.indices, chunk.items, postgres_upsert_results, opensearch_upsert_results
+    ):
+        if not postgres_upsert_result or not opensearch_upsert_result:
+            upsert_failed_products_ids.append(embedded_product_details.product_id)
+            continue
+        valid_indices.append(index)
+        valid_embedded_products_details.append(embedded_product_details)
+
+    if upsert_failed_products_ids:
+        logger.error(
+            f"Failed to upsert embedded product details for products {upsert_failed_products_ids}!"
         )
-    ]
 
-    upsert_invalid_embedded_products_details_indices = [
-        index
-        for index, overall_upsert_result in zip(
-            valid_embedded_raw_products_details_indices, overall_upsert_results
+    return PipelineChunk(indices=valid_indices, items=valid_embedded_products_details)
+
+
+def stream_embed_products(
+    product_id_modified_date_pairs: list[tuple[str, datetime]]
+) -> list[bool]:
+    """Split the batch into chunks which flow through the fetch, embed and
+    upsert stages independently, so the stages work on different chunks at
+    the same time."""
+
+    successes: list[bool] = [False] * len(product_id_modified_date_pairs)
+
+    def upsert_products_and_mark_succeeded(
+        chunk: PipelineChunk[EmbeddedProductDetails],
+    ) -> None:
+        #! Products only succeed once they have made it through every stage
+        for index in upsert_products_stage(chunk).indices:
+            successes[index] = True
+
+    def log_failed_chunk(chunk: PipelineChunk) -> None:
+        failed_products_ids = [
+            product_id_modified_date_pairs[index][0] for index in chunk.indices
+        ]
+        logger.error(f"Failed to embed products {failed_products_ids}!")
+
+    chunk_size = PipelineConfig.CHUNK_SIZE
+    chunks = (
+        PipelineChunk(
+            indices=list(
+                range(
+                    start, min(start + chunk_size, len(product_id_modified_date_pairs))
+                )
+            ),
+            items=product_id_modified_date_pairs[start : start + chunk_size],
         )
-        if not overall_upsert_result
-    ]
+        for start in range(0, len(product_id_modified_date_pairs), chunk_size)
+    )
 
-    for (
-        upsert_invalid_embedded_products_details_index
-    ) in upsert_invalid_embedded_products_details_indices:
-        successes[upsert_invalid_embedded_products_details_index] = False
+    run_pipeline(
+        chunks=chunks,
+        stages=[
+            (fetch_products_stage, PipelineConfig.FETCH_CONCURRENCY),
+            (embed_products_stage, PipelineConfig.EMBED_CONCURRENCY),
+            (upsert_products_and_mark_succeeded, PipelineConfig.UPSERT_CONCURRENCY),
+        ],
+        queue_size=PipelineConfig.QUEUE_SIZE,
+        on_failure=log_failed_chunk,
+    )
 
-    # Clean up
+    return successes
 
-    invalid_raw_products_ids = [
-        product_ids[index] for index in invalid_raw_products_details_indices
-    ]
 
-    failed_embed_raw_products_ids = [
-        product_ids[index] for index in invalid_embedded_raw_products_details_indices
+def pipeline_embed_products(
+    product_id_modified_date_pairs: list[tuple[str, datetime]]
+) -> list[bool]:
+    """Pipeline for fetching, embeding, and upserting a batch of product details.
+
+    Messages for the same product are collapsed into one unit of work at
+    their latest modified_date, and its result is shared by all of them."""
+
+    latest_modified_dates: dict[str, datetime] = {}
+    for product_id, modified_date in product_id_modified_date_pairs:
+        latest_modified_date = latest_modified_dates.get(product_id)
+        if latest_modified_date is None or modified_date > latest_modified_date:
+            latest_modified_dates[product_id] = modified_date
+
+    num_duplicates = len(product_id_modified_date_pairs) - len(latest_modified_dates)
+    if num_duplicates > 0:
+        logger.info(f"Skipping {num_duplicates} duplicated product messages!")
+
+    #! Embedding the latest version also covers every older message of a product
+    product_successes = dict(
+        zip(
+            latest_modified_dates,
+            stream_embed_products(list(latest_modified_dates.items())),
+        )
+    )
+
+    return [
+        product_successes[product_id]
+        for product_id, _ in product_id_modified_date_pairs
     ]
 
-    upsert_failed_products_ids = [
-        product_ids[index] for index in upsert_invalid_embedded_products_details_indices
+
+def acknowledge_succeeded_messages(
+    event: SQSEvent, failed_message_ids: set[str]
+) -> None:
+    """Delete the messages of the batch that did not fail from the queue"""
+
+    succeeded_event_records = [
+        event_record
+        for event_record in event.records
+        if event_record.message_id not in failed_message_ids
     ]
+    if not succeeded_event_records:
+        return
 
-    if invalid_raw_products_ids:
-        logger.error(
-            f"Failed to fetch raw product details for products {invalid_raw_products_ids}!"
-        )
+    acknowledge_results = cast(
+        AcknowledgeMessagesUseCase, acknowledge_messages_client
+    ).acknowledge(
+        [event_record.receipt_handle for event_record in succeeded_event_records]
+    )
 
-    if failed_embed_raw_products_ids:
-        logger.error(
-            f"Failed to embed raw product details for products {failed_embed_raw_products_ids}!"
+    failed_acknowledge_message_ids = [
+        event_record.message_id
+        for event_record, acknowledge_result in zip(
+            succeeded_event_records, acknowledge_results
         )
-
-    if upsert_failed_products_ids:
+        if not acknowledge_result
+    ]
+    if failed_acknowledge_message_ids:
         logger.error(
-            f"Failed to upsert embedded product details for products {upsert_failed_products_ids}!"
+            f"Failed to delete embedded messages {failed_acknowledge_message_ids}!"
         )
 
-    return successes
-
 
 @logger.inject_lambda_context(log_event=ProjectConfig.LOG_SOURCE_EVENT)
 @event_source(data_class=SQSEvent)
-def handler(event: SQSEvent, context: LambdaContext) -> None:
+def handler(event: SQSEvent, context: LambdaContext) -> dict[str, list[dict[str, str]]]:
+    """Embed the products of an SQS batch and report the failed messages.
+
+    Only the messages listed in `batchItemFailures` are made visible again by
+    SQS, the rest of the batch is deleted by Lambda once the handler returns.
+    Without partial batch responses, the succeeded messages are deleted here
+    and the invocation fails if any message failed.
+    """
+
     init_embed_raw_product_details_client()
     init_fetch_raw_product_details_client()
     init_postgres_upsert_embedded_product_details_client()
     init_opensearch_upsert_embedded_product_details_client()
+    if not AWSSQSConfig.REPORT_BATCH_ITEM_FAILURES:
+        init_acknowledge_messages_client()
 
     try:
-        message_receipts = [
-            event_record.receipt_handle for event_record in event.records
-        ]
-
-        product_id_modified_date_pairs = [
-            (
-                event_record.json_body["product_id"],
-                datetime.strptime(
-                    event_record.json_body["modified_date"], "%Y-%m-%d %H:%M:%S.%f"
-                ),
-            )
-            for event_record in event.records
-        ]
-
+        failed_message_ids: list[str] = []
+        message_ids: list[str] = []
+        product_id_modified_date_pairs: list[tuple[str, datetime]] = []
+        for event_record in event.records:
+            try:
+                product_id_modified_date_pair = (
+                    event_record.json_body["product_id"],
+                    datetime.strptime(
+                        event_record.json_body["modified_date"],
+                        "%Y-%m-%d %H:%M:%S.%f",
+                    ),
+                )
+            except Exception as e:
+                logger.exception(e)
+                logger.error(f"Failed to parse message {event_record.message_id}!")
+                failed_message_ids.append(event_record.message_id)
+                continue
+            message_ids.append(event_record.message_id)
+            product_id_modified_date_pairs.append(product_id_modified_date_pair)
+
+        successes: list[bool]
         if len(product_id_modified_date_pairs) == 1:
             product_id, product_modified_date = product_id_modified_date_pairs[0]
-
-            success = pipeline_embed_product(
-                product_id=product_id, product_modified_date=product_modified_date
-            )
-
-            if success:
-                sqs_client.delete_message(
-                    QueueUrl=AWSSQSConfig.SUBSCRIBED_QUEUE_URL,
-                    ReceiptHandle=message_receipts[0],
+            successes = [
+                pipeline_embed_product(
+                    product_id=product_id, product_modified_date=product_modified_date
                 )
-            else:
-                raise Exception(f"Message {message_receipts[0]} failed to embed!")
+            ]
+        elif product_id_modified_date_pairs:
+            successes = pipeline_embed_products(
+                product_id_modified_date_pairs=product_id_modified_date_pairs
+            )
+        else:
+            successes = []
 
-        successes = pipeline_embed_products(
-            product_id_modified_date_pairs=product_id_modified_date_pairs
+        failed_message_ids.extend(
+            message_id
+            for message_id, success in zip(message_ids, successes)
+            if not success
         )
 
-        message_receipts_map: dict[str, bool] = {}
-        for message_receipt, success in zip(message_receipts, successes):
-            if message_receipt not in message_receipts_map:
-                message_receipts_map[message_receipt] = True
-            message_receipts_map[message_receipt] = (
-                message_receipts_map[message_receipt] and success
-            )
+        if failed_message_ids:
+            logger.error(f"Some messages failed to embed: {failed_message_ids}!")
 
-        failed_message_receipts: list[str] = []
-        for message_receipt, success in message_receipts_map.items():
-            if success:
-                sqs_client.delete_message(
-                    QueueUrl=AWSSQSConfig.SUBSCRIBED_QUEUE_URL,
-                    ReceiptHandle=message_receipt,
-                )
-            else:
-                failed_message_receipts.append(message_receipt)
+        if not AWSSQSConfig.REPORT_BATCH_ITEM_FAILURES:
+            acknowledge_succeeded_messages(event, set(failed_message_ids))
+            if failed_message_ids:
+                raise Exception(f"Some messages failed to embed: {failed_message_ids}!")
 
-        if failed_message_receipts:
-            raise Exception(
-                f"Some messages failed to embed: {failed_message_receipts}!"
-            )
+        return {
+            "batchItemFailures": [
+                {"itemIdentifier": message_id} for message_id in failed_message_ids
+            ]
+        }
     except Exception as e:
         logger.exception(e)
         raise e
@@ -9,6 +9,7 @@ class ProjectConfig:
 class OnnxEmbedConfig:
     ONNX_MODEL_PATH = str(os.environ.get("ONNX_MODEL_PATH"))
     TOKENIZER_PATH = str(os.environ.get("TOKENIZER_PATH"))
+    EMBED_BATCH_SIZE = int(os.environ.get("ONNX_EMBED_BATCH_SIZE", 64))
 
 
 class AWSSageMakerEmbedConfig:
@@ -39,6 +40,9 @@ class OpenSearchConfig:
     OPENSEARCH_PASSWORD = str(os.environ.get("OPENSEARCH_PASSWORD"))
     SECRETS_MANAGER_NAME = str(os.environ.get("OPENSEARCH_SECRETS_MANAGER_NAME"))
     UPSERT_BATCH_SIZE = int(os.environ.get("OPENSEARCH_UPSERT_BATCH_SIZE", 1000))
+    UPSERT_MAX_CONCURRENT_BATCHES = int(
+        os.environ.get("OPENSEARCH_UPSERT_MAX_CONCURRENT_BATCHES", 4)
+    )
     _TIMEOUT = os.environ.get("OPENSEARCH_TIMEOUT")
     if _TIMEOUT is None:
         TIMEOUT = None
@@ -48,3 +52,18 @@ class OpenSearchConfig:
 
 class AWSSQSConfig:
     SUBSCRIBED_QUEUE_URL = str(os.environ.get("AWS_SQS_SUBSCRIBED_QUEUE_URL"))
+    REPORT_BATCH_ITEM_FAILURES: bool = (
+        str(os.environ.get("AWS_SQS_REPORT_BATCH_ITEM_FAILURES", "true")) == "true"
+    )
+    DELETE_BATCH_SIZE = int(os.environ.get("AWS_SQS_DELETE_BATCH_SIZE", 10))
+    DELETE_MAX_CONCURRENT_BATCHES = int(
+        os.environ.get("AWS_SQS_DELETE_MAX_CONCURRENT_BATCHES", 10)
+    )
+
+
+class PipelineConfig:
+    CHUNK_SIZE = int(os.environ.get("PIPELINE_CHUNK_SIZE", 100))
+    QUEUE_SIZE = int(os.environ.get("PIPELINE_QUEUE_SIZE", 2))
+    FETCH_CONCURRENCY = int(os.environ.get("PIPELINE_FETCH_CONCURRENCY", 1))
+    EMBED_CONCURRENCY = int(os.environ.get("PIPELINE_EMBED_CONCURRENCY", 2))
+    UPSERT_CONCURRENCY = int(os.environ.get("PIPELINE_UPSERT_CONCURRENCY", 2))
@@ -0,0 +1,103 @@
+from dataclasses import dataclass
+from queue import Queue
+from threading import Lock, Thread
+from typing import Callable, Generic, Iterable, Optional, Sequence, TypeVar
+import logging
+
+T = TypeVar("T")
+
+_PIPELINE_END = object()
+
+
+@dataclass(frozen=True, slots=True)
+class PipelineChunk(Generic[T]):
+    """A chunk of work flowing through the pipeline, `indices` are the positions
+    of its items in the original batch"""
+
+    indices: list[int]
+    items: list[T]
+
+
+PipelineStage = Callable[[PipelineChunk], Optional[PipelineChunk]]
+
+
+def _run_pipeline_stage(
+    stage: PipelineStage,
+    input_queue: Queue,
+    output_queue: Queue,
+    on_failure: Callable[[PipelineChunk], None],
+    remaining_workers: list[int],
+    remaining_workers_lock: Lock,
+) -> None:
+    """Run one worker of a stage until the end of the pipeline input"""
+
+    while True:
+        chunk = input_queue.get()
+        if chunk is _PIPELINE_END:
+            #! Put the end marker back for the other workers of the stage
+            input_queue.put(_PIPELINE_END)
+            with remaining_workers_lock:
+                remaining_workers[0] -= 1
+                is_last_worker = remaining_workers[0] == 0
+            if is_last_worker:
+                output_queue.put(_PIPELINE_END)
+            return
+
+        try:
+            next_chunk = stage(chunk)
+        except Exception as e:
+            logging.exception(e)
+            logging.error("Error running pipeline stage!")
+            on_failure(chunk)
+            continue
+
+        if next_chunk is not None and next_chunk.indices:
+            output_queue.put(next_chunk)
+
+
+def run_pipeline(
+    chunks: Iterable[PipelineChunk],
+    stages: Sequence[tuple[PipelineStage, int]],
+    queue_size: int,
+    on_failure: Callable[[PipelineChunk], None],
+) -> None:
+    """Stream chunks through the (stage, concurrency) pairs in order.
+
+    Every stage has its own workers, so different chunks can be in different
+    stages at the same time. Stages are connected by bounded queues, so a slow
+    stage holds back the ones before it instead of buffering the whole batch.
+    A stage returns the chunk for the next stage, or None when nothing is
+    left to do. A chunk whose stage raises is passed to `on_failure`.
+    """
+
+    queues: list[Queue] = [Queue(maxsize=queue_size) for _ in stages]
+    #! Nothing reads the output of the last stage except for the end marker
+    queues.append(Queue())
+
+    workers: list[Thread] = []
+    for stage_index, (stage, concurrency) in enumerate(stages):
+        concurrency = max(concurrency, 1)
+        remaining_workers = [concurrency]
+        remaining_workers_lock = Lock()
+        for _ in range(concurrency):
+            worker = Thread(
+                target=_run_pipeline_stage,
+                args=(
+                    stage,
+                    queues[stage_index],
+                    queues[stage_index + 1],
+                    on_failure,
+                    remaining_workers,
+                    remaining_workers_lock,
+                ),
+                daemon=True,
+            )
+            worker.start()
+            workers.append(worker)
+
+    for chunk in chunks:
+        queues[0].put(chunk)
+    queues[0].put(_PIPELINE_END)
+
+    for worker in workers:
+        worker.join()
@@ -1,3 +1,4 @@
 from .embed_raw_product_details import EmbedRawProductDetailsUseCase
 from .fetch_raw_product_details import FetchRawProductDetailsUseCase
 from .upsert_embedded_product_details import UpsertEmbeddedProductDetailsUseCase
+from .acknowledge_messages import AcknowledgeMessagesUseCase
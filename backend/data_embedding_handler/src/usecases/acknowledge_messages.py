@@ -0,0 +1,20 @@
+from abc import abstractmethod, ABC
+from typing import overload, Sequence
+
+
+class AcknowledgeMessagesUseCase(ABC):
+    @overload
+    def acknowledge(self, receipt_handle: str) -> bool:
+        ...
+
+    @overload
+    def acknowledge(self, receipt_handle: Sequence[str]) -> list[bool]:
+        ...
+
+    @abstractmethod
+    def acknowledge(self, receipt_handle: str | Sequence[str]) -> bool | list[bool]:
+        ...
+
+    @abstractmethod
+    def close(self) -> bool:
+        ...
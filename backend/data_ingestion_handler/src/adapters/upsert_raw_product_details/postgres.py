@@ -3,14 +3,19 @@ from usecases import UpsertRawProductDetailsUseCase
 from entities import RawProductDetails
 import psycopg2
 from psycopg2.extensions import connection
-from typing import Optional, Sequence, overload, TypeVar, Iterator
+from typing import ClassVar, Optional, Sequence, overload, TypeVar, Iterator
 from typing_extensions import override
+import csv
+import io
 import logging
 
 T = TypeVar("T")
 
 
 class PostgresUpsertRawProductDetailsClient(UpsertRawProductDetailsUseCase):
+    #! Halving a batch of 1000 isolates a single row after 10 splits
+    _max_split_depth: ClassVar[int] = 10
+
     def __init__(
         self,
         host: str,
@@ -20,6 +25,7 @@ class PostgresUpsertRawProductDetailsClient(UpsertRawProductDetailsUseCase):
         database: str,
         raw_product_table_name: str,
         upsert_batch_size: int,
+        use_copy: bool = True,
     ) -> None:
         super().__init__()
         self._host = host
@@ -29,6 +35,7 @@ class PostgresUpsertRawProductDetailsClient(UpsertRawProductDetailsUseCase):
         self._database = database
         self._raw_product_table_name = raw_product_table_name
         self._upsert_batch_size = upsert_batch_size
+        self._use_copy = use_copy
         self._conn: Optional[connection] = None
 
     @overload
@@ -113,7 +120,7 @@ class PostgresUpsertRawProductDetailsClient(UpsertRawProductDetailsUseCase):
                             actual_price = EXCLUDED.actual_price,
                             modified_date = EXCLUDED.modified_date,
                             created_date = EXCLUDED.created_date
-                        WHEN EXCLUDED.modified_date > {table_name}.modified_date
+                        WHERE EXCLUDED.modified_date > {table_name}.modified_date
                     """.format(
                         table_name=self._raw_product_table_name
                     )
@@ -136,11 +143,192 @@ class PostgresUpsertRawProductDetailsClient(UpsertRawProductDetailsUseCase):
             logging.error("Error getting Postgres connection!")
             return False
 
+    def _raw_product_details_to_csv(
+        self, raw_product_details: Sequence[RawProductDetails]
+    ) -> io.StringIO:
+        """Serialize a batch of RawProductDetails to CSV for COPY"""
+
+        csv_file = io.StringIO()
+        csv_writer = csv.writer(csv_file)
+        for raw_product_detail in raw_product_details:
+            csv_writer.writerow(
+                [
+                    raw_product_detail.product_id,
+                    raw_product_detail.name,
+                    raw_product_detail.main_category,
+                    raw_product_detail.sub_category,
+                    raw_product_detail.image_url,
+                    raw_product_detail.ratings,
+                    raw_product_detail.discount_price,
+                    raw_product_detail.actual_price,
+                    raw_product_detail.modified_date.isoformat(),
+                    raw_product_detail.created_date.isoformat(),
+                ]
+            )
+        csv_file.seek(0)
+        return csv_file
+
+    def _copy_merge(
+        self, conn: connection, raw_products_batch: Sequence[RawProductDetails]
+    ) -> None:
+        """COPY a batch into the staging table and merge it in one statement"""
+
+        staging_table_name = f"{self._raw_product_table_name}_staging"
+        with conn.cursor() as cur:
+            #! Temp tables skip the WAL like unlogged ones, and are private to
+            #! the connection so concurrent ingestions never share rows
+            cur.execute(
+                """
+                CREATE TEMP TABLE IF NOT EXISTS {staging_table_name}
+                    (LIKE {table_name} INCLUDING DEFAULTS)
+                    ON COMMIT DELETE ROWS
+                """.format(
+                    staging_table_name=staging_table_name,
+                    table_name=self._raw_product_table_name,
+                )
+            )
+            #! An unquoted empty CSV field is read as NULL, so empty strings in the
+            #! text columns are forced back to empty strings
+            cur.copy_expert(
+                """
+                COPY {staging_table_name} (
+                    product_id,
+                    name,
+                    main_category,
+                    sub_category,
+                    image_url,
+                    ratings,
+                    discount_price,
+                    actual_price,
+                    modified_date,
+                    created_date
+                ) FROM STDIN (
+                    FORMAT csv,
+                    FORCE_NOT_NULL (
+                        product_id,
+                        name,
+                        main_category,
+                        sub_category,
+                        image_url
+                    )
+                )
+                """.format(
+                    staging_table_name=staging_table_name
+                ),
+                self._raw_product_details_to_csv(raw_products_batch),
+            )
+
+            #! ON CONFLICT cannot update the same row twice in one statement,
+            #! so only the latest version of a duplicated product is merged
+            stmt = """
+                INSERT INTO {table_name} (
+                    product_id,
+                    name,
+                    main_category,
+                    sub_category,
+                    image_url,
+                    ratings,
+                    discount_price,
+                    actual_price,
+                    modified_date,
+                    created_date
+                ) SELECT DISTINCT ON (product_id)
+                    product_id,
+                    name,
+                    main_category,
+                    sub_category,
+                    image_url,
+                    ratings,
+                    discount_price,
+                    actual_price,
+                    modified_date,
+                    created_date
+                FROM {staging_table_name}
+                    ORDER BY product_id, modified_date DESC
+                ON CONFLICT (product_id) DO UPDATE SET
+                    name = EXCLUDED.name,
+                    main_category = EXCLUDED.main_category,
+                    sub_category = EXCLUDED.sub_category,
+                    image_url = EXCLUDED.image_url,
+                    ratings = EXCLUDED.ratings,
+                    discount_price = EXCLUDED.discount_price,
+                    actual_price = EXCLUDED.actual_price,
+                    modified_date = EXCLUDED.modified_date,
+                    created_date = EXCLUDED.created_date
+                WHERE {table_name}.modified_date < EXCLUDED.modified_date
+            """.format(
+                table_name=self._raw_product_table_name,
+                staging_table_name=staging_table_name,
+            )
+            cur.execute(stmt)
+        conn.commit()
+
+    def _upsert_batch_copy(
+        self, raw_products_batch: Sequence[RawProductDetails], split_depth: int = 0
+    ) -> list[bool]:
+        """Upsert a batch with COPY and one merge.
+
+        A batch rejected because of its data is retried in halves until the
+        failing products are isolated, so one bad row does not fail the whole
+        batch. Any other error fails the batch at once.
+        """
+        try:
+            with self._get_conn() as conn:
+                try:
+                    self._copy_merge(conn, raw_products_batch)
+                    return [True] * len(raw_products_batch)
+                except (psycopg2.DataError, psycopg2.IntegrityError) as e:
+                    conn.rollback()
+                    if (
+                        len(raw_products_batch) == 1
+                        or split_depth >= self._max_split_depth
+                    ):
+                        failed_product_ids = [
+                            raw_product_detail.product_id
+                            for raw_product_detail in raw_products_batch
+                        ]
+                        logging.exception(e)
+                        logging.error(
+                            f"Error upserting raw product details {','.join(failed_product_ids)}!"
+                        )
+                        return [False] * len(raw_products_batch)
+                    logging.warning(
+                        f"Error upserting {len(raw_products_batch)} raw product details, retrying in halves!"
+                    )
+                except Exception as e:
+                    failed_product_ids = [
+                        raw_product_detail.product_id
+                        for raw_product_detail in raw_products_batch
+                    ]
+                    logging.exception(e)
+                    logging.error(
+                        f"Error upserting raw product details {','.join(failed_product_ids)}!"
+                    )
+                    conn.rollback()
+                    return [False] * len(raw_products_batch)
+        except Exception as e:
+            logging.exception(e)
+            logging.error("Error getting Postgres connection!")
+            return [False] * len(raw_products_batch)
+
+        middle = len(raw_products_batch) // 2
+        return self._upsert_batch_copy(
+            raw_products_batch[:middle], split_depth + 1
+        ) + self._upsert_batch_copy(raw_products_batch[middle:], split_depth + 1)
+
     def _upsert_batch(
         self, raw_product_details: Sequence[RawProductDetails]
     ) -> list[bool]:
         """Upsert a batch of raw products to Postgres."""
-        successes: list[bool] = []
+        if self._use_copy:
+            successes: list[bool] = []
+            for raw_products_batch in self._batch_generator(
+                raw_product_details, self._upsert_batch_size
+            ):
+                successes.extend(self._upsert_batch_copy(raw_products_batch))
+            return successes
+
+        successes = []
         for raw_products_batch in self._batch_generator(
             raw_product_details, self._upsert_batch_size
         ):
@@ -196,6 +384,7 @@ class PostgresUpsertRawProductDetailsClient(UpsertRawProductDetailsUseCase):
                         logging.error(
                             f"Error upserting raw product details {','.join(failed_product_ids)}!"
                         )
+                        conn.rollback()
                         successes.extend([False] * len(raw_products_batch))
             except Exception as e:
                 logging.exception(e)
@@ -1,5 +1,7 @@
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
-from typing import Optional, cast
+from itertools import islice
+from typing import IO, Iterable, Iterator, Optional, cast
 from entities import RawProductDetails
 from usecases import UpsertRawProductDetailsUseCase
 from adapters.upsert_raw_product_details.aws_sqs import (
@@ -14,6 +16,7 @@ import json
 from aws_lambda_powertools.logging import Logger, utils as log_utils
 from aws_lambda_powertools.utilities.typing import LambdaContext
 import csv
+import io
 import re
 
 logger = Logger(level=ProjectConfig.LOG_LEVEL)
@@ -129,6 +132,56 @@ def pipeline_upsert_raw_products(
     return overall_upsert_results
 
 
+def parse_raw_product_details(
+    rows: Iterable[dict[str, str]], modified_date: datetime
+) -> Iterator[RawProductDetails]:
+    """Lazily parse CSV rows into raw product details, skipping invalid rows"""
+
+    INDIAN_RUPEE_TO_HKD_EXCHANGE_RATE = 0.094
+
+    for index, row in enumerate(rows, start=1):
+        try:
+            yield RawProductDetails(
+                product_id=str(index).zfill(10),
+                name=row["name"],
+                main_category=row["main_category"],
+                sub_category=row["sub_category"],
+                image_url=row["image"],
+                ratings=float(row["ratings"]),
+                discount_price=float(
+                    re.sub(
+                        r"\D+",
+                        "",
+                        row["discount_price"],
+                    )
+                )
+                * INDIAN_RUPEE_TO_HKD_EXCHANGE_RATE,
+                actual_price=float(
+                    re.sub(
+                        r"\D+",
+                        "",
+                        row["actual_price"],
+                    )
+                )
+                * INDIAN_RUPEE_TO_HKD_EXCHANGE_RATE,
+                modified_date=modified_date,
+                created_date=datetime.now(),
+            )
+        except Exception as e:
+            logger.warning(f"Failed to parse row {index}!")
+            logger.warning(row)
+
+
+def batch_generator(
+    raw_product_details: Iterable[RawProductDetails], batch_size: int
+) -> Iterator[list[RawProductDetails]]:
+    """Group an iterable of raw product details into lists of batch_size"""
+
+    iterator = iter(raw_product_details)
+    while raw_products_batch := list(islice(iterator, batch_size)):
+        yield raw_products_batch
+
+
 @logger.inject_lambda_context(log_event=ProjectConfig.LOG_SOURCE_EVENT)
 def handler(event: dict, context: LambdaContext) -> dict:
     init_postgres_upsert_raw_product_details_client()
@@ -147,57 +200,41 @@ def handler(event: dict, context: LambdaContext) -> dict:
                 f"Found error status code {response['ResponseMetadata']['HTTPStatusCode']}!"
             )
 
-        raw_product_details: list[RawProductDetails] = []
-
         logger.info(
             f"Reading raw product details from {AWSS3Config.SAMPLE_DATA_KEY}..."
         )
 
-        INDIAN_RUPEE_TO_HKD_EXCHANGE_RATE = 0.094
-
-        for index, row in enumerate(
-            csv.DictReader(response["Body"].read().decode("utf-8").splitlines()),
-            start=1,
-        ):
-            try:
-                raw_product_details.append(
-                    RawProductDetails(
-                        product_id=str(index).zfill(10),
-                        name=row["name"],
-                        main_category=row["main_category"],
-                        sub_category=row["sub_category"],
-                        image_url=row["image"],
-                        ratings=float(row["ratings"]),
-                        discount_price=float(
-                            re.sub(
-                                r"\D+",
-                                "",
-                                row["discount_price"],
-                            )
-                        )
-                        * INDIAN_RUPEE_TO_HKD_EXCHANGE_RATE,
-                        actual_price=float(
-                            re.sub(
-                                r"\D+",
-                                "",
-                                row["actual_price"],
-                            )
-                        )
-                        * INDIAN_RUPEE_TO_HKD_EXCHANGE_RATE,
-                        modified_date=lambda_invoke_time,
-                        created_date=datetime.now(),
-                    )
-                )
-            except Exception as e:
-                logger.warning(f"Failed to parse row {index}!")
-                logger.warning(row)
+        #! The body is decoded and parsed as it is downloaded, at most one batch
+        #! is being parsed while the previous one is upserted
+        rows = csv.DictReader(
+            io.TextIOWrapper(
+                cast(IO[bytes], response["Body"]), encoding="utf-8", newline=""
+            )
+        )
 
-        logger.info(f"Found {len(raw_product_details)} raw product details!")
+        num_raw_product_details = 0
+        num_failed_upserts = 0
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            pending_upsert: Optional[Future[list[bool]]] = None
+            for raw_products_batch in batch_generator(
+                parse_raw_product_details(rows, lambda_invoke_time),
+                AWSS3Config.STREAM_BATCH_SIZE,
+            ):
+                if pending_upsert is not None:
+                    num_failed_upserts += pending_upsert.result().count(False)
+                pending_upsert = executor.submit(
+                    pipeline_upsert_raw_products, raw_products_batch
+                )
+                num_raw_product_details += len(raw_products_batch)
+            if pending_upsert is not None:
+                num_failed_upserts += pending_upsert.result().count(False)
 
-        upsert_results = pipeline_upsert_raw_products(raw_product_details)
+        logger.info(f"Found {num_raw_product_details} raw product details!")
 
-        if not all(upsert_results):
-            raise Exception("Error upserting raw product details!")
+        if num_failed_upserts > 0:
+            raise Exception(
+                f"Error upserting {num_failed_upserts} raw product details!"
+            )
 
     except Exception as e:
         logger.exception(e)
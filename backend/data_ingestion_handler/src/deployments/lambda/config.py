@@ -25,3 +25,5 @@ class AWSSQSConfig:
 class AWSS3Config:
     SAMPLE_DATA_BUCKET_NAME = str(os.environ.get("AWS_S3_SAMPLE_DATA_BUCKET_NAME"))
     SAMPLE_DATA_KEY = str(os.environ.get("AWS_S3_SAMPLE_DATA_KEY"))
+    #! Rows parsed and upserted at a time while the object is streamed
+    STREAM_BATCH_SIZE = int(os.environ.get("AWS_S3_STREAM_BATCH_SIZE", 1000))
@@ -0,0 +1,86 @@
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+from typing import Generic, Hashable, Optional, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class LRUTTLCache(Generic[K, V]):
+    """Thread-safe cache bounded by size (LRU eviction) and entry age (TTL)"""
+
+    def __init__(self, max_size: int, ttl_seconds: float) -> None:
+        if max_size < 1:
+            raise ValueError(f"Invalid cache size {max_size}!")
+        self._max_size = max_size
+        self._ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[K, tuple[V, float]] = OrderedDict()
+        self._lock = Lock()
+        self._hits = 0
+        self._misses = 0
+
+    @property
+    def hits(self) -> int:
+        return self._hits
+
+    @property
+    def misses(self) -> int:
+        return self._misses
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: K) -> Optional[V]:
+        """Get a value and mark it as recently used, None if missing or expired"""
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            value, expiry_time = entry
+            if expiry_time <= monotonic():
+                del self._entries[key]
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def peek(self, key: K) -> Optional[V]:
+        """Get a value without touching its recency or the hit / miss counters"""
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= monotonic():
+                return None
+            return entry[0]
+
+    def put(self, key: K, value: V) -> None:
+        """Insert or refresh a value, evicting the least recently used entries"""
+
+        with self._lock:
+            self._entries[key] = (value, monotonic() + self._ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: K) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def info(self) -> dict[str, int]:
+        """Get the hit / miss counters and current size of the cache"""
+
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "size": len(self._entries),
+                "max_size": self._max_size,
+            }
@@ -0,0 +1,96 @@
+from datetime import datetime, timedelta
+from threading import Lock
+from time import monotonic
+from adapters.caches.lru_ttl import LRUTTLCache
+from entities import RawProductDetails
+from typing import Mapping, Optional, Sequence
+
+
+class RawProductDetailsCache:
+    """LRU + TTL cache of product details that also tracks `modified_date` staleness.
+
+    The cache remembers the latest `modified_date` it has seen. Products
+    modified at or after that point, less a lookback, can be looked up and
+    passed to `evict_stale`, which drops every cached version older than the
+    modification.
+
+    Ingestion stamps a whole run with the same `modified_date` and commits it
+    batch by batch, so rows sharing the latest `modified_date` may still be
+    committed after it was seen. The lookback also covers runs committing out
+    of order.
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        ttl_seconds: float,
+        staleness_check_seconds: float,
+        staleness_lookback_seconds: float = 60,
+    ) -> None:
+        self._cache: LRUTTLCache[str, RawProductDetails] = LRUTTLCache(
+            max_size=max_size, ttl_seconds=ttl_seconds
+        )
+        self._staleness_check_seconds = staleness_check_seconds
+        self._staleness_lookback = timedelta(seconds=staleness_lookback_seconds)
+        self._staleness_check_time: Optional[float] = None
+        self._modified_since: Optional[datetime] = None
+        self._lock = Lock()
+
+    @property
+    def cache(self) -> LRUTTLCache[str, RawProductDetails]:
+        return self._cache
+
+    def _update_modified_since(self, modified_date: datetime) -> None:
+        with self._lock:
+            if self._modified_since is None or modified_date > self._modified_since:
+                self._modified_since = modified_date
+
+    def get(self, product_ids: Sequence[str]) -> list[Optional[RawProductDetails]]:
+        """Get the cached product details, None for every miss"""
+        return [self._cache.get(product_id) for product_id in product_ids]
+
+    def put(self, raw_product_details: Sequence[Optional[RawProductDetails]]) -> None:
+        """Cache the fetched product details, skipping the ones that were not found"""
+
+        for raw_product_detail in raw_product_details:
+            if raw_product_detail is None:
+                continue
+            self._cache.put(raw_product_detail.product_id, raw_product_detail)
+            self._update_modified_since(raw_product_detail.modified_date)
+
+    def staleness_check_due(self) -> Optional[datetime]:
+        """Get the time to look for products modified at or after, None if no check
+        is due"""
+
+        with self._lock:
+            if self._modified_since is None:
+                return None
+            if (
+                self._staleness_check_time is not None
+                and monotonic() - self._staleness_check_time
+                < self._staleness_check_seconds
+            ):
+                return None
+            self._staleness_check_time = monotonic()
+            return self._modified_since - self._staleness_lookback
+
+    def evict_stale(self, product_modified_dates: Mapping[str, datetime]) -> int:
+        """Evict cached products older than their latest modified_date.
+
+        Returns the number of evicted products.
+        """
+
+        num_evicted = 0
+        for product_id, modified_date in product_modified_dates.items():
+            raw_product_detail = self._cache.peek(product_id)
+            if (
+                raw_product_detail is not None
+                and raw_product_detail.modified_date < modified_date
+            ):
+                self._cache.delete(product_id)
+                num_evicted += 1
+            self._update_modified_since(modified_date)
+        return num_evicted
+
+    def clear(self) -> None:
+        self._cache.clear()
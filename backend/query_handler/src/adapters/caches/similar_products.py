@@ -0,0 +1,101 @@
+from threading import Lock
+from adapters.caches.lru_ttl import LRUTTLCache
+from entities import RawProductDetails, EmbeddedProductsWatermark
+from typing import Optional
+
+SimilarProductsResult = list[tuple[RawProductDetails, float]]
+
+
+class SimilarProductsResultCache:
+    """Cache of hydrated similar_products results keyed by (query, threshold, limit).
+
+    Every entry remembers the embedded products watermark that was current
+    when it was computed. Once a different watermark is observed, all older
+    entries are dropped so that freshly embedded products become visible to
+    repeated queries.
+
+    Ingestion stamps a whole run with the same `modified_date`, so the
+    watermark also carries the latest `created_date` and the number of
+    embedded products, which move with every upsert.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float) -> None:
+        self._cache: LRUTTLCache[
+            tuple[str, Optional[float], Optional[int]],
+            tuple[Optional[EmbeddedProductsWatermark], SimilarProductsResult],
+        ] = LRUTTLCache(max_size=max_size, ttl_seconds=ttl_seconds)
+        self._watermark: Optional[EmbeddedProductsWatermark] = None
+        self._watermark_lock = Lock()
+
+    @property
+    def cache(
+        self,
+    ) -> LRUTTLCache[
+        tuple[str, Optional[float], Optional[int]],
+        tuple[Optional[EmbeddedProductsWatermark], SimilarProductsResult],
+    ]:
+        return self._cache
+
+    @property
+    def watermark(self) -> Optional[EmbeddedProductsWatermark]:
+        """The watermark to pass to `put` for a result computed from now on"""
+        return self._watermark
+
+    def _get_cache_key(
+        self, query: str, threshold: Optional[float], limit: Optional[int]
+    ) -> tuple[str, Optional[float], Optional[int]]:
+        """Normalise the query so that trivially different queries share an entry"""
+        return (" ".join(query.lower().split()), threshold, limit)
+
+    def update_watermark(self, watermark: Optional[EmbeddedProductsWatermark]) -> bool:
+        """Record the latest watermark, invalidating the cache if it has moved.
+
+        Returns True if the cache was invalidated.
+        """
+
+        if watermark is None:
+            return False
+        with self._watermark_lock:
+            if watermark == self._watermark:
+                return False
+            self._watermark = watermark
+            self._cache.clear()
+            return True
+
+    def get(
+        self, query: str, threshold: Optional[float], limit: Optional[int]
+    ) -> Optional[SimilarProductsResult]:
+        """Get a cached result, None if missing, expired or older than the watermark"""
+
+        cache_key = self._get_cache_key(query, threshold, limit)
+        entry = self._cache.get(cache_key)
+        if entry is None:
+            return None
+        entry_watermark, result = entry
+        if entry_watermark != self._watermark:
+            self._cache.delete(cache_key)
+            return None
+        return result
+
+    def put(
+        self,
+        query: str,
+        threshold: Optional[float],
+        limit: Optional[int],
+        result: SimilarProductsResult,
+        watermark: Optional[EmbeddedProductsWatermark],
+    ) -> None:
+        """Cache a result computed while `watermark` was current.
+
+        The watermark must be read before computing the result, so that a
+        result racing with an invalidation is never cached as fresh.
+        """
+
+        if watermark != self._watermark:
+            return
+        self._cache.put(
+            self._get_cache_key(query, threshold, limit), (watermark, list(result))
+        )
+
+    def clear(self) -> None:
+        self._cache.clear()
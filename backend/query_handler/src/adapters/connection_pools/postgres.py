@@ -0,0 +1,219 @@
+from contextlib import contextmanager
+from dataclasses import dataclass
+from threading import Condition
+from time import monotonic
+import psycopg2
+from psycopg2.extensions import (
+    connection,
+    TRANSACTION_STATUS_IDLE,
+    TRANSACTION_STATUS_UNKNOWN,
+)
+from typing import Iterator, Optional
+import logging
+
+
+@dataclass(slots=True)
+class _PooledConnection:
+    conn: connection
+    created_time: float
+    last_used_time: float
+
+
+class PostgresConnectionPool:
+    """Bounded, thread-safe pool of psycopg2 connections.
+
+    Idle connections are recycled after `max_idle_seconds`, every connection
+    is replaced after `max_lifetime_seconds`, and connections idle for longer
+    than `health_check_seconds` are pinged before being handed out.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        username: str,
+        password: str,
+        database: str,
+        min_size: int,
+        max_size: int,
+        max_idle_seconds: float,
+        max_lifetime_seconds: float,
+        health_check_seconds: float = 30,
+        acquire_timeout: Optional[float] = None,
+    ) -> None:
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError(
+                f"Invalid pool size (min_size={min_size}, max_size={max_size})!"
+            )
+        self._host = host
+        self._port = port
+        self._username = username
+        self._password = password
+        self._database = database
+        self._min_size = min_size
+        self._max_size = max_size
+        self._max_idle_seconds = max_idle_seconds
+        self._max_lifetime_seconds = max_lifetime_seconds
+        self._health_check_seconds = health_check_seconds
+        self._acquire_timeout = acquire_timeout
+        self._condition = Condition()
+        self._idle_connections: list[_PooledConnection] = []
+        self._size = 0
+        self._closed = False
+
+        for _ in range(self._min_size):
+            try:
+                self._idle_connections.append(self._connect())
+                self._size += 1
+            except Exception as e:
+                logging.exception(e)
+                logging.error("Error pre-filling Postgres connection pool!")
+                break
+
+    @contextmanager
+    def connection(self) -> Iterator[connection]:
+        """Borrow a connection from the pool and return it after use"""
+
+        pooled_connection = self._acquire()
+        try:
+            yield pooled_connection.conn
+        finally:
+            self._release(pooled_connection)
+
+    def _connect(self) -> _PooledConnection:
+        """Open a new connection to the database"""
+
+        now = monotonic()
+        return _PooledConnection(
+            conn=psycopg2.connect(
+                database=self._database,
+                user=self._username,
+                password=self._password,
+                host=self._host,
+                port=self._port,
+            ),
+            created_time=now,
+            last_used_time=now,
+        )
+
+    def _is_expired(self, pooled_connection: _PooledConnection, now: float) -> bool:
+        """Check whether the connection is closed, idle or alive for too long"""
+
+        return (
+            pooled_connection.conn.closed != 0
+            or now - pooled_connection.last_used_time > self._max_idle_seconds
+            or now - pooled_connection.created_time > self._max_lifetime_seconds
+        )
+
+    def _is_healthy(self, pooled_connection: _PooledConnection, now: float) -> bool:
+        """Ping connections that have been idle for a while before reusing them"""
+
+        if now - pooled_connection.last_used_time <= self._health_check_seconds:
+            return True
+        try:
+            with pooled_connection.conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            pooled_connection.conn.rollback()
+            return True
+        except Exception as e:
+            logging.warning(f"Discarding unhealthy Postgres connection: {e}")
+            return False
+
+    def _discard(self, pooled_connection: _PooledConnection) -> None:
+        """Close a connection and free its slot in the pool"""
+
+        try:
+            pooled_connection.conn.close()
+        except Exception as e:
+            logging.exception(e)
+            logging.error("Error closing Postgres connection!")
+        with self._condition:
+            self._size -= 1
+            self._condition.notify()
+
+    def _acquire(self) -> _PooledConnection:
+        """Take an idle connection, open a new one, or wait for one to be released"""
+
+        deadline = (
+            None
+            if self._acquire_timeout is None
+            else monotonic() + self._acquire_timeout
+        )
+        while True:
+            pooled_connection: Optional[_PooledConnection] = None
+            create_connection = False
+            with self._condition:
+                if self._closed:
+                    raise RuntimeError("Postgres connection pool is closed!")
+                if self._idle_connections:
+                    pooled_connection = self._idle_connections.pop()
+                elif self._size < self._max_size:
+                    self._size += 1
+                    create_connection = True
+                else:
+                    remaining = None if deadline is None else deadline - monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise TimeoutError(
+                            "Timed out waiting for a Postgres connection from the pool!"
+                        )
+                    self._condition.wait(remaining)
+                    continue
+
+            if create_connection:
+                try:
+                    return self._connect()
+                except Exception:
+                    with self._condition:
+                        self._size -= 1
+                        self._condition.notify()
+                    raise
+
+            now = monotonic()
+            if self._is_expired(pooled_connection, now) or not self._is_healthy(
+                pooled_connection, now
+            ):
+                self._discard(pooled_connection)
+                continue
+            return pooled_connection
+
+    def _release(self, pooled_connection: _PooledConnection) -> None:
+        """Reset a borrowed connection and put it back into the pool"""
+
+        conn = pooled_connection.conn
+        try:
+            if conn.closed == 0:
+                transaction_status = conn.get_transaction_status()
+                if transaction_status == TRANSACTION_STATUS_UNKNOWN:
+                    conn.close()
+                elif transaction_status != TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+        except Exception as e:
+            logging.exception(e)
+            logging.error("Error resetting Postgres connection!")
+            conn.close()
+
+        if conn.closed != 0 or self._closed:
+            self._discard(pooled_connection)
+            return
+
+        pooled_connection.last_used_time = monotonic()
+        with self._condition:
+            self._idle_connections.append(pooled_connection)
+            self._condition.notify()
+
+    def close(self) -> bool:
+        with self._condition:
+            self._closed = True
+            idle_connections, self._idle_connections = self._idle_connections, []
+            self._condition.notify_all()
+        success = True
+        for pooled_connection in idle_connections:
+            try:
+                pooled_connection.conn.close()
+            except Exception as e:
+                logging.exception(e)
+                logging.error("Error closing Postgres connection!")
+                success = False
+            with self._condition:
+                self._size -= 1
+        return success
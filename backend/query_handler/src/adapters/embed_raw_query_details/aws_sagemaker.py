@@ -9,12 +9,15 @@ from typing import ClassVar, Iterator, Optional, overload, Sequence, TypeVar
 from typing_extensions import override
 from typing import Callable
 from mypy_boto3_sagemaker_runtime import SageMakerRuntimeClient
+from mypy_boto3_sagemaker_runtime.type_defs import InvokeEndpointOutputTypeDef
+import numpy as np
 
 T = TypeVar("T")
 
 
 class AWSSageMakerEmbedRawQueryDetailsClient(EmbedRawQueryDetailsUseCase):
     _client_revoke_timeout: ClassVar[int] = 30 * 60  # 30 minutes
+    _binary_content_type: ClassVar[str] = "application/octet-stream"
 
     def __init__(
         self,
@@ -60,6 +63,35 @@ class AWSSageMakerEmbedRawQueryDetailsClient(EmbedRawQueryDetailsUseCase):
             self._last_revoke_time = datetime.now()
         yield self._client
 
+    def _invoke_endpoint(
+        self, client: SageMakerRuntimeClient, body: dict
+    ) -> InvokeEndpointOutputTypeDef:
+        """Invoke the endpoint, asking for binary float32 embeddings"""
+
+        return client.invoke_endpoint(
+            EndpointName=self._endpoint_name,
+            Body=json.dumps(body),
+            ContentType="application/json",
+            Accept=f"{self._binary_content_type}, application/json",
+        )
+
+    def _decode_embeddings(
+        self, response: InvokeEndpointOutputTypeDef, num_embeddings: int
+    ) -> list[list[float]]:
+        """Decode the endpoint response into one embedding per input text.
+
+        Binary responses are little-endian float32 rows, anything else is
+        parsed as the JSON response format."""
+
+        body = response["Body"].read()
+        if response.get("ContentType", "").startswith(self._binary_content_type):
+            return np.frombuffer(body, dtype="<f4").reshape(num_embeddings, -1).tolist()
+
+        embeddings: list = json.loads(body.decode("utf-8"))["result"]
+        if embeddings and not isinstance(embeddings[0], list):
+            embeddings = [embeddings]
+        return embeddings
+
     def _batch_generator(
         self, data: Sequence[T], batch_size: int
     ) -> Iterator[Sequence[T]]:
@@ -74,14 +106,12 @@ class AWSSageMakerEmbedRawQueryDetailsClient(EmbedRawQueryDetailsUseCase):
         """Embed a single RawProductDetails"""
         try:
             with self._get_client() as client:
-                embedding: list[float] = json.loads(
-                    client.invoke_endpoint(
-                        EndpointName=self._endpoint_name,
-                        Body=json.dumps({"text": raw_query_details.query.lower()}),
-                    )["Body"]
-                    .read()
-                    .decode("utf-8")
-                )["result"]
+                embedding: list[float] = self._decode_embeddings(
+                    self._invoke_endpoint(
+                        client, {"text": raw_query_details.query.lower()}
+                    ),
+                    1,
+                )[0]
                 print(f"{embedding = }")
                 logging.info(f"{embedding = }")
 
@@ -94,16 +124,54 @@ class AWSSageMakerEmbedRawQueryDetailsClient(EmbedRawQueryDetailsUseCase):
             logging.error(f"Error embedding query {raw_query_details.query}!")
             return None
 
+    def _embed_chunk(
+        self, raw_query_details: Sequence[RawQueryDetails]
+    ) -> list[Optional[EmbeddedQueryDetails]]:
+        """Embed a chunk of RawQueryDetails with a single endpoint invocation"""
+        try:
+            with self._get_client() as client:
+                embeddings = self._decode_embeddings(
+                    self._invoke_endpoint(
+                        client,
+                        {
+                            "texts": [
+                                raw_query_detail.query.lower()
+                                for raw_query_detail in raw_query_details
+                            ]
+                        },
+                    ),
+                    len(raw_query_details),
+                )
+
+                if len(embeddings) != len(raw_query_details):
+                    raise ValueError(
+                        f"Expected {len(raw_query_details)} embeddings, got {len(embeddings)}!"
+                    )
+
+                created_date = datetime.now()
+                return [
+                    EmbeddedQueryDetails(
+                        embedding=embedding,
+                        created_date=created_date,
+                    )
+                    for embedding in embeddings
+                ]
+        except Exception as e:
+            logging.exception(e)
+            logging.error(f"Error embedding {len(raw_query_details)} queries!")
+            return [None] * len(raw_query_details)
+
     def _embed_batch(
         self, raw_query_details: Sequence[RawQueryDetails]
     ) -> list[Optional[EmbeddedQueryDetails]]:
         embedded_query_details_list: list[Optional[EmbeddedQueryDetails]] = []
 
-        for batch in self._batch_generator(raw_query_details, self._embed_batch_size):
-            with ThreadPoolExecutor(max_workers=10) as executor:
-                embedded_query_details_list.extend(
-                    executor.map(self._embed_single, batch)
-                )
+        with ThreadPoolExecutor(max_workers=10) as executor:
+            for embedded_query_details_chunk in executor.map(
+                self._embed_chunk,
+                self._batch_generator(raw_query_details, self._embed_batch_size),
+            ):
+                embedded_query_details_list.extend(embedded_query_details_chunk)
         return embedded_query_details_list
 
     @override
@@ -0,0 +1,112 @@
+from datetime import datetime
+from adapters.caches.lru_ttl import LRUTTLCache
+from usecases import EmbedRawQueryDetailsUseCase
+from entities import RawQueryDetails, EmbeddedQueryDetails
+from typing import Optional, overload, Sequence
+from typing_extensions import override
+
+
+class CachedEmbedRawQueryDetailsClient(EmbedRawQueryDetailsUseCase):
+    """Serve repeated queries from an LRU + TTL cache in front of any embed client"""
+
+    def __init__(
+        self,
+        embed_raw_query_details_client: EmbedRawQueryDetailsUseCase,
+        max_size: int,
+        ttl_seconds: float,
+    ) -> None:
+        super().__init__()
+        self._embed_raw_query_details_client = embed_raw_query_details_client
+        self._cache: LRUTTLCache[str, list[float]] = LRUTTLCache(
+            max_size=max_size, ttl_seconds=ttl_seconds
+        )
+
+    @overload
+    def embed(
+        self, raw_query_details: RawQueryDetails
+    ) -> Optional[EmbeddedQueryDetails]:
+        ...
+
+    @overload
+    def embed(
+        self, raw_query_details: Sequence[RawQueryDetails]
+    ) -> list[Optional[EmbeddedQueryDetails]]:
+        ...
+
+    @override
+    def embed(
+        self, raw_query_details: RawQueryDetails | Sequence[RawQueryDetails]
+    ) -> Optional[EmbeddedQueryDetails] | list[Optional[EmbeddedQueryDetails]]:
+        if isinstance(raw_query_details, RawQueryDetails):
+            return self._embed_single(raw_query_details)
+        return self._embed_batch(raw_query_details)
+
+    @property
+    def cache(self) -> LRUTTLCache[str, list[float]]:
+        return self._cache
+
+    def _get_cache_key(self, raw_query_details: RawQueryDetails) -> str:
+        """Normalise the query so that trivially different queries share an entry"""
+        return " ".join(raw_query_details.query.lower().split())
+
+    def _embed_single(
+        self, raw_query_details: RawQueryDetails
+    ) -> Optional[EmbeddedQueryDetails]:
+        """Embed a single RawQueryDetails, using the cache when possible"""
+
+        cache_key = self._get_cache_key(raw_query_details)
+        embedding = self._cache.get(cache_key)
+        if embedding is not None:
+            return EmbeddedQueryDetails(
+                embedding=embedding, created_date=datetime.now()
+            )
+
+        embedded_query_details = self._embed_raw_query_details_client.embed(
+            raw_query_details
+        )
+        if embedded_query_details is not None:
+            self._cache.put(cache_key, embedded_query_details.embedding)
+        return embedded_query_details
+
+    def _embed_batch(
+        self, raw_query_details: Sequence[RawQueryDetails]
+    ) -> list[Optional[EmbeddedQueryDetails]]:
+        """Embed a batch of RawQueryDetails, only sending cache misses downstream"""
+
+        embedded_query_details_list: list[Optional[EmbeddedQueryDetails]] = [
+            None
+        ] * len(raw_query_details)
+        missed_indices: dict[str, list[int]] = {}
+        missed_raw_query_details: list[RawQueryDetails] = []
+
+        for index, raw_query_detail in enumerate(raw_query_details):
+            cache_key = self._get_cache_key(raw_query_detail)
+            if cache_key in missed_indices:
+                missed_indices[cache_key].append(index)
+                continue
+            embedding = self._cache.get(cache_key)
+            if embedding is not None:
+                embedded_query_details_list[index] = EmbeddedQueryDetails(
+                    embedding=embedding, created_date=datetime.now()
+                )
+                continue
+            missed_indices[cache_key] = [index]
+            missed_raw_query_details.append(raw_query_detail)
+
+        if not missed_raw_query_details:
+            return embedded_query_details_list
+
+        for (cache_key, indices), embedded_query_details in zip(
+            missed_indices.items(),
+            self._embed_raw_query_details_client.embed(missed_raw_query_details),
+        ):
+            if embedded_query_details is not None:
+                self._cache.put(cache_key, embedded_query_details.embedding)
+            for index in indices:
+                embedded_query_details_list[index] = embedded_query_details
+        return embedded_query_details_list
+
+    @override
+    def close(self) -> bool:
+        self._cache.clear()
+        return self._embed_raw_query_details_client.close()
@@ -0,0 +1,128 @@
+from concurrent.futures import Future
+from queue import Empty, Queue
+from threading import Thread
+from time import monotonic
+from usecases import EmbedRawQueryDetailsUseCase
+from entities import RawQueryDetails, EmbeddedQueryDetails
+from typing import Optional, overload, Sequence
+from typing_extensions import override
+import logging
+
+_Request = tuple[RawQueryDetails, Future[Optional[EmbeddedQueryDetails]]]
+
+
+class MicroBatchingEmbedRawQueryDetailsClient(EmbedRawQueryDetailsUseCase):
+    """Coalesce concurrent embed calls into batched calls of the wrapped client.
+
+    Incoming queries are held for at most `max_wait_ms` (or until
+    `max_batch_size` queries are waiting) and then embedded together by one
+    `embed(Sequence[RawQueryDetails])` call of the wrapped client.
+    """
+
+    def __init__(
+        self,
+        embed_raw_query_details_client: EmbedRawQueryDetailsUseCase,
+        max_batch_size: int,
+        max_wait_ms: float,
+    ) -> None:
+        super().__init__()
+        self._embed_raw_query_details_client = embed_raw_query_details_client
+        self._max_batch_size = max_batch_size
+        self._max_wait_seconds = max_wait_ms / 1000
+        self._queue: Queue[Optional[_Request]] = Queue()
+        self._worker = Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    @overload
+    def embed(
+        self, raw_query_details: RawQueryDetails
+    ) -> Optional[EmbeddedQueryDetails]:
+        ...
+
+    @overload
+    def embed(
+        self, raw_query_details: Sequence[RawQueryDetails]
+    ) -> list[Optional[EmbeddedQueryDetails]]:
+        ...
+
+    @override
+    def embed(
+        self, raw_query_details: RawQueryDetails | Sequence[RawQueryDetails]
+    ) -> Optional[EmbeddedQueryDetails] | list[Optional[EmbeddedQueryDetails]]:
+        if isinstance(raw_query_details, RawQueryDetails):
+            return self._submit(raw_query_details).result()
+        futures = [
+            self._submit(raw_query_detail) for raw_query_detail in raw_query_details
+        ]
+        return [future.result() for future in futures]
+
+    def _submit(
+        self, raw_query_details: RawQueryDetails
+    ) -> Future[Optional[EmbeddedQueryDetails]]:
+        """Enqueue a query for the next batch and return its pending result"""
+
+        if not self._worker.is_alive():
+            raise RuntimeError("Micro-batching worker is not running!")
+
+        future: Future[Optional[EmbeddedQueryDetails]] = Future()
+        self._queue.put((raw_query_details, future))
+        return future
+
+    def _collect_batch(self, first_request: _Request) -> tuple[list[_Request], bool]:
+        """Collect requests until the batch is full or the wait window expires.
+
+        Returns the batch and whether the close sentinel was received."""
+
+        batch: list[_Request] = [first_request]
+        deadline = monotonic() + self._max_wait_seconds
+        while len(batch) < self._max_batch_size:
+            remaining = deadline - monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except Empty:
+                break
+            if request is None:
+                return batch, True
+            batch.append(request)
+        return batch, False
+
+    def _embed_batch(self, batch: list[_Request]) -> None:
+        """Embed a collected batch and fan the results back to the waiting callers"""
+
+        try:
+            embedded_query_details_list = self._embed_raw_query_details_client.embed(
+                [raw_query_details for raw_query_details, _ in batch]
+            )
+        except Exception as e:
+            logging.exception(e)
+            logging.error(f"Error embedding batch of {len(batch)} queries!")
+            embedded_query_details_list = [None] * len(batch)
+
+        for (_, future), embedded_query_details in zip(
+            batch, embedded_query_details_list
+        ):
+            future.set_result(embedded_query_details)
+
+    def _run(self) -> None:
+        """Worker loop that drains the queue batch by batch until closed"""
+
+        while True:
+            request = self._queue.get()
+            if request is None:
+                return
+            batch, closing = self._collect_batch(request)
+            self._embed_batch(batch)
+            if closing:
+                return
+
+    @override
+    def close(self) -> bool:
+        self._queue.put(None)
+        self._worker.join()
+        while not self._queue.empty():
+            request = self._queue.get_nowait()
+            if request is not None:
+                request[1].set_result(None)
+        return self._embed_raw_query_details_client.close()
@@ -37,10 +37,7 @@ class OnnxEmbedRawQueryDetailsClient(EmbedRawQueryDetailsUseCase):
     ) -> Optional[EmbeddedQueryDetails] | list[Optional[EmbeddedQueryDetails]]:
         if isinstance(raw_query_details, RawQueryDetails):
             return self._embed_single(raw_query_details)
-        return [
-            self._embed_single(raw_query_detail)
-            for raw_query_detail in raw_query_details
-        ]
+        return self._embed_batch(raw_query_details)
 
     def _embed_single(self, raw_query_details: RawQueryDetails) -> EmbeddedQueryDetails:
         """Embed a single RawProductDetails"""
@@ -63,6 +60,39 @@ class OnnxEmbedRawQueryDetailsClient(EmbedRawQueryDetailsUseCase):
             created_date=datetime.now(),
         )
 
+    def _embed_batch(
+        self, raw_query_details: Sequence[RawQueryDetails]
+    ) -> list[Optional[EmbeddedQueryDetails]]:
+        """Embed a batch of RawQueryDetails with a single padded inference run"""
+
+        if len(raw_query_details) == 0:
+            return []
+
+        tokenized_input: dict[str, npt.NDArray[np.float_]] = dict(
+            self._tokenizer(
+                [
+                    raw_query_detail.query.lower()
+                    for raw_query_detail in raw_query_details
+                ],
+                return_tensors="np",
+                padding=True,
+                truncation=True,
+            )
+        )
+
+        embeddings: npt.NDArray[np.float_] = self._inference_session.run(
+            ["output"], tokenized_input
+        )[0]
+
+        created_date = datetime.now()
+        return [
+            EmbeddedQueryDetails(
+                embedding=embedding.tolist(),
+                created_date=created_date,
+            )
+            for embedding in embeddings
+        ]
+
     @override
     def close(self) -> bool:
         return True
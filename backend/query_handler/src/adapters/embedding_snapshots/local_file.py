@@ -0,0 +1,166 @@
+from datetime import datetime
+from usecases import FetchEmbeddingSnapshotUseCase
+from entities import EmbeddingSnapshot
+from typing import ClassVar, Optional, Sequence
+from typing_extensions import override
+import numpy.typing as npt
+import numpy as np
+import json
+import os
+import shutil
+
+
+class LocalFileEmbeddingSnapshotStore(FetchEmbeddingSnapshotUseCase):
+    """Versioned on-disk snapshots of the embedded products.
+
+    Every version is a directory holding the float32 embedding matrix and the
+    product ids as `.npy` files plus a JSON manifest with the watermark. The
+    `CURRENT` file names the latest complete version, and is only replaced
+    once the version directory has been fully written.
+    """
+
+    _format_version: ClassVar[int] = 1
+    _current_file_name: ClassVar[str] = "CURRENT"
+    _manifest_file_name: ClassVar[str] = "manifest.json"
+    _embeddings_file_name: ClassVar[str] = "embeddings.npy"
+    _product_ids_file_name: ClassVar[str] = "product_ids.npy"
+
+    def __init__(self, snapshot_dir: str) -> None:
+        super().__init__()
+        self._snapshot_dir = snapshot_dir
+
+    def _version_dir(self, version: str) -> str:
+        return os.path.join(self._snapshot_dir, version)
+
+    def latest_version(self) -> Optional[str]:
+        """Get the latest complete snapshot version, None if there is none"""
+        try:
+            with open(
+                os.path.join(self._snapshot_dir, self._current_file_name)
+            ) as current_file:
+                return current_file.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def write(
+        self,
+        product_ids: Sequence[str],
+        embeddings: npt.NDArray[np.float32],
+        cursor: Optional[tuple[datetime, str]],
+        keep_versions: int = 2,
+    ) -> str:
+        """Write a new snapshot version, mark it as current and prune old versions"""
+
+        if len(product_ids) != len(embeddings):
+            raise ValueError(
+                f"Got {len(product_ids)} product ids for {len(embeddings)} embeddings!"
+            )
+        os.makedirs(self._snapshot_dir, exist_ok=True)
+        version = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+        tmp_version_dir = self._version_dir(f".{version}.tmp")
+        os.makedirs(tmp_version_dir)
+
+        np.save(
+            os.path.join(tmp_version_dir, self._embeddings_file_name),
+            np.ascontiguousarray(embeddings, dtype="<f4"),
+        )
+        #! Fixed width bytes keep the product ids mmap-able as well
+        np.save(
+            os.path.join(tmp_version_dir, self._product_ids_file_name),
+            np.array(
+                [product_id.encode("utf-8") for product_id in product_ids],
+                dtype=np.bytes_ if product_ids else "S1",
+            ),
+        )
+        with open(
+            os.path.join(tmp_version_dir, self._manifest_file_name), "w"
+        ) as manifest_file:
+            json.dump(
+                {
+                    "format_version": self._format_version,
+                    "version": version,
+                    "num_products": len(product_ids),
+                    "dimension": int(embeddings.shape[1])
+                    if embeddings.ndim == 2
+                    else 0,
+                    "cursor": None
+                    if cursor is None
+                    else [cursor[0].isoformat(), cursor[1]],
+                    "created_date": datetime.now().isoformat(),
+                },
+                manifest_file,
+            )
+
+        os.rename(tmp_version_dir, self._version_dir(version))
+        tmp_current_file_path = os.path.join(
+            self._snapshot_dir, f".{self._current_file_name}.tmp"
+        )
+        with open(tmp_current_file_path, "w") as current_file:
+            current_file.write(version)
+        os.replace(
+            tmp_current_file_path,
+            os.path.join(self._snapshot_dir, self._current_file_name),
+        )
+
+        self._prune(keep_versions)
+        return version
+
+    def _prune(self, keep_versions: int) -> None:
+        """Remove all but the latest `keep_versions` snapshot versions"""
+
+        versions = sorted(
+            version
+            for version in os.listdir(self._snapshot_dir)
+            if not version.startswith(".") and os.path.isdir(self._version_dir(version))
+        )
+        for version in versions[: max(len(versions) - keep_versions, 0)]:
+            shutil.rmtree(self._version_dir(version), ignore_errors=True)
+
+    @override
+    def fetch(self, version: Optional[str] = None) -> EmbeddingSnapshot:
+        """Memory map a snapshot version read-only, the current one by default.
+
+        Pages of the embedding matrix and the product ids are shared between
+        every process mapping the same version, and are only read from disk
+        when first touched.
+        """
+
+        if version is None:
+            version = self.latest_version()
+        if version is None:
+            raise FileNotFoundError(f"No embedding snapshot in {self._snapshot_dir}!")
+        version_dir = self._version_dir(version)
+
+        with open(os.path.join(version_dir, self._manifest_file_name)) as manifest_file:
+            manifest = json.load(manifest_file)
+        if manifest["format_version"] != self._format_version:
+            raise ValueError(
+                f"Unsupported embedding snapshot format {manifest['format_version']}!"
+            )
+
+        #! Empty arrays cannot be memory mapped
+        mmap_mode = "r" if manifest["num_products"] > 0 else None
+        embeddings = np.load(
+            os.path.join(version_dir, self._embeddings_file_name),
+            mmap_mode=mmap_mode,
+        )
+        product_ids = np.load(
+            os.path.join(version_dir, self._product_ids_file_name),
+            mmap_mode=mmap_mode,
+        )
+
+        return EmbeddingSnapshot(
+            version=version,
+            product_ids=product_ids,
+            embeddings=embeddings,
+            cursor=None
+            if manifest["cursor"] is None
+            else (
+                datetime.fromisoformat(manifest["cursor"][0]),
+                manifest["cursor"][1],
+            ),
+        )
+
+    @override
+    def close(self) -> bool:
+        return True
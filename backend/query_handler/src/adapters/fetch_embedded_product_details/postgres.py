@@ -0,0 +1,91 @@
+from contextlib import contextmanager
+from datetime import datetime
+from usecases import FetchEmbeddedProductDetailsUseCase
+from entities import EmbeddedProductDetails
+from adapters.connection_pools.postgres import PostgresConnectionPool
+from psycopg2.extensions import connection
+from typing import Optional, Iterator
+from typing_extensions import override
+import logging
+
+
+class PostgresFetchEmbeddedProductDetailsClient(FetchEmbeddedProductDetailsUseCase):
+    def __init__(
+        self,
+        connection_pool: PostgresConnectionPool,
+        embedded_product_table_name: str,
+    ) -> None:
+        super().__init__()
+        self._connection_pool = connection_pool
+        self._embedded_product_table_name = embedded_product_table_name
+
+    @contextmanager
+    def _get_conn(self) -> Iterator[connection]:
+        """Borrow a connection from the shared pool for the duration of a query"""
+        with self._connection_pool.connection() as conn:
+            yield conn
+
+    def _sql_tuple_to_embedded_product_details(
+        self, sql_tuple: tuple
+    ) -> EmbeddedProductDetails:
+        """Deserialize SQL tuple to EmbeddedProductDetails"""
+        return EmbeddedProductDetails(
+            product_id=sql_tuple[0],
+            embedding=sql_tuple[1],
+            modified_date=sql_tuple[2],
+            created_date=sql_tuple[3],
+        )
+
+    @override
+    def fetch(
+        self, cursor: Optional[tuple[datetime, str]], page_size: int
+    ) -> Optional[list[EmbeddedProductDetails]]:
+        try:
+            with self._get_conn() as conn, conn.cursor() as db_cursor:
+                try:
+                    #! Keyset pagination on (created_date, product_id) instead of OFFSET
+                    stmt = """
+                        SELECT
+                            product_id,
+                            embedding::real[],
+                            modified_date,
+                            created_date
+                        FROM {table_name}
+                            {where_clause}
+                            ORDER BY created_date ASC, product_id ASC
+                        LIMIT %(page_size)s""".format(
+                        table_name=self._embedded_product_table_name,
+                        where_clause=(
+                            ""
+                            if cursor is None
+                            else "WHERE (created_date, product_id) > (%(created_date)s, %(product_id)s)"
+                        ),
+                    )
+                    db_cursor.execute(
+                        stmt,
+                        {
+                            "page_size": page_size,
+                            "created_date": None if cursor is None else cursor[0],
+                            "product_id": None if cursor is None else cursor[1],
+                        },
+                    )
+                    return [
+                        self._sql_tuple_to_embedded_product_details(row)
+                        for row in db_cursor.fetchall()
+                    ]
+                except Exception as e:
+                    logging.exception(e)
+                    logging.error(
+                        "Error fetching embedded product details from Postgres!"
+                    )
+                    conn.rollback()
+                    return None
+        except Exception as e:
+            logging.exception(e)
+            logging.error("Error getting Postgres connection!")
+            return None
+
+    @override
+    def close(self) -> bool:
+        #! The connection pool is shared between clients and closed by its owner
+        return True
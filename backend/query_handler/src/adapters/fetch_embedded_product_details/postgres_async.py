@@ -0,0 +1,80 @@
+from datetime import datetime
+from usecases import AsyncFetchEmbeddedProductDetailsUseCase
+from entities import EmbeddedProductDetails
+from asyncpg import Pool, Record
+from typing import Optional
+from typing_extensions import override
+import logging
+
+
+class AsyncPostgresFetchEmbeddedProductDetailsClient(
+    AsyncFetchEmbeddedProductDetailsUseCase
+):
+    def __init__(
+        self,
+        connection_pool: Pool,
+        embedded_product_table_name: str,
+    ) -> None:
+        super().__init__()
+        self._connection_pool = connection_pool
+        self._embedded_product_table_name = embedded_product_table_name
+
+    def _sql_record_to_embedded_product_details(
+        self, record: Record
+    ) -> EmbeddedProductDetails:
+        """Deserialize SQL record to EmbeddedProductDetails"""
+        return EmbeddedProductDetails(
+            product_id=record[0],
+            embedding=record[1],
+            modified_date=record[2],
+            created_date=record[3],
+        )
+
+    @override
+    async def fetch(
+        self, cursor: Optional[tuple[datetime, str]], page_size: int
+    ) -> Optional[list[EmbeddedProductDetails]]:
+        try:
+            #! Keyset pagination on (created_date, product_id) instead of OFFSET
+            if cursor is None:
+                stmt = """
+                    SELECT
+                        product_id,
+                        embedding::real[],
+                        modified_date,
+                        created_date
+                    FROM {table_name}
+                        ORDER BY created_date ASC, product_id ASC
+                    LIMIT $1""".format(
+                    table_name=self._embedded_product_table_name
+                )
+                result = await self._connection_pool.fetch(stmt, page_size)
+            else:
+                stmt = """
+                    SELECT
+                        product_id,
+                        embedding::real[],
+                        modified_date,
+                        created_date
+                    FROM {table_name}
+                        WHERE (created_date, product_id) > ($2, $3)
+                        ORDER BY created_date ASC, product_id ASC
+                    LIMIT $1""".format(
+                    table_name=self._embedded_product_table_name
+                )
+                result = await self._connection_pool.fetch(
+                    stmt, page_size, cursor[0], cursor[1]
+                )
+            return [
+                self._sql_record_to_embedded_product_details(record)
+                for record in result
+            ]
+        except Exception as e:
+            logging.exception(e)
+            logging.error("Error fetching embedded product details from Postgres!")
+            return None
+
+    @override
+    async def close(self) -> bool:
+        #! The connection pool is shared between clients and closed by its owner
+        return True
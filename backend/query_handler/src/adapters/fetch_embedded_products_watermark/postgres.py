@@ -0,0 +1,65 @@
+from contextlib import contextmanager
+from usecases import FetchEmbeddedProductsWatermarkUseCase
+from entities import EmbeddedProductsWatermark
+from adapters.connection_pools.postgres import PostgresConnectionPool
+from psycopg2.extensions import connection
+from typing import Optional, Iterator
+from typing_extensions import override
+import logging
+
+
+class PostgresFetchEmbeddedProductsWatermarkClient(
+    FetchEmbeddedProductsWatermarkUseCase
+):
+    def __init__(
+        self,
+        connection_pool: PostgresConnectionPool,
+        embedded_product_table_name: str,
+    ) -> None:
+        super().__init__()
+        self._connection_pool = connection_pool
+        self._embedded_product_table_name = embedded_product_table_name
+
+    @contextmanager
+    def _get_conn(self) -> Iterator[connection]:
+        """Borrow a connection from the shared pool for the duration of a query"""
+        with self._connection_pool.connection() as conn:
+            yield conn
+
+    @override
+    def fetch(self) -> Optional[EmbeddedProductsWatermark]:
+        """Fetch the watermark of the embedded products"""
+        try:
+            with self._get_conn() as conn, conn.cursor() as cursor:
+                try:
+                    stmt = """
+                        SELECT
+                            MAX(modified_date),
+                            MAX(created_date),
+                            COUNT(*)
+                        FROM {table_name}""".format(
+                        table_name=self._embedded_product_table_name
+                    )
+                    cursor.execute(stmt)
+                    result = cursor.fetchone()
+                    if result is None or result[0] is None:
+                        return None
+                    return EmbeddedProductsWatermark(
+                        modified_date=result[0],
+                        created_date=result[1],
+                        num_products=result[2],
+                    )
+                except Exception as e:
+                    logging.exception(e)
+                    logging.error("Error fetching embedded products watermark!")
+                    conn.rollback()
+                    return None
+        except Exception as e:
+            logging.exception(e)
+            logging.error("Error getting Postgres connection!")
+            return None
+
+    @override
+    def close(self) -> bool:
+        #! The connection pool is shared between clients and closed by its owner
+        return True
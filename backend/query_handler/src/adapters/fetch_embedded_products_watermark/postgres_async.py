@@ -0,0 +1,49 @@
+from usecases import AsyncFetchEmbeddedProductsWatermarkUseCase
+from entities import EmbeddedProductsWatermark
+from asyncpg import Pool
+from typing import Optional
+from typing_extensions import override
+import logging
+
+
+class AsyncPostgresFetchEmbeddedProductsWatermarkClient(
+    AsyncFetchEmbeddedProductsWatermarkUseCase
+):
+    def __init__(
+        self,
+        connection_pool: Pool,
+        embedded_product_table_name: str,
+    ) -> None:
+        super().__init__()
+        self._connection_pool = connection_pool
+        self._embedded_product_table_name = embedded_product_table_name
+
+    @override
+    async def fetch(self) -> Optional[EmbeddedProductsWatermark]:
+        """Fetch the watermark of the embedded products"""
+        try:
+            stmt = """
+                SELECT
+                    MAX(modified_date),
+                    MAX(created_date),
+                    COUNT(*)
+                FROM {table_name}""".format(
+                table_name=self._embedded_product_table_name
+            )
+            result = await self._connection_pool.fetchrow(stmt)
+            if result is None or result[0] is None:
+                return None
+            return EmbeddedProductsWatermark(
+                modified_date=result[0],
+                created_date=result[1],
+                num_products=result[2],
+            )
+        except Exception as e:
+            logging.exception(e)
+            logging.error("Error fetching embedded products watermark!")
+            return None
+
+    @override
+    async def close(self) -> bool:
+        #! The connection pool is shared between clients and closed by its owner
+        return True
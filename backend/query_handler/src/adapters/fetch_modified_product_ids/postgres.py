@@ -0,0 +1,54 @@
+from contextlib import contextmanager
+from datetime import datetime
+from usecases import FetchModifiedProductIdsUseCase
+from adapters.connection_pools.postgres import PostgresConnectionPool
+from psycopg2.extensions import connection
+from typing import Optional, Iterator
+from typing_extensions import override
+import logging
+
+
+class PostgresFetchModifiedProductIdsClient(FetchModifiedProductIdsUseCase):
+    def __init__(
+        self,
+        connection_pool: PostgresConnectionPool,
+        raw_product_table_name: str,
+    ) -> None:
+        super().__init__()
+        self._connection_pool = connection_pool
+        self._raw_product_table_name = raw_product_table_name
+
+    @contextmanager
+    def _get_conn(self) -> Iterator[connection]:
+        """Borrow a connection from the shared pool for the duration of a query"""
+        with self._connection_pool.connection() as conn:
+            yield conn
+
+    @override
+    def fetch(self, modified_since: datetime) -> Optional[dict[str, datetime]]:
+        """Fetch the ids and modified_date of products modified at or after a given time"""
+        try:
+            with self._get_conn() as conn, conn.cursor() as cursor:
+                try:
+                    stmt = """
+                        SELECT product_id, modified_date
+                        FROM {table_name}
+                            WHERE modified_date >= %s""".format(
+                        table_name=self._raw_product_table_name
+                    )
+                    cursor.execute(stmt, (modified_since,))
+                    return {row[0]: row[1] for row in cursor.fetchall()}
+                except Exception as e:
+                    logging.exception(e)
+                    logging.error("Error fetching modified product ids from Postgres!")
+                    conn.rollback()
+                    return None
+        except Exception as e:
+            logging.exception(e)
+            logging.error("Error getting Postgres connection!")
+            return None
+
+    @override
+    def close(self) -> bool:
+        #! The connection pool is shared between clients and closed by its owner
+        return True
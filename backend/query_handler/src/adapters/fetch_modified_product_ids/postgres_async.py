@@ -0,0 +1,39 @@
+from datetime import datetime
+from usecases import AsyncFetchModifiedProductIdsUseCase
+from asyncpg import Pool
+from typing import Optional
+from typing_extensions import override
+import logging
+
+
+class AsyncPostgresFetchModifiedProductIdsClient(AsyncFetchModifiedProductIdsUseCase):
+    def __init__(
+        self,
+        connection_pool: Pool,
+        raw_product_table_name: str,
+    ) -> None:
+        super().__init__()
+        self._connection_pool = connection_pool
+        self._raw_product_table_name = raw_product_table_name
+
+    @override
+    async def fetch(self, modified_since: datetime) -> Optional[dict[str, datetime]]:
+        """Fetch the ids and modified_date of products modified at or after a given time"""
+        try:
+            stmt = """
+                SELECT product_id, modified_date
+                FROM {table_name}
+                    WHERE modified_date >= $1""".format(
+                table_name=self._raw_product_table_name
+            )
+            result = await self._connection_pool.fetch(stmt, modified_since)
+            return {record[0]: record[1] for record in result}
+        except Exception as e:
+            logging.exception(e)
+            logging.error("Error fetching modified product ids from Postgres!")
+            return None
+
+    @override
+    async def close(self) -> bool:
+        #! The connection pool is shared between clients and closed by its owner
+        return True
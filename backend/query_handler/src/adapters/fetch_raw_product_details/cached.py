@@ -0,0 +1,189 @@
+from adapters.caches.raw_product_details import RawProductDetailsCache
+from usecases import (
+    FetchRawProductDetailsUseCase,
+    AsyncFetchRawProductDetailsUseCase,
+    FetchModifiedProductIdsUseCase,
+    AsyncFetchModifiedProductIdsUseCase,
+)
+from entities import RawProductDetails
+from typing import Optional, Sequence, overload
+from typing_extensions import override
+import logging
+
+
+class CachedFetchRawProductDetailsClient(FetchRawProductDetailsUseCase):
+    """Read-through cache in front of any FetchRawProductDetailsUseCase"""
+
+    def __init__(
+        self,
+        fetch_raw_product_details_client: FetchRawProductDetailsUseCase,
+        fetch_modified_product_ids_client: FetchModifiedProductIdsUseCase,
+        max_size: int,
+        ttl_seconds: float,
+        staleness_check_seconds: float,
+        staleness_lookback_seconds: float = 60,
+    ) -> None:
+        super().__init__()
+        self._fetch_raw_product_details_client = fetch_raw_product_details_client
+        self._fetch_modified_product_ids_client = fetch_modified_product_ids_client
+        self._cache = RawProductDetailsCache(
+            max_size=max_size,
+            ttl_seconds=ttl_seconds,
+            staleness_check_seconds=staleness_check_seconds,
+            staleness_lookback_seconds=staleness_lookback_seconds,
+        )
+
+    @overload
+    def fetch(self, product_id: str) -> Optional[RawProductDetails]:
+        ...
+
+    @overload
+    def fetch(self, product_id: Sequence[str]) -> list[Optional[RawProductDetails]]:
+        ...
+
+    @override
+    def fetch(
+        self, product_id: str | Sequence[str]
+    ) -> Optional[RawProductDetails] | list[Optional[RawProductDetails]]:
+        if isinstance(product_id, str):
+            return self._fetch_batch([product_id])[0]
+        return self._fetch_batch(product_id)
+
+    @property
+    def cache(self) -> RawProductDetailsCache:
+        return self._cache
+
+    def _evict_stale(self) -> None:
+        """Evict the cached products modified since the last staleness check"""
+
+        modified_since = self._cache.staleness_check_due()
+        if modified_since is None:
+            return
+        product_modified_dates = self._fetch_modified_product_ids_client.fetch(
+            modified_since
+        )
+        if product_modified_dates is None:
+            logging.error("Error checking product details cache staleness!")
+            self._cache.clear()
+            return
+        self._cache.evict_stale(product_modified_dates)
+
+    def _fetch_batch(
+        self, product_id: Sequence[str]
+    ) -> list[Optional[RawProductDetails]]:
+        """Serve cached product details and fetch all the misses in one call"""
+
+        self._evict_stale()
+        raw_product_details = self._cache.get(product_id)
+        missed_indices = [
+            index
+            for index, raw_product_detail in enumerate(raw_product_details)
+            if raw_product_detail is None
+        ]
+        if not missed_indices:
+            return raw_product_details
+
+        missed_raw_product_details = self._fetch_raw_product_details_client.fetch(
+            [product_id[index] for index in missed_indices]
+        )
+        self._cache.put(missed_raw_product_details)
+        for index, raw_product_detail in zip(
+            missed_indices, missed_raw_product_details
+        ):
+            raw_product_details[index] = raw_product_detail
+        return raw_product_details
+
+    @override
+    def close(self) -> bool:
+        self._cache.clear()
+        return self._fetch_raw_product_details_client.close()
+
+
+class AsyncCachedFetchRawProductDetailsClient(AsyncFetchRawProductDetailsUseCase):
+    """Read-through cache in front of any AsyncFetchRawProductDetailsUseCase"""
+
+    def __init__(
+        self,
+        fetch_raw_product_details_client: AsyncFetchRawProductDetailsUseCase,
+        fetch_modified_product_ids_client: AsyncFetchModifiedProductIdsUseCase,
+        max_size: int,
+        ttl_seconds: float,
+        staleness_check_seconds: float,
+        staleness_lookback_seconds: float = 60,
+    ) -> None:
+        super().__init__()
+        self._fetch_raw_product_details_client = fetch_raw_product_details_client
+        self._fetch_modified_product_ids_client = fetch_modified_product_ids_client
+        self._cache = RawProductDetailsCache(
+            max_size=max_size,
+            ttl_seconds=ttl_seconds,
+            staleness_check_seconds=staleness_check_seconds,
+            staleness_lookback_seconds=staleness_lookback_seconds,
+        )
+
+    @overload
+    async def fetch(self, product_id: str) -> Optional[RawProductDetails]:
+        ...
+
+    @overload
+    async def fetch(
+        self, product_id: Sequence[str]
+    ) -> list[Optional[RawProductDetails]]:
+        ...
+
+    @override
+    async def fetch(
+        self, product_id: str | Sequence[str]
+    ) -> Optional[RawProductDetails] | list[Optional[RawProductDetails]]:
+        if isinstance(product_id, str):
+            return (await self._fetch_batch([product_id]))[0]
+        return await self._fetch_batch(product_id)
+
+    @property
+    def cache(self) -> RawProductDetailsCache:
+        return self._cache
+
+    async def _evict_stale(self) -> None:
+        """Evict the cached products modified since the last staleness check"""
+
+        modified_since = self._cache.staleness_check_due()
+        if modified_since is None:
+            return
+        product_modified_dates = await self._fetch_modified_product_ids_client.fetch(
+            modified_since
+        )
+        if product_modified_dates is None:
+            logging.error("Error checking product details cache staleness!")
+            self._cache.clear()
+            return
+        self._cache.evict_stale(product_modified_dates)
+
+    async def _fetch_batch(
+        self, product_id: Sequence[str]
+    ) -> list[Optional[RawProductDetails]]:
+        """Serve cached product details and fetch all the misses in one call"""
+
+        await self._evict_stale()
+        raw_product_details = self._cache.get(product_id)
+        missed_indices = [
+            index
+            for index, raw_product_detail in enumerate(raw_product_details)
+            if raw_product_detail is None
+        ]
+        if not missed_indices:
+            return raw_product_details
+
+        missed_raw_product_details = await self._fetch_raw_product_details_client.fetch(
+            [product_id[index] for index in missed_indices]
+        )
+        self._cache.put(missed_raw_product_details)
+        for index, raw_product_detail in zip(
+            missed_indices, missed_raw_product_details
+        ):
+            raw_product_details[index] = raw_product_detail
+        return raw_product_details
+
+    @override
+    async def close(self) -> bool:
+        self._cache.clear()
+        return await self._fetch_raw_product_details_client.close()
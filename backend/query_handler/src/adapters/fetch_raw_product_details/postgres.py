@@ -1,7 +1,7 @@
 from contextlib import contextmanager
 from usecases import FetchRawProductDetailsUseCase
 from entities import RawProductDetails
-import psycopg2
+from adapters.connection_pools.postgres import PostgresConnectionPool
 from psycopg2.extensions import connection
 from typing import Optional, Sequence, overload, TypeVar, Iterator
 from typing_extensions import override
@@ -13,23 +13,14 @@ T = TypeVar("T")
 class PostgresFetchRawProductDetailsClient(FetchRawProductDetailsUseCase):
     def __init__(
         self,
-        host: str,
-        port: int,
-        username: str,
-        password: str,
-        database: str,
+        connection_pool: PostgresConnectionPool,
         raw_product_table_name: str,
         fetch_batch_size: int,
     ) -> None:
         super().__init__()
-        self._host = host
-        self._port = port
-        self._username = username
-        self._password = password
-        self._database = database
+        self._connection_pool = connection_pool
         self._raw_product_table_name = raw_product_table_name
         self._fetch_batch_size = fetch_batch_size
-        self._conn: Optional[connection] = None
 
     @overload
     def fetch(self, product_id: str) -> Optional[RawProductDetails]:
@@ -64,15 +55,9 @@ class PostgresFetchRawProductDetailsClient(FetchRawProductDetailsUseCase):
 
     @contextmanager
     def _get_conn(self) -> Iterator[connection]:
-        if self._conn is None or self._conn.closed:
-            self._conn = psycopg2.connect(
-                database=self._database,
-                user=self._username,
-                password=self._password,
-                host=self._host,
-                port=self._port,
-            )
-        yield self._conn
+        """Borrow a connection from the shared pool for the duration of a query"""
+        with self._connection_pool.connection() as conn:
+            yield conn
 
     def _batch_generator(
         self, data: Sequence[T], batch_size: int
@@ -174,12 +159,5 @@ class PostgresFetchRawProductDetailsClient(FetchRawProductDetailsUseCase):
 
     @override
     def close(self) -> bool:
-        try:
-            if self._conn is None:
-                return True
-            self._conn.close()
-            return True
-        except Exception as e:
-            logging.exception(e)
-            logging.error("Error closing Postgres connection!")
-            return False
+        #! The connection pool is shared between clients and closed by its owner
+        return True
@@ -0,0 +1,151 @@
+from usecases import AsyncFetchRawProductDetailsUseCase
+from entities import RawProductDetails
+from asyncpg import Pool, Record
+from typing import Optional, Sequence, overload, TypeVar, Iterator
+from typing_extensions import override
+import asyncio
+import logging
+
+T = TypeVar("T")
+
+
+class AsyncPostgresFetchRawProductDetailsClient(AsyncFetchRawProductDetailsUseCase):
+    def __init__(
+        self,
+        connection_pool: Pool,
+        raw_product_table_name: str,
+        fetch_batch_size: int,
+    ) -> None:
+        super().__init__()
+        self._connection_pool = connection_pool
+        self._raw_product_table_name = raw_product_table_name
+        self._fetch_batch_size = fetch_batch_size
+
+    @overload
+    async def fetch(self, product_id: str) -> Optional[RawProductDetails]:
+        ...
+
+    @overload
+    async def fetch(
+        self, product_id: Sequence[str]
+    ) -> list[Optional[RawProductDetails]]:
+        ...
+
+    @override
+    async def fetch(
+        self, product_id: str | Sequence[str]
+    ) -> Optional[RawProductDetails] | list[Optional[RawProductDetails]]:
+        if isinstance(product_id, str):
+            return await self._fetch_single(product_id)
+        return await self._fetch_batch(product_id)
+
+    def _sql_record_to_raw_product_details(self, record: Record) -> RawProductDetails:
+        """Deserialize SQL record to RawProductDetails"""
+        return RawProductDetails(
+            product_id=record[0],
+            name=record[1],
+            main_category=record[2],
+            sub_category=record[3],
+            image_url=record[4],
+            ratings=float(record[5]),
+            discount_price=float(record[6]),
+            actual_price=float(record[7]),
+            modified_date=record[8],
+            created_date=record[9],
+        )
+
+    def _batch_generator(
+        self, data: Sequence[T], batch_size: int
+    ) -> Iterator[Sequence[T]]:
+        """Separate sequence of data into several batches based on batch sizes"""
+
+        for i in range(0, len(data), batch_size):
+            yield data[i : i + batch_size]
+
+    async def _fetch_single(self, product_id: str) -> Optional[RawProductDetails]:
+        """Fetch a single product details from the database"""
+        try:
+            stmt = """
+                SELECT
+                    product_id,
+                    name,
+                    main_category,
+                    sub_category,
+                    image_url,
+                    ratings,
+                    discount_price,
+                    actual_price,
+                    modified_date,
+                    created_date
+                FROM {table_name}
+                    WHERE product_id = $1""".format(
+                table_name=self._raw_product_table_name
+            )
+            result = await self._connection_pool.fetchrow(stmt, product_id)
+            if result is None:
+                return None
+            return self._sql_record_to_raw_product_details(result)
+        except Exception as e:
+            logging.exception(e)
+            logging.error("Error fetching product details from Postgres!")
+            return None
+
+    async def _fetch_product_ids_batch(
+        self, product_ids_batch: Sequence[str]
+    ) -> list[Optional[RawProductDetails]]:
+        """Fetch a single batch of product details with one query"""
+        try:
+            stmt = """
+                SELECT
+                    product_id,
+                    name,
+                    main_category,
+                    sub_category,
+                    image_url,
+                    ratings,
+                    discount_price,
+                    actual_price,
+                    modified_date,
+                    created_date
+                FROM {table_name}
+                    WHERE product_id = ANY($1::text[])""".format(
+                table_name=self._raw_product_table_name
+            )
+            result = await self._connection_pool.fetch(stmt, list(product_ids_batch))
+
+            raw_product_details_map: dict[str, RawProductDetails] = {
+                record[0]: self._sql_record_to_raw_product_details(record)
+                for record in result
+                if record is not None
+            }
+
+            return [
+                raw_product_details_map.get(product_id, None)
+                for product_id in product_ids_batch
+            ]
+        except Exception as e:
+            logging.exception(e)
+            logging.error("Error fetching product details from Postgres!")
+            return [None] * len(product_ids_batch)
+
+    async def _fetch_batch(
+        self, product_id: Sequence[str]
+    ) -> list[Optional[RawProductDetails]]:
+        """Fetch a batch of product details from the database"""
+
+        raw_product_details: list[Optional[RawProductDetails]] = []
+        for raw_product_details_batch in await asyncio.gather(
+            *(
+                self._fetch_product_ids_batch(product_ids_batch)
+                for product_ids_batch in self._batch_generator(
+                    product_id, self._fetch_batch_size
+                )
+            )
+        ):
+            raw_product_details.extend(raw_product_details_batch)
+        return raw_product_details
+
+    @override
+    async def close(self) -> bool:
+        #! The connection pool is shared between clients and closed by its owner
+        return True
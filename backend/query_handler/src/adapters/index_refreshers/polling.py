@@ -0,0 +1,223 @@
+from datetime import datetime, timedelta
+from usecases import (
+    FetchEmbeddedProductDetailsUseCase,
+    AsyncFetchEmbeddedProductDetailsUseCase,
+    UpsertEmbeddedProductDetailsUseCase,
+)
+from entities import EmbeddedProductDetails
+from typing import Optional, Sequence
+import asyncio
+import logging
+
+
+def _page_cursor(
+    embedded_product_details: Sequence[EmbeddedProductDetails],
+) -> tuple[datetime, str]:
+    return (
+        embedded_product_details[-1].created_date,
+        embedded_product_details[-1].product_id,
+    )
+
+
+class EmbeddedProductsIndexCursor:
+    """The (created_date, product_id) keyset cursor of an in-process index.
+
+    created_date is stamped when a product is embedded, so the cursor only
+    moves over products embedded since the last refresh. Rows are not
+    committed in created_date order, so every poll re-reads a lookback window
+    behind the cursor. Products already applied with the same created_date
+    are skipped instead of being upserted again.
+    """
+
+    def __init__(
+        self,
+        lookback_seconds: float,
+        cursor: Optional[tuple[datetime, str]] = None,
+    ) -> None:
+        self._cursor = cursor
+        self._lookback = timedelta(seconds=lookback_seconds)
+        self._applied_created_dates: dict[str, datetime] = {}
+
+    @property
+    def cursor(self) -> Optional[tuple[datetime, str]]:
+        """The latest (created_date, product_id) applied to the index"""
+        return self._cursor
+
+    def start(self) -> Optional[tuple[datetime, str]]:
+        """The cursor to page from, a lookback window behind the latest one"""
+        if self._cursor is None:
+            return None
+        #! The empty product id sorts before every product of the same created_date
+        return (self._cursor[0] - self._lookback, "")
+
+    def add(self, embedded_product_details: Sequence[EmbeddedProductDetails]) -> None:
+        """Record a page the index was loaded with as applied"""
+        if not embedded_product_details:
+            return
+        self.mark_applied(
+            embedded_product_details,
+            [True] * len(embedded_product_details),
+            _page_cursor(embedded_product_details),
+        )
+
+    def filter_applied(
+        self, embedded_product_details: Sequence[EmbeddedProductDetails]
+    ) -> list[EmbeddedProductDetails]:
+        return [
+            embedded_product_detail
+            for embedded_product_detail in embedded_product_details
+            if self._applied_created_dates.get(embedded_product_detail.product_id)
+            != embedded_product_detail.created_date
+        ]
+
+    def mark_applied(
+        self,
+        embedded_product_details: Sequence[EmbeddedProductDetails],
+        successes: Sequence[bool],
+        last_cursor: Optional[tuple[datetime, str]],
+    ) -> int:
+        """Remember the applied products and advance the cursor if none failed"""
+
+        num_applied = 0
+        for embedded_product_detail, success in zip(
+            embedded_product_details, successes
+        ):
+            if success:
+                self._applied_created_dates[
+                    embedded_product_detail.product_id
+                ] = embedded_product_detail.created_date
+                num_applied += 1
+
+        if num_applied != len(embedded_product_details):
+            #! Keep the cursor so the failed products are fetched again next time
+            logging.error(
+                f"Error applying {len(embedded_product_details) - num_applied} embedded products to the index!"
+            )
+        elif last_cursor is not None and (
+            self._cursor is None or last_cursor > self._cursor
+        ):
+            self._cursor = last_cursor
+
+        if self._cursor is not None:
+            oldest_created_date = self._cursor[0] - self._lookback
+            self._applied_created_dates = {
+                product_id: created_date
+                for product_id, created_date in self._applied_created_dates.items()
+                if created_date >= oldest_created_date
+            }
+        return num_applied
+
+
+class EmbeddedProductsIndexRefresher:
+    """Apply the products embedded since the last refresh to an index"""
+
+    def __init__(
+        self,
+        fetch_embedded_product_details_client: FetchEmbeddedProductDetailsUseCase,
+        upsert_embedded_product_details_client: UpsertEmbeddedProductDetailsUseCase,
+        index_cursor: EmbeddedProductsIndexCursor,
+        page_size: int,
+    ) -> None:
+        self._index_cursor = index_cursor
+        self._page_size = page_size
+        self._fetch_embedded_product_details_client = (
+            fetch_embedded_product_details_client
+        )
+        self._upsert_embedded_product_details_client = (
+            upsert_embedded_product_details_client
+        )
+
+    def refresh(self) -> Optional[int]:
+        """Page through the newly embedded products and upsert them in one call.
+
+        Returns the number of applied products, None if fetching failed.
+        """
+
+        page_cursor = self._index_cursor.start()
+        new_embedded_product_details: list[EmbeddedProductDetails] = []
+        while True:
+            embedded_product_details = (
+                self._fetch_embedded_product_details_client.fetch(
+                    page_cursor, self._page_size
+                )
+            )
+            if embedded_product_details is None:
+                logging.error("Error fetching newly embedded products!")
+                return None
+            if not embedded_product_details:
+                break
+            new_embedded_product_details.extend(
+                self._index_cursor.filter_applied(embedded_product_details)
+            )
+            page_cursor = _page_cursor(embedded_product_details)
+            if len(embedded_product_details) < self._page_size:
+                break
+
+        if not new_embedded_product_details:
+            return self._index_cursor.mark_applied([], [], page_cursor)
+        successes = self._upsert_embedded_product_details_client.upsert(
+            new_embedded_product_details
+        )
+        return self._index_cursor.mark_applied(
+            new_embedded_product_details, successes, page_cursor
+        )
+
+
+class AsyncEmbeddedProductsIndexRefresher:
+    """Apply the products embedded since the last refresh to an index.
+
+    Pages are fetched on the event loop, the upsert into the in-process index
+    runs in a worker thread so it does not block the loop.
+    """
+
+    def __init__(
+        self,
+        fetch_embedded_product_details_client: AsyncFetchEmbeddedProductDetailsUseCase,
+        upsert_embedded_product_details_client: UpsertEmbeddedProductDetailsUseCase,
+        index_cursor: EmbeddedProductsIndexCursor,
+        page_size: int,
+    ) -> None:
+        self._index_cursor = index_cursor
+        self._page_size = page_size
+        self._fetch_embedded_product_details_client = (
+            fetch_embedded_product_details_client
+        )
+        self._upsert_embedded_product_details_client = (
+            upsert_embedded_product_details_client
+        )
+
+    async def refresh(self) -> Optional[int]:
+        """Page through the newly embedded products and upsert them in one call.
+
+        Returns the number of applied products, None if fetching failed.
+        """
+
+        page_cursor = self._index_cursor.start()
+        new_embedded_product_details: list[EmbeddedProductDetails] = []
+        while True:
+            embedded_product_details = (
+                await self._fetch_embedded_product_details_client.fetch(
+                    page_cursor, self._page_size
+                )
+            )
+            if embedded_product_details is None:
+                logging.error("Error fetching newly embedded products!")
+                return None
+            if not embedded_product_details:
+                break
+            new_embedded_product_details.extend(
+                self._index_cursor.filter_applied(embedded_product_details)
+            )
+            page_cursor = _page_cursor(embedded_product_details)
+            if len(embedded_product_details) < self._page_size:
+                break
+
+        if not new_embedded_product_details:
+            return self._index_cursor.mark_applied([], [], page_cursor)
+        successes = await asyncio.to_thread(
+            self._upsert_embedded_product_details_client.upsert,
+            new_embedded_product_details,
+        )
+        return self._index_cursor.mark_applied(
+            new_embedded_product_details, successes, page_cursor
+        )
@@ -0,0 +1,46 @@
+from contextlib import contextmanager
+from threading import Condition
+from typing import Iterator
+
+
+class ReadWriteLock:
+    """Any number of concurrent readers or a single writer.
+
+    Waiting writers block new readers, so a steady stream of queries cannot
+    starve an index update.
+    """
+
+    def __init__(self) -> None:
+        self._condition = Condition()
+        self._num_readers = 0
+        self._num_waiting_writers = 0
+        self._writing = False
+
+    @contextmanager
+    def read(self) -> Iterator[None]:
+        with self._condition:
+            while self._writing or self._num_waiting_writers > 0:
+                self._condition.wait()
+            self._num_readers += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._num_readers -= 1
+                if self._num_readers == 0:
+                    self._condition.notify_all()
+
+    @contextmanager
+    def write(self) -> Iterator[None]:
+        with self._condition:
+            self._num_waiting_writers += 1
+            while self._writing or self._num_readers > 0:
+                self._condition.wait()
+            self._num_waiting_writers -= 1
+            self._writing = True
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._writing = False
+                self._condition.notify_all()
@@ -0,0 +1,428 @@
+from datetime import datetime
+from adapters.locks.read_write import ReadWriteLock
+from usecases import (
+    QuerySimilarProductDetailsUseCase,
+    UpsertEmbeddedProductDetailsUseCase,
+)
+from entities import EmbeddedQueryDetails, EmbeddedProductDetails
+from contextlib import contextmanager
+from threading import Lock
+from typing import Optional, Sequence, overload, TypeVar, Iterator
+from typing_extensions import override
+import numpy.typing as npt
+import numpy as np
+import hnswlib
+import fcntl
+import json
+import logging
+import os
+import tempfile
+
+T = TypeVar("T")
+
+
+class HnswQuerySimilarProductDetailsClient(
+    QuerySimilarProductDetailsUseCase, UpsertEmbeddedProductDetailsUseCase
+):
+    """Approximate kNN over an in-process HNSW graph.
+
+    Scores are inner products, matching the `<#>` operator of the Postgres
+    client. Product ids are mapped to integer hnswlib labels, and the mapping
+    is persisted in a JSON file next to the index file.
+
+    hnswlib supports inserting while searching, so queries and upserts share
+    the read side of the lock; only resizing and saving take the write side.
+    """
+
+    def __init__(
+        self,
+        dimension: int,
+        max_elements: int,
+        m: int,
+        ef_construction: int,
+        ef_search: int,
+        default_threshold: float,
+        default_top_k: int,
+        fetch_batch_size: int,
+        index_path: Optional[str] = None,
+        num_threads: int = -1,
+    ) -> None:
+        super().__init__()
+        self._dimension = dimension
+        self._default_threshold = default_threshold
+        self._default_top_k = default_top_k
+        self._fetch_batch_size = fetch_batch_size
+        self._index_path = index_path
+        self._num_threads = num_threads
+        self._lock = ReadWriteLock()
+        self._upsert_lock = Lock()
+        self._index = hnswlib.Index(space="ip", dim=dimension)
+        self._product_id_to_label: dict[str, int] = {}
+        self._label_to_product_id: dict[int, str] = {}
+        self._next_label = 0
+        self._cursor: Optional[tuple[datetime, str]] = None
+
+        if index_path is not None and os.path.exists(index_path):
+            self._load(index_path, max_elements)
+        else:
+            #! Deleted slots are reused by later inserts instead of growing the graph
+            self._index.init_index(
+                max_elements=max_elements,
+                ef_construction=ef_construction,
+                M=m,
+                allow_replace_deleted=True,
+            )
+        self._index.set_ef(ef_search)
+
+    @overload
+    def query(
+        self,
+        embedded_query_details: EmbeddedQueryDetails,
+        threshold: Optional[float],
+        top_k: Optional[int],
+    ) -> Optional[list[tuple[str, float]]]:
+        ...
+
+    @overload
+    def query(
+        self,
+        embedded_query_details: Sequence[EmbeddedQueryDetails],
+        threshold: Optional[float],
+        top_k: Optional[int],
+    ) -> list[Optional[list[tuple[str, float]]]]:
+        ...
+
+    @override
+    def query(
+        self,
+        embedded_query_details: EmbeddedQueryDetails | Sequence[EmbeddedQueryDetails],
+        threshold: Optional[float],
+        top_k: Optional[int],
+    ) -> Optional[list[tuple[str, float]]] | list[Optional[list[tuple[str, float]]]]:
+        if isinstance(embedded_query_details, EmbeddedQueryDetails):
+            return self._query_many([embedded_query_details], threshold, top_k)[0]
+        return self._query_many(embedded_query_details, threshold, top_k)
+
+    @overload
+    def upsert(self, embedded_product_details: EmbeddedProductDetails) -> bool:
+        ...
+
+    @overload
+    def upsert(
+        self, embedded_product_details: Sequence[EmbeddedProductDetails]
+    ) -> list[bool]:
+        ...
+
+    @override
+    def upsert(
+        self,
+        embedded_product_details: EmbeddedProductDetails
+        | Sequence[EmbeddedProductDetails],
+    ) -> bool | list[bool]:
+        if isinstance(embedded_product_details, EmbeddedProductDetails):
+            return self._upsert_batch([embedded_product_details])[0]
+        return self._upsert_batch(embedded_product_details)
+
+    @property
+    def ef_search(self) -> int:
+        return self._index.ef
+
+    @ef_search.setter
+    def ef_search(self, ef_search: int) -> None:
+        with self._lock.write():
+            self._index.set_ef(ef_search)
+
+    @property
+    def cursor(self) -> Optional[tuple[datetime, str]]:
+        """The latest (created_date, product_id) upserted into the index"""
+        return self._cursor
+
+    def __len__(self) -> int:
+        return len(self._product_id_to_label)
+
+    def _get_mapping_path(self, index_path: str) -> str:
+        return f"{index_path}.json"
+
+    @contextmanager
+    def _lock_index_files(self, index_path: str, exclusive: bool) -> Iterator[None]:
+        """Lock the index and mapping pair against other processes, so a
+        reader never sees the index of one save with the mapping of another"""
+
+        try:
+            lock_file = open(f"{index_path}.lock", "a")
+        except OSError:
+            if exclusive:
+                raise
+            #! Nothing saves into a read-only directory, e.g. an index shipped
+            #! with the image, so there is no writer to lock out
+            lock_file = None
+        if lock_file is None:
+            yield
+            return
+        with lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _create_temp_path(self, path: str) -> str:
+        """Create a uniquely named file next to `path` to write it to first"""
+
+        with tempfile.NamedTemporaryFile(
+            dir=os.path.dirname(path) or ".",
+            prefix=f"{os.path.basename(path)}.",
+            suffix=".tmp",
+            delete=False,
+        ) as temp_file:
+            return temp_file.name
+
+    def _load(self, index_path: str, max_elements: int) -> None:
+        """Load a persisted index and its product id mapping"""
+
+        with self._lock_index_files(index_path, exclusive=False):
+            with open(self._get_mapping_path(index_path)) as mapping_file:
+                mapping = json.load(mapping_file)
+            self._index.load_index(
+                index_path,
+                max_elements=max(max_elements, mapping["max_elements"]),
+                allow_replace_deleted=True,
+            )
+        self._product_id_to_label = mapping["product_id_to_label"]
+        self._label_to_product_id = {
+            label: product_id for product_id, label in self._product_id_to_label.items()
+        }
+        self._next_label = mapping["next_label"]
+        self._cursor = (
+            None
+            if mapping.get("cursor") is None
+            else (datetime.fromisoformat(mapping["cursor"][0]), mapping["cursor"][1])
+        )
+
+    def save(self, index_path: Optional[str] = None) -> bool:
+        """Persist the index and its product id mapping, replacing older files"""
+
+        index_path = index_path or self._index_path
+        if index_path is None:
+            raise ValueError("No index path to save the HNSW index to!")
+        mapping_path = self._get_mapping_path(index_path)
+        temp_paths: list[str] = []
+        try:
+            #! Every process writes its own temp files, so concurrent savers,
+            #! e.g. workers building on startup, never write into the same file
+            temp_paths.append(self._create_temp_path(index_path))
+            temp_paths.append(self._create_temp_path(mapping_path))
+            temp_index_path, temp_mapping_path = temp_paths
+            with self._upsert_lock, self._lock.write():
+                self._index.save_index(temp_index_path)
+                with open(temp_mapping_path, "w") as mapping_file:
+                    json.dump(
+                        {
+                            "max_elements": self._index.get_max_elements(),
+                            "next_label": self._next_label,
+                            "product_id_to_label": self._product_id_to_label,
+                            "cursor": None
+                            if self._cursor is None
+                            else [self._cursor[0].isoformat(), self._cursor[1]],
+                        },
+                        mapping_file,
+                    )
+            with self._lock_index_files(index_path, exclusive=True):
+                os.replace(temp_index_path, index_path)
+                os.replace(temp_mapping_path, mapping_path)
+            return True
+        except Exception as e:
+            logging.exception(e)
+            logging.error("Error saving HNSW index!")
+            for temp_path in temp_paths:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+            return False
+
+    def _upsert_batch(
+        self, embedded_product_details: Sequence[EmbeddedProductDetails]
+    ) -> list[bool]:
+        """Insert new products and replace the embeddings of existing ones"""
+
+        if not embedded_product_details:
+            return []
+        #! Keep the last embedding of a product that appears more than once
+        latest_embedded_product_details = {
+            embedded_product_detail.product_id: embedded_product_detail
+            for embedded_product_detail in embedded_product_details
+        }
+        product_ids = list(latest_embedded_product_details)
+
+        try:
+            embeddings = np.asarray(
+                [
+                    embedded_product_detail.embedding
+                    for embedded_product_detail in latest_embedded_product_details.values()
+                ],
+                dtype=np.float32,
+            )
+
+            with self._upsert_lock:
+                labels: list[int] = []
+                new_indices: list[int] = []
+                for index, product_id in enumerate(product_ids):
+                    label = self._product_id_to_label.get(product_id)
+                    if label is None:
+                        label = self._next_label
+                        self._next_label += 1
+                        new_indices.append(index)
+                    labels.append(label)
+                new_index_set = set(new_indices)
+                existing_indices = [
+                    index
+                    for index in range(len(product_ids))
+                    if index not in new_index_set
+                ]
+
+                required_elements = len(self._product_id_to_label) + len(new_indices)
+                if required_elements > self._index.get_max_elements():
+                    with self._lock.write():
+                        self._index.resize_index(
+                            max(required_elements, 2 * self._index.get_max_elements())
+                        )
+
+                #! Labels are mapped before they become searchable
+                for product_id, label in zip(product_ids, labels):
+                    self._label_to_product_id[label] = product_id
+
+                with self._lock.read():
+                    if existing_indices:
+                        #! Adding an existing label replaces its embedding in place
+                        self._index.add_items(
+                            embeddings[existing_indices],
+                            [labels[index] for index in existing_indices],
+                            num_threads=self._num_threads,
+                        )
+                    if new_indices:
+                        self._index.add_items(
+                            embeddings[new_indices],
+                            [labels[index] for index in new_indices],
+                            num_threads=self._num_threads,
+                            replace_deleted=True,
+                        )
+
+                for product_id, label in zip(product_ids, labels):
+                    self._product_id_to_label[product_id] = label
+                for embedded_product_detail in latest_embedded_product_details.values():
+                    cursor = (
+                        embedded_product_detail.created_date,
+                        embedded_product_detail.product_id,
+                    )
+                    if self._cursor is None or cursor > self._cursor:
+                        self._cursor = cursor
+            return [True] * len(embedded_product_details)
+        except Exception as e:
+            logging.exception(e)
+            logging.error("Error upserting embeddings into the HNSW index!")
+            return [False] * len(embedded_product_details)
+
+    def delete(self, product_ids: Sequence[str]) -> None:
+        """Delete products from the index, unknown product ids are ignored"""
+
+        with self._upsert_lock:
+            for product_id in product_ids:
+                label = self._product_id_to_label.pop(product_id, None)
+                if label is None:
+                    continue
+                with self._lock.read():
+                    self._index.mark_deleted(label)
+                del self._label_to_product_id[label]
+
+    def _batch_generator(
+        self, data: Sequence[T], batch_size: int
+    ) -> Iterator[Sequence[T]]:
+        """Separate sequence of data into several batches based on batch sizes"""
+
+        for i in range(0, len(data), batch_size):
+            yield data[i : i + batch_size]
+
+    def _get_threshold(self, threshold: Optional[float]) -> float:
+        """Get threshold from input or default threshold"""
+        if threshold is None:
+            return self._default_threshold
+        return threshold
+
+    def _get_top_k(self, top_k: Optional[int]) -> int:
+        """Get top_k from input or default top_k"""
+        if top_k is None:
+            return self._default_top_k
+        return top_k
+
+    def _query_matrix(
+        self,
+        query_embeddings: npt.NDArray[np.float32],
+        threshold: float,
+        top_k: int,
+    ) -> list[list[tuple[str, float]]]:
+        """Query the top_k products above threshold for every row in one call"""
+
+        with self._lock.read():
+            top_k = min(top_k, len(self._product_id_to_label))
+            if top_k <= 0:
+                return [[] for _ in range(len(query_embeddings))]
+            labels, distances = self._index.knn_query(
+                query_embeddings, k=top_k, num_threads=self._num_threads
+            )
+            label_to_product_id = self._label_to_product_id
+
+            results: list[list[tuple[str, float]]] = []
+            #! hnswlib reports 1 - inner product as the distance of the ip space
+            for row_labels, row_scores in zip(
+                labels.tolist(), (1 - distances).tolist()
+            ):
+                results.append(
+                    [
+                        (product_id, score)
+                        for product_id, score in (
+                            (label_to_product_id.get(label), score)
+                            for label, score in zip(row_labels, row_scores)
+                        )
+                        #! A product deleted while searching has no product id anymore
+                        if product_id is not None and score >= threshold
+                    ]
+                )
+            return results
+
+    def _query_many(
+        self,
+        embedded_query_details_list: Sequence[EmbeddedQueryDetails],
+        threshold: Optional[float],
+        top_k: Optional[int],
+    ) -> list[Optional[list[tuple[str, float]]]]:
+        """Query similar product details for a batch of embedded queries"""
+
+        similar_products_results: list[Optional[list[tuple[str, float]]]] = []
+        for embedded_query_details_batch in self._batch_generator(
+            embedded_query_details_list, self._fetch_batch_size
+        ):
+            try:
+                query_embeddings = np.asarray(
+                    [
+                        embedded_query_details.embedding
+                        for embedded_query_details in embedded_query_details_batch
+                    ],
+                    dtype=np.float32,
+                )
+                similar_products_results.extend(
+                    self._query_matrix(
+                        query_embeddings,
+                        self._get_threshold(threshold),
+                        self._get_top_k(top_k),
+                    )
+                )
+            except Exception as e:
+                logging.exception(e)
+                logging.error("Error querying the HNSW index!")
+                similar_products_results.extend(
+                    [None] * len(embedded_query_details_batch)
+                )
+        return similar_products_results
+
+    @override
+    def close(self) -> bool:
+        return True
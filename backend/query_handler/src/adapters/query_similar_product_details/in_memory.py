@@ -0,0 +1,354 @@
+from dataclasses import dataclass
+from datetime import datetime
+from threading import Lock
+from usecases import (
+    QuerySimilarProductDetailsUseCase,
+    UpsertEmbeddedProductDetailsUseCase,
+)
+from entities import EmbeddedQueryDetails, EmbeddedProductDetails
+from typing import Optional, Sequence, overload, TypeVar, Iterator
+from typing_extensions import override
+import numpy.typing as npt
+import numpy as np
+import logging
+
+T = TypeVar("T")
+
+
+class EmbeddedProductsMatrixBuilder:
+    """Accumulate pages of embedded products into one contiguous float32 matrix"""
+
+    def __init__(self) -> None:
+        self._product_ids: list[str] = []
+        self._embedding_pages: list[npt.NDArray[np.float32]] = []
+        self._cursor: Optional[tuple[datetime, str]] = None
+
+    @property
+    def cursor(self) -> Optional[tuple[datetime, str]]:
+        """The (created_date, product_id) of the last added product"""
+        return self._cursor
+
+    def add(self, embedded_product_details: Sequence[EmbeddedProductDetails]) -> None:
+        if not embedded_product_details:
+            return
+        self._product_ids.extend(
+            embedded_product_detail.product_id
+            for embedded_product_detail in embedded_product_details
+        )
+        #! Convert page by page so the whole catalog never exists as python floats
+        self._embedding_pages.append(
+            np.asarray(
+                [
+                    embedded_product_detail.embedding
+                    for embedded_product_detail in embedded_product_details
+                ],
+                dtype=np.float32,
+            )
+        )
+        self._cursor = (
+            embedded_product_details[-1].created_date,
+            embedded_product_details[-1].product_id,
+        )
+
+    def build(self) -> tuple[list[str], npt.NDArray[np.float32]]:
+        if not self._embedding_pages:
+            return [], np.empty((0, 0), dtype=np.float32)
+        return self._product_ids, np.concatenate(self._embedding_pages, axis=0)
+
+
+@dataclass(frozen=True, slots=True)
+class _EmbeddingMatrix:
+    #! Either python strings, or the fixed width utf-8 bytes of a snapshot
+    product_ids: npt.NDArray[np.object_ | np.bytes_]
+    embeddings: npt.NDArray[np.float32]
+    #! Only built by the first upsert, a read-only matrix never needs it
+    product_id_to_row: Optional[dict[str, int]]
+    cursor: Optional[tuple[datetime, str]]
+
+
+class InMemoryQuerySimilarProductDetailsClient(
+    QuerySimilarProductDetailsUseCase, UpsertEmbeddedProductDetailsUseCase
+):
+    """Exact kNN over a float32 embedding matrix held in process memory.
+
+    Scores are inner products, matching the `<#>` operator of the Postgres
+    client, which are cosine similarities for the normalised embeddings.
+
+    Upserts are copy-on-write: a new matrix is built aside and swapped in with
+    a single assignment, so queries never wait for an update.
+    """
+
+    def __init__(
+        self,
+        product_ids: Sequence[str] | npt.NDArray[np.bytes_],
+        embeddings: npt.NDArray[np.float32],
+        default_threshold: float,
+        default_top_k: int,
+        fetch_batch_size: int,
+        cursor: Optional[tuple[datetime, str]] = None,
+    ) -> None:
+        super().__init__()
+        if len(product_ids) != len(embeddings):
+            raise ValueError(
+                f"Got {len(product_ids)} product ids for {len(embeddings)} embeddings!"
+            )
+        self._embedding_matrix = _EmbeddingMatrix(
+            product_ids=product_ids
+            if isinstance(product_ids, np.ndarray) and product_ids.dtype.kind == "S"
+            else np.asarray(product_ids, dtype=object),
+            #! A C-contiguous float32 matrix lets the matmul go straight to BLAS
+            embeddings=np.ascontiguousarray(embeddings, dtype=np.float32),
+            product_id_to_row=None,
+            cursor=cursor,
+        )
+        self._upsert_lock = Lock()
+        self._default_threshold = default_threshold
+        self._default_top_k = default_top_k
+        self._fetch_batch_size = fetch_batch_size
+
+    @overload
+    def query(
+        self,
+        embedded_query_details: EmbeddedQueryDetails,
+        threshold: Optional[float],
+        top_k: Optional[int],
+    ) -> Optional[list[tuple[str, float]]]:
+        ...
+
+    @overload
+    def query(
+        self,
+        embedded_query_details: Sequence[EmbeddedQueryDetails],
+        threshold: Optional[float],
+        top_k: Optional[int],
+    ) -> list[Optional[list[tuple[str, float]]]]:
+        ...
+
+    @override
+    def query(
+        self,
+        embedded_query_details: EmbeddedQueryDetails | Sequence[EmbeddedQueryDetails],
+        threshold: Optional[float],
+        top_k: Optional[int],
+    ) -> Optional[list[tuple[str, float]]] | list[Optional[list[tuple[str, float]]]]:
+        if isinstance(embedded_query_details, EmbeddedQueryDetails):
+            return self._query_many([embedded_query_details], threshold, top_k)[0]
+        return self._query_many(embedded_query_details, threshold, top_k)
+
+    @overload
+    def upsert(self, embedded_product_details: EmbeddedProductDetails) -> bool:
+        ...
+
+    @overload
+    def upsert(
+        self, embedded_product_details: Sequence[EmbeddedProductDetails]
+    ) -> list[bool]:
+        ...
+
+    @override
+    def upsert(
+        self,
+        embedded_product_details: EmbeddedProductDetails
+        | Sequence[EmbeddedProductDetails],
+    ) -> bool | list[bool]:
+        if isinstance(embedded_product_details, EmbeddedProductDetails):
+            return self._upsert_batch([embedded_product_details])[0]
+        return self._upsert_batch(embedded_product_details)
+
+    @property
+    def cursor(self) -> Optional[tuple[datetime, str]]:
+        """The latest (created_date, product_id) contained in the matrix"""
+        return self._embedding_matrix.cursor
+
+    def __len__(self) -> int:
+        return len(self._embedding_matrix.product_ids)
+
+    def _decode_product_ids(
+        self, product_ids: npt.NDArray[np.object_ | np.bytes_]
+    ) -> list[str]:
+        """Convert a slice of the product ids to python strings"""
+        if product_ids.dtype.kind == "S":
+            return [product_id.decode("utf-8") for product_id in product_ids.tolist()]
+        return product_ids.tolist()
+
+    def _upsert_batch(
+        self, embedded_product_details: Sequence[EmbeddedProductDetails]
+    ) -> list[bool]:
+        """Build a new matrix with the products replaced or appended and swap it in"""
+
+        if not embedded_product_details:
+            return []
+        #! Keep the last embedding of a product that appears more than once
+        latest_embedded_product_details = {
+            embedded_product_detail.product_id: embedded_product_detail
+            for embedded_product_detail in embedded_product_details
+        }
+        try:
+            upserted_embeddings = np.asarray(
+                [
+                    embedded_product_detail.embedding
+                    for embedded_product_detail in latest_embedded_product_details.values()
+                ],
+                dtype=np.float32,
+            )
+            with self._upsert_lock:
+                embedding_matrix = self._embedding_matrix
+                product_ids = embedding_matrix.product_ids
+                if product_ids.dtype.kind == "S":
+                    #! The first upsert decodes the memory mapped product ids
+                    product_ids = np.asarray(
+                        self._decode_product_ids(product_ids), dtype=object
+                    )
+                if embedding_matrix.product_id_to_row is None:
+                    product_id_to_row = {
+                        product_id: row
+                        for row, product_id in enumerate(product_ids.tolist())
+                    }
+                else:
+                    product_id_to_row = dict(embedding_matrix.product_id_to_row)
+                num_products = len(product_ids)
+                rows: list[int] = []
+                new_product_ids: list[str] = []
+                for product_id in latest_embedded_product_details:
+                    row = product_id_to_row.get(product_id)
+                    if row is None:
+                        row = num_products + len(new_product_ids)
+                        product_id_to_row[product_id] = row
+                        new_product_ids.append(product_id)
+                    rows.append(row)
+
+                embeddings = np.empty(
+                    (num_products + len(new_product_ids), upserted_embeddings.shape[1]),
+                    dtype=np.float32,
+                )
+                if num_products > 0:
+                    embeddings[:num_products] = embedding_matrix.embeddings
+                embeddings[rows] = upserted_embeddings
+
+                cursor = embedding_matrix.cursor
+                for embedded_product_detail in latest_embedded_product_details.values():
+                    upserted_cursor = (
+                        embedded_product_detail.created_date,
+                        embedded_product_detail.product_id,
+                    )
+                    if cursor is None or upserted_cursor > cursor:
+                        cursor = upserted_cursor
+
+                self._embedding_matrix = _EmbeddingMatrix(
+                    product_ids=np.concatenate(
+                        [
+                            product_ids,
+                            np.asarray(new_product_ids, dtype=object),
+                        ]
+                    ),
+                    embeddings=embeddings,
+                    product_id_to_row=product_id_to_row,
+                    cursor=cursor,
+                )
+            return [True] * len(embedded_product_details)
+        except Exception as e:
+            logging.exception(e)
+            logging.error("Error upserting embeddings into the in-memory matrix!")
+            return [False] * len(embedded_product_details)
+
+    def _get_threshold(self, threshold: Optional[float]) -> float:
+        """Get threshold from input or default threshold"""
+        if threshold is None:
+            return self._default_threshold
+        return threshold
+
+    def _get_top_k(self, top_k: Optional[int]) -> int:
+        """Get top_k from input or default top_k"""
+        if top_k is None:
+            return self._default_top_k
+        return top_k
+
+    def _batch_generator(
+        self, data: Sequence[T], batch_size: int
+    ) -> Iterator[Sequence[T]]:
+        """Separate sequence of data into several batches based on batch sizes"""
+
+        for i in range(0, len(data), batch_size):
+            yield data[i : i + batch_size]
+
+    def _query_matrix(
+        self,
+        query_embeddings: npt.NDArray[np.float32],
+        threshold: float,
+        top_k: int,
+    ) -> list[list[tuple[str, float]]]:
+        """Query the top_k products above threshold for every row with one GEMM"""
+
+        #! Read the matrix once, a concurrent upsert swaps in a new one
+        embedding_matrix = self._embedding_matrix
+        num_products = len(embedding_matrix.embeddings)
+        top_k = min(top_k, num_products)
+        if top_k <= 0:
+            return [[] for _ in range(len(query_embeddings))]
+
+        scores = query_embeddings @ embedding_matrix.embeddings.T
+        if top_k < num_products:
+            #! argpartition is O(n) per row, only the top_k columns are sorted
+            top_indices = np.argpartition(-scores, top_k - 1, axis=1)[:, :top_k]
+        else:
+            top_indices = np.broadcast_to(
+                np.arange(num_products), (len(query_embeddings), num_products)
+            )
+        top_scores = np.take_along_axis(scores, top_indices, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind="stable")
+        top_indices = np.take_along_axis(top_indices, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+        results: list[list[tuple[str, float]]] = []
+        for row_indices, row_scores in zip(top_indices, top_scores):
+            mask = row_scores >= threshold
+            results.append(
+                list(
+                    zip(
+                        self._decode_product_ids(
+                            embedding_matrix.product_ids[row_indices[mask]]
+                        ),
+                        row_scores[mask].tolist(),
+                    )
+                )
+            )
+        return results
+
+    def _query_many(
+        self,
+        embedded_query_details_list: Sequence[EmbeddedQueryDetails],
+        threshold: Optional[float],
+        top_k: Optional[int],
+    ) -> list[Optional[list[tuple[str, float]]]]:
+        """Query similar product details for a batch of embedded queries"""
+
+        similar_products_results: list[Optional[list[tuple[str, float]]]] = []
+        for embedded_query_details_batch in self._batch_generator(
+            embedded_query_details_list, self._fetch_batch_size
+        ):
+            try:
+                query_embeddings = np.asarray(
+                    [
+                        embedded_query_details.embedding
+                        for embedded_query_details in embedded_query_details_batch
+                    ],
+                    dtype=np.float32,
+                )
+                similar_products_results.extend(
+                    self._query_matrix(
+                        query_embeddings,
+                        self._get_threshold(threshold),
+                        self._get_top_k(top_k),
+                    )
+                )
+            except Exception as e:
+                logging.exception(e)
+                logging.error("Error querying the in-memory embedding matrix!")
+                similar_products_results.extend(
+                    [None] * len(embedded_query_details_batch)
+                )
+        return similar_products_results
+
+    @override
+    def close(self) -> bool:
+        return True
@@ -23,6 +23,7 @@ class OpenSearchQuerySimilarProductDetailsClient(QuerySimilarProductDetailsUseCa
         default_top_k: int,
         fetch_batch_size: int,
         timeout: Optional[int] = None,
+        use_msearch: bool = True,
     ) -> None:
         super().__init__()
         self._client = OpenSearch(
@@ -40,6 +41,7 @@ class OpenSearchQuerySimilarProductDetailsClient(QuerySimilarProductDetailsUseCa
         self._default_threshold = default_threshold
         self._default_top_k = default_top_k
         self._fetch_batch_size = fetch_batch_size
+        self._use_msearch = use_msearch
 
     @overload
     def query(
@@ -90,6 +92,37 @@ class OpenSearchQuerySimilarProductDetailsClient(QuerySimilarProductDetailsUseCa
         for i in range(0, len(data), batch_size):
             yield data[i : i + batch_size]
 
+    def _build_query(
+        self,
+        embedded_query_details: EmbeddedQueryDetails,
+        threshold: Optional[float],
+        top_k: Optional[int],
+    ) -> dict:
+        """Build the kNN query body of an embedded query"""
+        return {
+            "size": self._get_top_k(top_k),
+            "query": {
+                "knn": {
+                    "product_embedding": {
+                        "vector": embedded_query_details.embedding,
+                        "k": self._get_top_k(top_k),
+                    }
+                }
+            },
+            #! Check https://opensearch.org/docs/latest/search-plugins/knn/approximate-knn/ for the score calculation
+            #! For the min_score, we have to convert from cosine similarity to the formula below
+            "min_score": (1 + self._get_threshold(threshold)) / 2,
+        }
+
+    def _parse_hits(self, result: dict) -> list[tuple[str, float]]:
+        """Convert the hits of a search response to (product_id, score) tuples"""
+        return [
+            #! Check https://opensearch.org/docs/latest/search-plugins/knn/approximate-knn/ for the score calculation
+            #! 3 - 2 * hit["_score"] is the cosine similarity according to opensearch
+            (hit["_source"]["product_id"], 2 * hit["_score"] - 1)
+            for hit in result["hits"]["hits"]
+        ]
+
     def _query_single(
         self,
         embedded_query_details: EmbeddedQueryDetails,
@@ -98,51 +131,81 @@ class OpenSearchQuerySimilarProductDetailsClient(QuerySimilarProductDetailsUseCa
     ) -> Optional[list[tuple[str, float]]]:
         """Query a similar product details based on threshold and top_k from the database"""
         try:
-            query = {
-                "size": self._get_top_k(top_k),
-                "query": {
-                    "knn": {
-                        "product_embedding": {
-                            "vector": embedded_query_details.embedding,
-                            "k": self._get_top_k(top_k),
-                        }
-                    }
-                },
-                #! Check https://opensearch.org/docs/latest/search-plugins/knn/approximate-knn/ for the score calculation
-                #! For the min_score, we have to convert from cosine similarity to the formula below
-                "min_score": (1 + self._get_threshold(threshold)) / 2,
-            }
-
             result = self._client.search(
                 index=self._index_name,
-                body=query,
+                body=self._build_query(embedded_query_details, threshold, top_k),
                 _source_includes=["product_id"],
             )
 
-            return [
-                #! Check https://opensearch.org/docs/latest/search-plugins/knn/approximate-knn/ for the score calculation
-                #! 3 - 2 * hit["_score"] is the cosine similarity according to opensearch
-                (hit["_source"]["product_id"], 2 * hit["_score"] - 1)
-                for hit in result["hits"]["hits"]
-            ]
+            return self._parse_hits(result)
         except Exception as e:
             logging.exception(e)
             logging.error("Error getting OpenSearch connection!")
             return None
 
+    def _query_msearch(
+        self,
+        embedded_query_details_batch: Sequence[EmbeddedQueryDetails],
+        threshold: Optional[float],
+        top_k: Optional[int],
+    ) -> list[Optional[list[tuple[str, float]]]]:
+        """Query a batch of embedded queries in one _msearch request.
+
+        A failed query only maps its own result to None, while a failed
+        request raises so the caller can fall back to one search per query.
+        """
+
+        body: list[dict] = []
+        for embedded_query_details in embedded_query_details_batch:
+            body.append({"index": self._index_name})
+            body.append(
+                {
+                    **self._build_query(embedded_query_details, threshold, top_k),
+                    "_source": {"includes": ["product_id"]},
+                }
+            )
+
+        result = self._client.msearch(body=body, index=self._index_name)
+
+        similar_products_results: list[Optional[list[tuple[str, float]]]] = []
+        for response in result["responses"]:
+            if "error" in response:
+                logging.error(f"Error querying OpenSearch: {response['error']}!")
+                similar_products_results.append(None)
+                continue
+            similar_products_results.append(self._parse_hits(response))
+        if len(similar_products_results) != len(embedded_query_details_batch):
+            raise ValueError(
+                f"Got {len(similar_products_results)} msearch responses for {len(embedded_query_details_batch)} queries!"
+            )
+        return similar_products_results
+
     def _query_many(
         self,
         embedded_query_details_list: Sequence[EmbeddedQueryDetails],
         threshold: Optional[float],
         top_k: Optional[int],
-    ) -> Optional[list[tuple[str, float]]]:
-        """Fetch a batch of product details from the database"""
+    ) -> list[Optional[list[tuple[str, float]]]]:
+        """Query similar product details for a batch of embedded queries"""
 
         similar_products_results: list[Optional[list[tuple[str, float]]]] = []
         with ThreadPoolExecutor(max_workers=10) as executor:
             for embedded_query_details_batch in self._batch_generator(
                 embedded_query_details_list, self._fetch_batch_size
             ):
+                if self._use_msearch:
+                    try:
+                        similar_products_results.extend(
+                            self._query_msearch(
+                                embedded_query_details_batch, threshold, top_k
+                            )
+                        )
+                        continue
+                    except Exception as e:
+                        logging.exception(e)
+                        logging.error(
+                            "Error querying OpenSearch with msearch, falling back to search!"
+                        )
                 try:
                     similar_products_results.extend(
                         executor.map(
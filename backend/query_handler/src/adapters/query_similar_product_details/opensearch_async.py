@@ -0,0 +1,228 @@
+from usecases import AsyncQuerySimilarProductDetailsUseCase
+from entities import EmbeddedQueryDetails
+from opensearchpy import (
+    AsyncOpenSearch,
+    AsyncHttpConnection,
+    AWSV4SignerAsyncAuth,
+)
+from typing import Optional, Sequence, overload, TypeVar, Iterator
+from typing_extensions import override
+import asyncio
+import logging
+
+T = TypeVar("T")
+
+
+class AsyncOpenSearchQuerySimilarProductDetailsClient(
+    AsyncQuerySimilarProductDetailsUseCase
+):
+    def __init__(
+        self,
+        opensearch_endpoint: str,
+        index_name: str,
+        master_auth: AWSV4SignerAsyncAuth | tuple[str, str],
+        default_threshold: float,
+        default_top_k: int,
+        fetch_batch_size: int,
+        timeout: Optional[int] = None,
+        use_msearch: bool = True,
+    ) -> None:
+        super().__init__()
+        self._client = AsyncOpenSearch(
+            hosts=opensearch_endpoint,
+            http_auth=master_auth,
+            http_compress=True,
+            use_ssl=False,
+            verify_certs=False,
+            ssl_assert_hostname=False,
+            ssl_show_warn=False,
+            connection_class=AsyncHttpConnection,
+            timeout=timeout,
+        )
+        self._index_name = index_name
+        self._default_threshold = default_threshold
+        self._default_top_k = default_top_k
+        self._fetch_batch_size = fetch_batch_size
+        self._use_msearch = use_msearch
+
+    @overload
+    async def query(
+        self,
+        embedded_query_details: EmbeddedQueryDetails,
+        threshold: Optional[float],
+        top_k: Optional[int],
+    ) -> Optional[list[tuple[str, float]]]:
+        ...
+
+    @overload
+    async def query(
+        self,
+        embedded_query_details: Sequence[EmbeddedQueryDetails],
+        threshold: Optional[float],
+        top_k: Optional[int],
+    ) -> list[Optional[list[tuple[str, float]]]]:
+        ...
+
+    @override
+    async def query(
+        self,
+        embedded_query_details: EmbeddedQueryDetails | Sequence[EmbeddedQueryDetails],
+        threshold: Optional[float],
+        top_k: Optional[int],
+    ) -> Optional[list[tuple[str, float]]] | list[Optional[list[tuple[str, float]]]]:
+        if isinstance(embedded_query_details, EmbeddedQueryDetails):
+            return await self._query_single(embedded_query_details, threshold, top_k)
+        return await self._query_many(embedded_query_details, threshold, top_k)
+
+    def _get_threshold(self, threshold: Optional[float]) -> float:
+        """Get threshold from input or default threshold"""
+        if threshold is None:
+            return self._default_threshold
+        return threshold
+
+    def _get_top_k(self, top_k: Optional[int]) -> int:
+        """Get top_k from input or default top_k"""
+        if top_k is None:
+            return self._default_top_k
+        return top_k
+
+    def _batch_generator(
+        self, data: Sequence[T], batch_size: int
+    ) -> Iterator[Sequence[T]]:
+        """Separate sequence of data into several batches based on batch sizes"""
+
+        for i in range(0, len(data), batch_size):
+            yield data[i : i + batch_size]
+
+    def _build_query(
+        self,
+        embedded_query_details: EmbeddedQueryDetails,
+        threshold: Optional[float],
+        top_k: Optional[int],
+    ) -> dict:
+        """Build the kNN query body of an embedded query"""
+        return {
+            "size": self._get_top_k(top_k),
+            "query": {
+                "knn": {
+                    "product_embedding": {
+                        "vector": embedded_query_details.embedding,
+                        "k": self._get_top_k(top_k),
+                    }
+                }
+            },
+            #! Check https://opensearch.org/docs/latest/search-plugins/knn/approximate-knn/ for the score calculation
+            #! For the min_score, we have to convert from cosine similarity to the formula below
+            "min_score": (1 + self._get_threshold(threshold)) / 2,
+        }
+
+    def _parse_hits(self, result: dict) -> list[tuple[str, float]]:
+        """Convert the hits of a search response to (product_id, score) tuples"""
+        return [
+            #! Check https://opensearch.org/docs/latest/search-plugins/knn/approximate-knn/ for the score calculation
+            #! 3 - 2 * hit["_score"] is the cosine similarity according to opensearch
+            (hit["_source"]["product_id"], 2 * hit["_score"] - 1)
+            for hit in result["hits"]["hits"]
+        ]
+
+    async def _query_single(
+        self,
+        embedded_query_details: EmbeddedQueryDetails,
+        threshold: Optional[float],
+        top_k: Optional[int],
+    ) -> Optional[list[tuple[str, float]]]:
+        """Query a similar product details based on threshold and top_k from the database"""
+        try:
+            result = await self._client.search(
+                index=self._index_name,
+                body=self._build_query(embedded_query_details, threshold, top_k),
+                _source_includes=["product_id"],
+            )
+
+            return self._parse_hits(result)
+        except Exception as e:
+            logging.exception(e)
+            logging.error("Error getting OpenSearch connection!")
+            return None
+
+    async def _query_msearch(
+        self,
+        embedded_query_details_batch: Sequence[EmbeddedQueryDetails],
+        threshold: Optional[float],
+        top_k: Optional[int],
+    ) -> list[Optional[list[tuple[str, float]]]]:
+        """Query a batch of embedded queries in one _msearch request.
+
+        A failed query only maps its own result to None, while a failed
+        request raises so the caller can fall back to one search per query.
+        """
+
+        body: list[dict] = []
+        for embedded_query_details in embedded_query_details_batch:
+            body.append({"index": self._index_name})
+            body.append(
+                {
+                    **self._build_query(embedded_query_details, threshold, top_k),
+                    "_source": {"includes": ["product_id"]},
+                }
+            )
+
+        result = await self._client.msearch(body=body, index=self._index_name)
+
+        similar_products_results: list[Optional[list[tuple[str, float]]]] = []
+        for response in result["responses"]:
+            if "error" in response:
+                logging.error(f"Error querying OpenSearch: {response['error']}!")
+                similar_products_results.append(None)
+                continue
+            similar_products_results.append(self._parse_hits(response))
+        if len(similar_products_results) != len(embedded_query_details_batch):
+            raise ValueError(
+                f"Got {len(similar_products_results)} msearch responses for {len(embedded_query_details_batch)} queries!"
+            )
+        return similar_products_results
+
+    async def _query_many(
+        self,
+        embedded_query_details_list: Sequence[EmbeddedQueryDetails],
+        threshold: Optional[float],
+        top_k: Optional[int],
+    ) -> list[Optional[list[tuple[str, float]]]]:
+        """Query similar product details for a batch of embedded queries"""
+
+        similar_products_results: list[Optional[list[tuple[str, float]]]] = []
+        for embedded_query_details_batch in self._batch_generator(
+            embedded_query_details_list, self._fetch_batch_size
+        ):
+            if self._use_msearch:
+                try:
+                    similar_products_results.extend(
+                        await self._query_msearch(
+                            embedded_query_details_batch, threshold, top_k
+                        )
+                    )
+                    continue
+                except Exception as e:
+                    logging.exception(e)
+                    logging.error(
+                        "Error querying OpenSearch with msearch, falling back to search!"
+                    )
+            similar_products_results.extend(
+                await asyncio.gather(
+                    *(
+                        self._query_single(embedded_query_details, threshold, top_k)
+                        for embedded_query_details in embedded_query_details_batch
+                    )
+                )
+            )
+        return similar_products_results
+
+    @override
+    async def close(self) -> bool:
+        try:
+            await self._client.close()
+            return True
+        except Exception as e:
+            logging.exception(e)
+            logging.error("Error closing opensearch client!")
+            return False
@@ -2,8 +2,8 @@ from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
 from usecases import QuerySimilarProductDetailsUseCase
 from entities import EmbeddedQueryDetails
-import psycopg2
-from psycopg2.extensions import connection
+from adapters.connection_pools.postgres import PostgresConnectionPool
+from psycopg2.extensions import connection, cursor as Cursor
 from typing import Optional, Sequence, overload, TypeVar, Iterator
 from typing_extensions import override
 import logging
@@ -14,27 +14,26 @@ T = TypeVar("T")
 class PostgresQuerySimilarProductDetailsClient(QuerySimilarProductDetailsUseCase):
     def __init__(
         self,
-        host: str,
-        port: int,
-        username: str,
-        password: str,
-        database: str,
+        connection_pool: PostgresConnectionPool,
         embedded_product_table_name: str,
         default_threshold: float,
         default_top_k: int,
         fetch_batch_size: int,
+        use_batched_query: bool = True,
+        index_type: Optional[str] = None,
+        hnsw_ef_search: Optional[int] = None,
+        ivfflat_probes: Optional[int] = None,
     ) -> None:
         super().__init__()
-        self._host = host
-        self._port = port
-        self._username = username
-        self._password = password
-        self._database = database
+        self._connection_pool = connection_pool
         self._embedded_product_table_name = embedded_product_table_name
         self._default_threshold = default_threshold
         self._default_top_k = default_top_k
         self._fetch_batch_size = fetch_batch_size
-        self._conn: Optional[connection] = None
+        self._use_batched_query = use_batched_query
+        self._index_type = index_type
+        self._hnsw_ef_search = hnsw_ef_search
+        self._ivfflat_probes = ivfflat_probes
 
     @overload
     def query(
@@ -67,15 +66,9 @@ class PostgresQuerySimilarProductDetailsClient(QuerySimilarProductDetailsUseCase
 
     @contextmanager
     def _get_conn(self) -> Iterator[connection]:
-        if self._conn is None or self._conn.closed:
-            self._conn = psycopg2.connect(
-                database=self._database,
-                user=self._username,
-                password=self._password,
-                host=self._host,
-                port=self._port,
-            )
-        yield self._conn
+        """Borrow a connection from the shared pool for the duration of a query"""
+        with self._connection_pool.connection() as conn:
+            yield conn
 
     def _get_threshold(self, threshold: Optional[float]) -> float:
         """Get threshold from input or default threshold"""
@@ -89,6 +82,18 @@ class PostgresQuerySimilarProductDetailsClient(QuerySimilarProductDetailsUseCase
             return self._default_top_k
         return top_k
 
+    def _set_index_options(self, cursor: Cursor, top_k: int) -> None:
+        """Tune the ANN index scan for the current transaction only"""
+
+        if self._index_type == "hnsw" and self._hnsw_ef_search is not None:
+            #! An HNSW scan returns at most ef_search rows, which is capped at 1000
+            cursor.execute(
+                "SET LOCAL hnsw.ef_search = %s",
+                (min(max(self._hnsw_ef_search, top_k), 1000),),
+            )
+        elif self._index_type == "ivfflat" and self._ivfflat_probes is not None:
+            cursor.execute("SET LOCAL ivfflat.probes = %s", (self._ivfflat_probes,))
+
     def _batch_generator(
         self, data: Sequence[T], batch_size: int
     ) -> Iterator[Sequence[T]]:
@@ -121,6 +126,7 @@ class PostgresQuerySimilarProductDetailsClient(QuerySimilarProductDetailsUseCase
                     )
 
                     logging.info(f"{stmt = }")
+                    self._set_index_options(cursor, self._get_top_k(top_k))
                     cursor.execute(
                         stmt,
                         {
@@ -143,6 +149,78 @@ class PostgresQuerySimilarProductDetailsClient(QuerySimilarProductDetailsUseCase
             logging.error("Error getting Postgres connection!")
             return None
 
+    def _query_batch(
+        self,
+        embedded_query_details_batch: Sequence[EmbeddedQueryDetails],
+        threshold: Optional[float],
+        top_k: Optional[int],
+    ) -> Sequence[Optional[list[tuple[str, float]]]]:
+        """Query a batch of embedded queries in one statement and one round-trip"""
+        try:
+            with self._get_conn() as conn, conn.cursor() as cursor:
+                try:
+                    #! The vectors are sent as text, a nested float array would be
+                    #! flattened by unnest
+                    stmt = """
+                        WITH queries AS MATERIALIZED (
+                            SELECT
+                                query_index,
+                                query_embedding::vector AS query_embedding
+                            FROM unnest(%(embeddings)s::text[])
+                                WITH ORDINALITY AS q(query_embedding, query_index)
+                        )
+                        SELECT
+                            queries.query_index,
+                            similar_products.product_id,
+                            similar_products.score
+                        FROM queries
+                            CROSS JOIN LATERAL (
+                                SELECT
+                                    product_id,
+                                    (embedding <#> queries.query_embedding) * -1 AS score
+                                FROM {table_name}
+                                    WHERE embedding <#> queries.query_embedding <= (%(threshold)s * -1)
+                                    ORDER BY embedding <#> queries.query_embedding ASC
+                                LIMIT %(top_k)s
+                            ) AS similar_products
+                            ORDER BY queries.query_index ASC, similar_products.score DESC
+                        """.format(
+                        table_name=self._embedded_product_table_name,
+                    )
+
+                    self._set_index_options(cursor, self._get_top_k(top_k))
+                    cursor.execute(
+                        stmt,
+                        {
+                            "embeddings": [
+                                "["
+                                + ",".join(map(str, embedded_query_details.embedding))
+                                + "]"
+                                for embedded_query_details in embedded_query_details_batch
+                            ],
+                            "top_k": self._get_top_k(top_k),
+                            "threshold": self._get_threshold(threshold),
+                        },
+                    )
+                    similar_products_rows: list[list[tuple[str, float]]] = [
+                        [] for _ in embedded_query_details_batch
+                    ]
+                    for query_index, product_id, score in cursor.fetchall():
+                        #! WITH ORDINALITY counts from 1
+                        similar_products_rows[query_index - 1].append(
+                            (product_id, float(score))
+                        )
+                    return similar_products_rows
+                except Exception as e:
+                    logging.exception(e)
+                    logging.error("Error fetching product details from Postgres!")
+                    conn.rollback()
+                    return [None] * len(embedded_query_details_batch)
+        except Exception as e:
+            logging.exception(e)
+            logging.error("Error getting Postgres connection!")
+            return [None] * len(embedded_query_details_batch)
+
     def _query_many(
         self,
         embedded_query_details_list: Sequence[EmbeddedQueryDetails],
@@ -155,14 +233,21 @@ class PostgresQuerySimilarProductDetailsClient(QuerySimilarProductDetailsUseCase
         for embedded_query_details_batch in self._batch_generator(
             embedded_query_details_list, self._fetch_batch_size
         ):
+            if self._use_batched_query:
+                similar_products_results.extend(
+                    self._query_batch(embedded_query_details_batch, threshold, top_k)
+                )
+                continue
             try:
                 with ThreadPoolExecutor() as executor:
                     similar_products_results.extend(
                         executor.map(
                             self._query_single,
                             embedded_query_details_batch,
-                            [self._get_threshold(threshold)] * len(embedded_query_details_batch),
-                            [self._get_top_k(top_k)] * len(embedded_query_details_batch),
+                            [self._get_threshold(threshold)]
+                            * len(embedded_query_details_batch),
+                            [self._get_top_k(top_k)]
+                            * len(embedded_query_details_batch),
                         )
                     )
             except Exception as e:
@@ -175,12 +260,5 @@ class PostgresQuerySimilarProductDetailsClient(QuerySimilarProductDetailsUseCase
 
     @override
     def close(self) -> bool:
-        try:
-            if self._conn is None:
-                return True
-            self._conn.close()
-            return True
-        except Exception as e:
-            logging.exception(e)
-            logging.error("Error closing Postgres connection!")
-            return False
+        #! The connection pool is shared between clients and closed by its owner
+        return True
@@ -0,0 +1,42 @@
+from usecases import FetchEmbeddingSnapshotUseCase
+from entities import EmbeddingSnapshot
+from adapters.query_similar_product_details.in_memory import (
+    InMemoryQuerySimilarProductDetailsClient,
+)
+from typing import Optional
+
+
+class SnapshotQuerySimilarProductDetailsClient(
+    InMemoryQuerySimilarProductDetailsClient
+):
+    """Exact kNN over a read-only memory mapped embedding snapshot.
+
+    Neither the embedding matrix nor the product ids are copied into the
+    process, so the client is ready as soon as the snapshot is mapped and
+    every worker process shares the same pages. Only the product ids of the
+    results are decoded. An upsert would copy both into process memory, so
+    the deployments do not refresh this client; newly embedded products are
+    served by exporting a new snapshot version.
+    """
+
+    def __init__(
+        self,
+        fetch_embedding_snapshot_client: FetchEmbeddingSnapshotUseCase,
+        default_threshold: float,
+        default_top_k: int,
+        fetch_batch_size: int,
+        version: Optional[str] = None,
+    ) -> None:
+        self._snapshot = fetch_embedding_snapshot_client.fetch(version)
+        super().__init__(
+            product_ids=self._snapshot.product_ids,
+            embeddings=self._snapshot.embeddings,
+            default_threshold=default_threshold,
+            default_top_k=default_top_k,
+            fetch_batch_size=fetch_batch_size,
+            cursor=self._snapshot.cursor,
+        )
+
+    @property
+    def snapshot(self) -> EmbeddingSnapshot:
+        return self._snapshot
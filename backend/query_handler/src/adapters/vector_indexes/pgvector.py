@@ -0,0 +1,162 @@
+from contextlib import contextmanager
+from adapters.connection_pools.postgres import PostgresConnectionPool
+from psycopg2.extensions import connection
+from typing import ClassVar, Iterator, Optional
+import logging
+import math
+
+
+class PgvectorIndexManager:
+    """Create, rebuild and drop the pgvector ANN index of the embedded products.
+
+    The index always uses `vector_ip_ops`, so it serves the `<#>` inner product
+    ordering of PostgresQuerySimilarProductDetailsClient. Every statement runs
+    CONCURRENTLY, so the table stays writable while an index is built.
+    """
+
+    index_types: ClassVar[tuple[str, ...]] = ("hnsw", "ivfflat")
+
+    def __init__(
+        self,
+        connection_pool: PostgresConnectionPool,
+        embedded_product_table_name: str,
+        hnsw_m: int = 16,
+        hnsw_ef_construction: int = 64,
+        ivfflat_lists: Optional[int] = None,
+        maintenance_work_mem: Optional[str] = None,
+    ) -> None:
+        self._connection_pool = connection_pool
+        self._embedded_product_table_name = embedded_product_table_name
+        self._hnsw_m = hnsw_m
+        self._hnsw_ef_construction = hnsw_ef_construction
+        self._ivfflat_lists = ivfflat_lists
+        self._maintenance_work_mem = maintenance_work_mem
+
+    @property
+    def index_name(self) -> str:
+        return f"{self._embedded_product_table_name}_embedding_idx".lower()
+
+    @contextmanager
+    def _get_conn(self) -> Iterator[connection]:
+        """Borrow an autocommit connection, CONCURRENTLY cannot run in a transaction"""
+        with self._connection_pool.connection() as conn:
+            conn.rollback()
+            conn.autocommit = True
+            try:
+                yield conn
+            finally:
+                conn.autocommit = False
+
+    def _get_ivfflat_lists(self, conn: connection) -> int:
+        """Get the configured lists, or size them from the row count as pgvector
+        recommends: rows / 1000 up to 1M rows and sqrt(rows) above"""
+
+        if self._ivfflat_lists is not None:
+            return self._ivfflat_lists
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT COUNT(*) FROM {table_name}".format(
+                    table_name=self._embedded_product_table_name
+                )
+            )
+            (num_rows,) = cursor.fetchone()
+        if num_rows <= 1_000_000:
+            return max(num_rows // 1000, 1)
+        return int(math.sqrt(num_rows))
+
+    def _create_index(self, conn: connection, index_name: str, index_type: str) -> None:
+        if index_type == "hnsw":
+            index_method = "hnsw"
+            index_options = "m = {m}, ef_construction = {ef_construction}".format(
+                m=int(self._hnsw_m), ef_construction=int(self._hnsw_ef_construction)
+            )
+        elif index_type == "ivfflat":
+            #! IVFFlat clusters the rows present at build time, build it after loading
+            index_method = "ivfflat"
+            index_options = "lists = {lists}".format(
+                lists=int(self._get_ivfflat_lists(conn))
+            )
+        else:
+            raise ValueError(
+                f"Unknown index type {index_type}, expected one of {self.index_types}!"
+            )
+
+        with conn.cursor() as cursor:
+            if self._maintenance_work_mem is not None:
+                #! Building is much faster when the graph fits in maintenance_work_mem
+                cursor.execute(
+                    "SET maintenance_work_mem = %s", (self._maintenance_work_mem,)
+                )
+            stmt = """
+                CREATE INDEX CONCURRENTLY IF NOT EXISTS {index_name}
+                    ON {table_name}
+                    USING {index_method} (embedding vector_ip_ops)
+                    WITH ({index_options})
+                """.format(
+                index_name=index_name,
+                table_name=self._embedded_product_table_name,
+                index_method=index_method,
+                index_options=index_options,
+            )
+            logging.info(f"{stmt = }")
+            cursor.execute(stmt)
+
+    def create(self, index_type: str) -> bool:
+        """Create the index if it does not exist yet"""
+        try:
+            with self._get_conn() as conn:
+                self._create_index(conn, self.index_name, index_type)
+            return True
+        except Exception as e:
+            logging.exception(e)
+            logging.error("Error creating pgvector index!")
+            return False
+
+    def rebuild(self, index_type: str) -> bool:
+        """Build a new index aside and swap it in for the current one.
+
+        Queries keep using the current index until the swap, which also allows
+        switching the index type or re-sizing the IVFFlat lists as the catalog
+        grows.
+        """
+        new_index_name = f"{self.index_name}_new"
+        old_index_name = f"{self.index_name}_old"
+        try:
+            with self._get_conn() as conn:
+                with conn.cursor() as cursor:
+                    #! A failed CONCURRENTLY build leaves an invalid index behind
+                    cursor.execute(
+                        f"DROP INDEX CONCURRENTLY IF EXISTS {new_index_name}"
+                    )
+                    cursor.execute(
+                        f"DROP INDEX CONCURRENTLY IF EXISTS {old_index_name}"
+                    )
+                self._create_index(conn, new_index_name, index_type)
+                with conn.cursor() as cursor:
+                    #! Both renames run in one implicit transaction, so there is
+                    #! always an index to plan with
+                    cursor.execute(
+                        f"""
+                        ALTER INDEX IF EXISTS {self.index_name} RENAME TO {old_index_name};
+                        ALTER INDEX {new_index_name} RENAME TO {self.index_name};
+                        """
+                    )
+                    cursor.execute(
+                        f"DROP INDEX CONCURRENTLY IF EXISTS {old_index_name}"
+                    )
+            return True
+        except Exception as e:
+            logging.exception(e)
+            logging.error("Error rebuilding pgvector index!")
+            return False
+
+    def drop(self) -> bool:
+        """Drop the index if it exists"""
+        try:
+            with self._get_conn() as conn, conn.cursor() as cursor:
+                cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {self.index_name}")
+            return True
+        except Exception as e:
+            logging.exception(e)
+            logging.error("Error dropping pgvector index!")
+            return False
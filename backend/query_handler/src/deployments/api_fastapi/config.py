@@ -20,6 +20,13 @@ class PostgresConfig:
     )
     FETCH_BATCH_SIZE = int(os.environ.get("POSTGRES_FETCH_BATCH_SIZE", 1000))
     UPSERT_BATCH_SIZE = int(os.environ.get("POSTGRES_UPSERT_BATCH_SIZE", 1000))
+    POOL_MIN_SIZE = int(os.environ.get("POSTGRES_POOL_MIN_SIZE", 1))
+    POOL_MAX_SIZE = int(os.environ.get("POSTGRES_POOL_MAX_SIZE", 10))
+    POOL_MAX_IDLE_SECONDS = float(os.environ.get("POSTGRES_POOL_MAX_IDLE_SECONDS", 300))
+    POOL_MAX_LIFETIME_SECONDS = float(
+        os.environ.get("POSTGRES_POOL_MAX_LIFETIME_SECONDS", 30 * 60)
+    )
+    POOL_ACQUIRE_TIMEOUT = float(os.environ.get("POSTGRES_POOL_ACQUIRE_TIMEOUT", 30))
 
 
 class OpenSearchConfig:
@@ -39,6 +46,13 @@ class OpenSearchConfig:
 class OnnxEmbedConfig:
     ONNX_MODEL_PATH = str(os.environ.get("ONNX_MODEL_PATH"))
     TOKENIZER_PATH = str(os.environ.get("TOKENIZER_PATH"))
+    MICRO_BATCH_MAX_SIZE = int(os.environ.get("ONNX_MICRO_BATCH_MAX_SIZE", 32))
+    MICRO_BATCH_MAX_WAIT_MS = float(os.environ.get("ONNX_MICRO_BATCH_MAX_WAIT_MS", 5))
+
+
+class EmbedCacheConfig:
+    MAX_SIZE = int(os.environ.get("EMBED_CACHE_MAX_SIZE", 10000))
+    TTL_SECONDS = float(os.environ.get("EMBED_CACHE_TTL_SECONDS", 60 * 60))
 
 
 class AWSSageMakerEmbedConfig:
@@ -50,3 +64,45 @@ class AWSSageMakerEmbedConfig:
 class SearchSimilarProductsConfig:
     DEFAULT_LIMIT = int(os.environ.get("SEARCH_DEFAULT_LIMIT", 10))
     DEFAULT_THRESHOLD = float(os.environ.get("SEARCH_DEFAULT_THRESHOLD", 0.5))
+    #! One of "opensearch", "in_memory", "snapshot" or "hnsw"
+    BACKEND = str(os.environ.get("SEARCH_BACKEND", "opensearch"))
+    QUERY_BATCH_SIZE = int(os.environ.get("SEARCH_QUERY_BATCH_SIZE", 64))
+
+
+class SimilarProductsCacheConfig:
+    MAX_SIZE = int(os.environ.get("SIMILAR_PRODUCTS_CACHE_MAX_SIZE", 1000))
+    TTL_SECONDS = float(os.environ.get("SIMILAR_PRODUCTS_CACHE_TTL_SECONDS", 5 * 60))
+    WATERMARK_POLL_SECONDS = float(
+        os.environ.get("SIMILAR_PRODUCTS_CACHE_WATERMARK_POLL_SECONDS", 30)
+    )
+
+
+class ProductDetailsCacheConfig:
+    MAX_SIZE = int(os.environ.get("PRODUCT_DETAILS_CACHE_MAX_SIZE", 10000))
+    TTL_SECONDS = float(os.environ.get("PRODUCT_DETAILS_CACHE_TTL_SECONDS", 60 * 60))
+    STALENESS_CHECK_SECONDS = float(
+        os.environ.get("PRODUCT_DETAILS_CACHE_STALENESS_CHECK_SECONDS", 30)
+    )
+    STALENESS_LOOKBACK_SECONDS = float(
+        os.environ.get("PRODUCT_DETAILS_CACHE_STALENESS_LOOKBACK_SECONDS", 60)
+    )
+
+
+class EmbeddingSnapshotConfig:
+    SNAPSHOT_DIR = str(os.environ.get("EMBEDDING_SNAPSHOT_DIR", "./snapshots"))
+
+
+class HnswConfig:
+    INDEX_PATH = str(os.environ.get("HNSW_INDEX_PATH", "./hnsw/embedded_products.bin"))
+    EMBEDDING_DIMENSION = int(os.environ.get("HNSW_EMBEDDING_DIMENSION", 384))
+    MAX_ELEMENTS = int(os.environ.get("HNSW_MAX_ELEMENTS", 100000))
+    #! Same graph parameters as the OpenSearch embedded products mapping
+    M = int(os.environ.get("HNSW_M", 64))
+    EF_CONSTRUCTION = int(os.environ.get("HNSW_EF_CONSTRUCTION", 512))
+    EF_SEARCH = int(os.environ.get("HNSW_EF_SEARCH", 512))
+
+
+class IndexRefreshConfig:
+    POLL_SECONDS = float(os.environ.get("INDEX_REFRESH_POLL_SECONDS", 30))
+    #! Re-read products committed late with an older modified_date
+    LOOKBACK_SECONDS = float(os.environ.get("INDEX_REFRESH_LOOKBACK_SECONDS", 60))
@@ -1,26 +1,159 @@
+import asyncio
 import json
+import os
+import logging
+import asyncpg
 import boto3
 from fastapi import FastAPI
 from contextlib import asynccontextmanager
 from typing import AsyncIterator
 from adapters.embed_raw_query_details.onnx import OnnxEmbedRawQueryDetailsClient
+from adapters.embed_raw_query_details.micro_batching import (
+    MicroBatchingEmbedRawQueryDetailsClient,
+)
+from adapters.embed_raw_query_details.cached import CachedEmbedRawQueryDetailsClient
 
-from adapters.fetch_raw_product_details.postgres import (
-    PostgresFetchRawProductDetailsClient,
+from adapters.fetch_raw_product_details.postgres_async import (
+    AsyncPostgresFetchRawProductDetailsClient,
+)
+from adapters.fetch_raw_product_details.cached import (
+    AsyncCachedFetchRawProductDetailsClient,
+)
+from adapters.fetch_modified_product_ids.postgres_async import (
+    AsyncPostgresFetchModifiedProductIdsClient,
+)
+from adapters.query_similar_product_details.opensearch_async import (
+    AsyncOpenSearchQuerySimilarProductDetailsClient,
+)
+from adapters.fetch_embedded_products_watermark.postgres_async import (
+    AsyncPostgresFetchEmbeddedProductsWatermarkClient,
+)
+from adapters.query_similar_product_details.in_memory import (
+    EmbeddedProductsMatrixBuilder,
+    InMemoryQuerySimilarProductDetailsClient,
 )
-from adapters.query_similar_product_details.opensearch import (
-    OpenSearchQuerySimilarProductDetailsClient,
+from adapters.query_similar_product_details.snapshot import (
+    SnapshotQuerySimilarProductDetailsClient,
+)
+from adapters.query_similar_product_details.hnsw import (
+    HnswQuerySimilarProductDetailsClient,
+)
+from adapters.embedding_snapshots.local_file import LocalFileEmbeddingSnapshotStore
+from adapters.fetch_embedded_product_details.postgres_async import (
+    AsyncPostgresFetchEmbeddedProductDetailsClient,
+)
+from adapters.index_refreshers.polling import (
+    AsyncEmbeddedProductsIndexRefresher,
+    EmbeddedProductsIndexCursor,
+)
+from adapters.caches.similar_products import SimilarProductsResultCache
+from usecases import (
+    AsyncFetchEmbeddedProductsWatermarkUseCase,
+    AsyncFetchEmbeddedProductDetailsUseCase,
+    AsyncQuerySimilarProductDetailsUseCase,
+    UpsertEmbeddedProductDetailsUseCase,
 )
 from ...config import (
     PostgresConfig,
     OpenSearchConfig,
     OnnxEmbedConfig,
+    EmbedCacheConfig,
     SearchSimilarProductsConfig,
+    SimilarProductsCacheConfig,
+    ProductDetailsCacheConfig,
+    EmbeddingSnapshotConfig,
+    HnswConfig,
+    IndexRefreshConfig,
 )
 from onnxruntime import InferenceSession
 from transformers import AutoTokenizer
 
 
+async def poll_embedded_products_watermark(
+    similar_products_cache: SimilarProductsResultCache,
+    fetch_embedded_products_watermark_client: AsyncFetchEmbeddedProductsWatermarkUseCase,
+    poll_seconds: float,
+) -> None:
+    """Invalidate the similar products cache whenever new products are embedded"""
+
+    while True:
+        await asyncio.sleep(poll_seconds)
+        try:
+            if similar_products_cache.update_watermark(
+                await fetch_embedded_products_watermark_client.fetch()
+            ):
+                logging.info(
+                    "Embedded products watermark moved, similar products cache cleared"
+                )
+        except Exception as e:
+            logging.exception(e)
+            logging.error("Error polling the embedded products watermark!")
+
+
+async def poll_index_refresh(
+    index_refresher: AsyncEmbeddedProductsIndexRefresher,
+    poll_seconds: float,
+) -> None:
+    """Apply newly embedded products to the in-process index without a rebuild"""
+
+    while True:
+        await asyncio.sleep(poll_seconds)
+        try:
+            num_applied = await index_refresher.refresh()
+            if num_applied:
+                logging.info(f"Applied {num_applied} embedded products to the index")
+        except Exception as e:
+            logging.exception(e)
+            logging.error("Error refreshing the in-process index!")
+
+
+async def load_embedded_products_matrix(
+    fetch_embedded_product_details_client: AsyncFetchEmbeddedProductDetailsUseCase,
+    index_cursor: EmbeddedProductsIndexCursor,
+    page_size: int,
+) -> EmbeddedProductsMatrixBuilder:
+    """Page through all the embedded products into a matrix builder, recording
+    them as applied in the index cursor"""
+
+    embedded_products_matrix_builder = EmbeddedProductsMatrixBuilder()
+    while True:
+        embedded_product_details = await fetch_embedded_product_details_client.fetch(
+            embedded_products_matrix_builder.cursor, page_size
+        )
+        if embedded_product_details is None:
+            raise Exception("Error loading embedded product details!")
+        if not embedded_product_details:
+            return embedded_products_matrix_builder
+        embedded_products_matrix_builder.add(embedded_product_details)
+        index_cursor.add(embedded_product_details)
+
+
+async def build_hnsw_index(
+    hnsw_query_similar_product_details_client: HnswQuerySimilarProductDetailsClient,
+    fetch_embedded_product_details_client: AsyncFetchEmbeddedProductDetailsUseCase,
+    index_cursor: EmbeddedProductsIndexCursor,
+    page_size: int,
+) -> None:
+    """Page through all the embedded products into the HNSW index, recording
+    them as applied in the index cursor"""
+
+    cursor = None
+    while True:
+        embedded_product_details = await fetch_embedded_product_details_client.fetch(
+            cursor, page_size
+        )
+        if embedded_product_details is None:
+            raise Exception("Error loading embedded product details!")
+        if not embedded_product_details:
+            return
+        hnsw_query_similar_product_details_client.upsert(embedded_product_details)
+        index_cursor.add(embedded_product_details)
+        cursor = (
+            embedded_product_details[-1].created_date,
+            embedded_product_details[-1].product_id,
+        )
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncIterator[None]:
     try:
@@ -29,9 +162,17 @@ async def lifespan(app: FastAPI) -> AsyncIterator[None]:
         )
         tokenizer = AutoTokenizer.from_pretrained(OnnxEmbedConfig.TOKENIZER_PATH)
 
-        app.state.embed_raw_query_details_client = OnnxEmbedRawQueryDetailsClient(
-            inference_session=inference_session,
-            tokenizer=tokenizer,
+        app.state.embed_raw_query_details_client = CachedEmbedRawQueryDetailsClient(
+            embed_raw_query_details_client=MicroBatchingEmbedRawQueryDetailsClient(
+                embed_raw_query_details_client=OnnxEmbedRawQueryDetailsClient(
+                    inference_session=inference_session,
+                    tokenizer=tokenizer,
+                ),
+                max_batch_size=OnnxEmbedConfig.MICRO_BATCH_MAX_SIZE,
+                max_wait_ms=OnnxEmbedConfig.MICRO_BATCH_MAX_WAIT_MS,
+            ),
+            max_size=EmbedCacheConfig.MAX_SIZE,
+            ttl_seconds=EmbedCacheConfig.TTL_SECONDS,
         )
 
         secrets_manager_client = boto3.client("secretsmanager")
@@ -40,41 +181,187 @@ async def lifespan(app: FastAPI) -> AsyncIterator[None]:
         )
         postgres_secrets_dict = json.loads(postgres_secrets["SecretString"])
 
-        app.state.fetch_raw_product_details_client = (
-            PostgresFetchRawProductDetailsClient(
-                host=postgres_secrets_dict["host"],
-                port=int(postgres_secrets_dict["port"]),
-                username=postgres_secrets_dict["username"],
-                password=postgres_secrets_dict["password"],
-                database=PostgresConfig.POSTGRES_DB,
+        #! Every Postgres client of the server shares this pool, PostgresConnectionPool
+        #! is its psycopg2 counterpart for the synchronous Lambda clients
+        app.state.postgres_connection_pool = await asyncpg.create_pool(
+            host=postgres_secrets_dict["host"],
+            port=int(postgres_secrets_dict["port"]),
+            user=postgres_secrets_dict["username"],
+            password=postgres_secrets_dict["password"],
+            database=PostgresConfig.POSTGRES_DB,
+            min_size=PostgresConfig.POOL_MIN_SIZE,
+            max_size=PostgresConfig.POOL_MAX_SIZE,
+            max_inactive_connection_lifetime=PostgresConfig.POOL_MAX_IDLE_SECONDS,
+            timeout=PostgresConfig.POOL_ACQUIRE_TIMEOUT,
+        )
+
+        app.state.fetch_raw_product_details_client = AsyncCachedFetchRawProductDetailsClient(
+            fetch_raw_product_details_client=AsyncPostgresFetchRawProductDetailsClient(
+                connection_pool=app.state.postgres_connection_pool,
                 raw_product_table_name=PostgresConfig.RAW_PRODUCT_TABLE_NAME,
                 fetch_batch_size=PostgresConfig.FETCH_BATCH_SIZE,
-            )
+            ),
+            fetch_modified_product_ids_client=AsyncPostgresFetchModifiedProductIdsClient(
+                connection_pool=app.state.postgres_connection_pool,
+                raw_product_table_name=PostgresConfig.RAW_PRODUCT_TABLE_NAME,
+            ),
+            max_size=ProductDetailsCacheConfig.MAX_SIZE,
+            ttl_seconds=ProductDetailsCacheConfig.TTL_SECONDS,
+            staleness_check_seconds=ProductDetailsCacheConfig.STALENESS_CHECK_SECONDS,
+            staleness_lookback_seconds=ProductDetailsCacheConfig.STALENESS_LOOKBACK_SECONDS,
         )
 
-        opensearch_secrets = secrets_manager_client.get_secret_value(
-            SecretId=OpenSearchConfig.SECRETS_MANAGER_NAME
+        embedded_products_index_cursor = EmbeddedProductsIndexCursor(
+            lookback_seconds=IndexRefreshConfig.LOOKBACK_SECONDS
         )
-        opensearch_secrets_dict = json.loads(opensearch_secrets["SecretString"])
-
-        app.state.query_similar_product_details_client = (
-            OpenSearchQuerySimilarProductDetailsClient(
-                opensearch_endpoint=opensearch_secrets_dict["endpoint"],
-                index_name=OpenSearchConfig.OPENSEARCH_INDEX_NAME,
-                master_auth=(
-                    opensearch_secrets_dict["username"],
-                    opensearch_secrets_dict["password"],
+        if SearchSimilarProductsConfig.BACKEND == "snapshot":
+            app.state.query_similar_product_details_client = (
+                SnapshotQuerySimilarProductDetailsClient(
+                    fetch_embedding_snapshot_client=LocalFileEmbeddingSnapshotStore(
+                        EmbeddingSnapshotConfig.SNAPSHOT_DIR
+                    ),
+                    default_threshold=SearchSimilarProductsConfig.DEFAULT_THRESHOLD,
+                    default_top_k=SearchSimilarProductsConfig.DEFAULT_LIMIT,
+                    fetch_batch_size=SearchSimilarProductsConfig.QUERY_BATCH_SIZE,
+                )
+            )
+        elif SearchSimilarProductsConfig.BACKEND == "hnsw":
+            hnsw_index_exists = os.path.exists(HnswConfig.INDEX_PATH)
+            app.state.query_similar_product_details_client = (
+                HnswQuerySimilarProductDetailsClient(
+                    dimension=HnswConfig.EMBEDDING_DIMENSION,
+                    max_elements=HnswConfig.MAX_ELEMENTS,
+                    m=HnswConfig.M,
+                    ef_construction=HnswConfig.EF_CONSTRUCTION,
+                    ef_search=HnswConfig.EF_SEARCH,
+                    default_threshold=SearchSimilarProductsConfig.DEFAULT_THRESHOLD,
+                    default_top_k=SearchSimilarProductsConfig.DEFAULT_LIMIT,
+                    fetch_batch_size=SearchSimilarProductsConfig.QUERY_BATCH_SIZE,
+                    index_path=HnswConfig.INDEX_PATH,
+                )
+            )
+            #! A loaded index only knows its cursor, so the first refresh
+            #! re-applies the lookback window behind it
+            embedded_products_index_cursor = EmbeddedProductsIndexCursor(
+                lookback_seconds=IndexRefreshConfig.LOOKBACK_SECONDS,
+                cursor=app.state.query_similar_product_details_client.cursor,
+            )
+            if not hnsw_index_exists:
+                await build_hnsw_index(
+                    app.state.query_similar_product_details_client,
+                    AsyncPostgresFetchEmbeddedProductDetailsClient(
+                        connection_pool=app.state.postgres_connection_pool,
+                        embedded_product_table_name=PostgresConfig.EMBEDDED_PRODUCT_TABLE_NAME,
+                    ),
+                    embedded_products_index_cursor,
+                    PostgresConfig.FETCH_BATCH_SIZE,
+                )
+                os.makedirs(
+                    os.path.dirname(HnswConfig.INDEX_PATH) or ".", exist_ok=True
+                )
+                app.state.query_similar_product_details_client.save()
+        elif SearchSimilarProductsConfig.BACKEND == "in_memory":
+            embedded_products_matrix_builder = await load_embedded_products_matrix(
+                AsyncPostgresFetchEmbeddedProductDetailsClient(
+                    connection_pool=app.state.postgres_connection_pool,
+                    embedded_product_table_name=PostgresConfig.EMBEDDED_PRODUCT_TABLE_NAME,
                 ),
-                default_threshold=SearchSimilarProductsConfig.DEFAULT_THRESHOLD,
-                default_top_k=SearchSimilarProductsConfig.DEFAULT_LIMIT,
-                fetch_batch_size=PostgresConfig.FETCH_BATCH_SIZE,
-                timeout=OpenSearchConfig.TIMEOUT,
+                embedded_products_index_cursor,
+                PostgresConfig.FETCH_BATCH_SIZE,
+            )
+            product_ids, embeddings = embedded_products_matrix_builder.build()
+            app.state.query_similar_product_details_client = (
+                InMemoryQuerySimilarProductDetailsClient(
+                    product_ids=product_ids,
+                    embeddings=embeddings,
+                    default_threshold=SearchSimilarProductsConfig.DEFAULT_THRESHOLD,
+                    default_top_k=SearchSimilarProductsConfig.DEFAULT_LIMIT,
+                    fetch_batch_size=SearchSimilarProductsConfig.QUERY_BATCH_SIZE,
+                    cursor=embedded_products_matrix_builder.cursor,
+                )
+            )
+        else:
+            opensearch_secrets = secrets_manager_client.get_secret_value(
+                SecretId=OpenSearchConfig.SECRETS_MANAGER_NAME
+            )
+            opensearch_secrets_dict = json.loads(opensearch_secrets["SecretString"])
+
+            app.state.query_similar_product_details_client = (
+                AsyncOpenSearchQuerySimilarProductDetailsClient(
+                    opensearch_endpoint=opensearch_secrets_dict["endpoint"],
+                    index_name=OpenSearchConfig.OPENSEARCH_INDEX_NAME,
+                    master_auth=(
+                        opensearch_secrets_dict["username"],
+                        opensearch_secrets_dict["password"],
+                    ),
+                    default_threshold=SearchSimilarProductsConfig.DEFAULT_THRESHOLD,
+                    default_top_k=SearchSimilarProductsConfig.DEFAULT_LIMIT,
+                    fetch_batch_size=PostgresConfig.FETCH_BATCH_SIZE,
+                    timeout=OpenSearchConfig.TIMEOUT,
+                )
+            )
+
+        app.state.fetch_embedded_products_watermark_client = (
+            AsyncPostgresFetchEmbeddedProductsWatermarkClient(
+                connection_pool=app.state.postgres_connection_pool,
+                embedded_product_table_name=PostgresConfig.EMBEDDED_PRODUCT_TABLE_NAME,
+            )
+        )
+        app.state.similar_products_cache = SimilarProductsResultCache(
+            max_size=SimilarProductsCacheConfig.MAX_SIZE,
+            ttl_seconds=SimilarProductsCacheConfig.TTL_SECONDS,
+        )
+        app.state.similar_products_cache.update_watermark(
+            await app.state.fetch_embedded_products_watermark_client.fetch()
+        )
+        watermark_poller = asyncio.create_task(
+            poll_embedded_products_watermark(
+                app.state.similar_products_cache,
+                app.state.fetch_embedded_products_watermark_client,
+                SimilarProductsCacheConfig.WATERMARK_POLL_SECONDS,
             )
         )
 
+        index_refresh_poller = None
+        #! The snapshot is refreshed by publishing a new version, upserting into
+        #! it would copy the shared memory mapped matrix into every worker
+        if isinstance(
+            app.state.query_similar_product_details_client,
+            UpsertEmbeddedProductDetailsUseCase,
+        ) and not isinstance(
+            app.state.query_similar_product_details_client,
+            SnapshotQuerySimilarProductDetailsClient,
+        ):
+            index_refresh_poller = asyncio.create_task(
+                poll_index_refresh(
+                    AsyncEmbeddedProductsIndexRefresher(
+                        fetch_embedded_product_details_client=AsyncPostgresFetchEmbeddedProductDetailsClient(
+                            connection_pool=app.state.postgres_connection_pool,
+                            embedded_product_table_name=PostgresConfig.EMBEDDED_PRODUCT_TABLE_NAME,
+                        ),
+                        upsert_embedded_product_details_client=app.state.query_similar_product_details_client,
+                        index_cursor=embedded_products_index_cursor,
+                        page_size=PostgresConfig.FETCH_BATCH_SIZE,
+                    ),
+                    IndexRefreshConfig.POLL_SECONDS,
+                )
+            )
+
         yield
 
+        watermark_poller.cancel()
+        if index_refresh_poller is not None:
+            index_refresh_poller.cancel()
+
     finally:
         app.state.embed_raw_query_details_client.close()
-        app.state.fetch_raw_product_details_client.close()
-        app.state.query_similar_product_details_client.close()
+        await app.state.fetch_raw_product_details_client.close()
+        if isinstance(
+            app.state.query_similar_product_details_client,
+            AsyncQuerySimilarProductDetailsUseCase,
+        ):
+            await app.state.query_similar_product_details_client.close()
+        else:
+            app.state.query_similar_product_details_client.close()
+        await app.state.fetch_embedded_products_watermark_client.close()
+        await app.state.postgres_connection_pool.close()
@@ -1,5 +1,6 @@
 from datetime import datetime
 from fastapi import APIRouter, status, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import JSONResponse
 from fastapi.encoders import jsonable_encoder
 from ...utils.api_response import ApiResponseError
@@ -8,15 +9,44 @@ from .api_models import SimilarProductsRequestModel
 from usecases import (
     EmbedRawQueryDetailsUseCase,
     QuerySimilarProductDetailsUseCase,
+    AsyncQuerySimilarProductDetailsUseCase,
     FetchRawProductDetailsUseCase,
+    AsyncFetchRawProductDetailsUseCase,
 )
-from entities import RawQueryDetails
+from entities import RawQueryDetails, EmbeddedQueryDetails, RawProductDetails
+from adapters.caches.similar_products import SimilarProductsResultCache
 import logging
-from typing import cast
+from typing import Optional, cast
 
 router = APIRouter()
 
 
+async def query_similar_product_details(
+    client: QuerySimilarProductDetailsUseCase | AsyncQuerySimilarProductDetailsUseCase,
+    embedded_query_details: EmbeddedQueryDetails,
+    threshold: Optional[float],
+    top_k: Optional[int],
+) -> Optional[list[tuple[str, float]]]:
+    """Await async clients directly, run sync clients in the threadpool"""
+
+    if isinstance(client, AsyncQuerySimilarProductDetailsUseCase):
+        return await client.query(embedded_query_details, threshold, top_k)
+    return await run_in_threadpool(
+        client.query, embedded_query_details, threshold, top_k
+    )
+
+
+async def fetch_raw_product_details(
+    client: FetchRawProductDetailsUseCase | AsyncFetchRawProductDetailsUseCase,
+    product_ids: list[str],
+) -> list[Optional[RawProductDetails]]:
+    """Await async clients directly, run sync clients in the threadpool"""
+
+    if isinstance(client, AsyncFetchRawProductDetailsUseCase):
+        return await client.fetch(product_ids)
+    return await run_in_threadpool(client.fetch, product_ids)
+
+
 @router.post(
     "/similar_products",
     status_code=DEFAULT_STATUS_CODE,
@@ -24,7 +54,7 @@ router = APIRouter()
     responses=RESPONSES,
     response_model=ResponseClass,
 )
-def similar_products(
+async def similar_products(
     request: Request,
     request_model: SimilarProductsRequestModel,
 ) -> JSONResponse:
@@ -33,83 +63,115 @@ def similar_products(
             query=request_model.query, created_date=datetime.now()
         )
 
-        embedded_query_details = cast(
-            EmbedRawQueryDetailsUseCase,
-            request.app.state.embed_raw_query_details_client,
-        ).embed(raw_query_details)
-
-        if embedded_query_details is None:
-            return JSONResponse(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                content=jsonable_encoder(
-                    ResponseClass(
-                        message="Query Embedding failed",
-                        error=ApiResponseError(
-                            message=str(e),
-                            code="QUERY_EMBEDDING_FAILED",
-                        ),
-                    )
-                ),
+        similar_products_cache = cast(
+            SimilarProductsResultCache, request.app.state.similar_products_cache
+        )
+        #! Read the watermark before computing so a concurrent invalidation wins
+        watermark = similar_products_cache.watermark
+        similar_products_result = similar_products_cache.get(
+            request_model.query, request_model.threshold, request_model.limit
+        )
+
+        if similar_products_result is None:
+            #! Embedding is CPU bound, so it stays in the threadpool
+            embedded_query_details = await run_in_threadpool(
+                cast(
+                    EmbedRawQueryDetailsUseCase,
+                    request.app.state.embed_raw_query_details_client,
+                ).embed,
+                raw_query_details,
             )
 
-        similar_products_tuples = cast(
-            QuerySimilarProductDetailsUseCase,
-            request.app.state.query_similar_product_details_client,
-        ).query(
-            embedded_query_details,
-            request_model.threshold,
-            request_model.limit,
-        )
+            if embedded_query_details is None:
+                return JSONResponse(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    content=jsonable_encoder(
+                        ResponseClass(
+                            message="Query Embedding failed",
+                            error=ApiResponseError(
+                                message="Query Embedding failed",
+                                code="QUERY_EMBEDDING_FAILED",
+                            ),
+                        )
+                    ),
+                )
+
+            similar_products_tuples = await query_similar_product_details(
+                request.app.state.query_similar_product_details_client,
+                embedded_query_details,
+                request_model.threshold,
+                request_model.limit,
+            )
+
+            logging.info(f"{similar_products_tuples = }")
 
-        logging.info(f"{similar_products_tuples = }")
-
-        if similar_products_tuples is None:
-            return JSONResponse(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                content=jsonable_encoder(
-                    ResponseClass(
-                        message="Query Similar Products failed",
-                        error=ApiResponseError(
-                            message=str(e),
-                            code="QUERY_SIMILAR_PRODUCTS_FAILED",
-                        ),
-                    )
-                ),
+            if similar_products_tuples is None:
+                return JSONResponse(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    content=jsonable_encoder(
+                        ResponseClass(
+                            message="Query Similar Products failed",
+                            error=ApiResponseError(
+                                message="Query Similar Products failed",
+                                code="QUERY_SIMILAR_PRODUCTS_FAILED",
+                            ),
+                        )
+                    ),
+                )
+
+            similar_product_ids = [
+                product_id for product_id, _ in similar_products_tuples
+            ]
+            similar_product_scores = [score for _, score in similar_products_tuples]
+
+            similar_product_details = await fetch_raw_product_details(
+                request.app.state.fetch_raw_product_details_client,
+                similar_product_ids,
             )
 
-        similar_product_ids = [product_id for product_id, _ in similar_products_tuples]
-        similar_product_scores = [score for _, score in similar_products_tuples]
-
-        similar_product_details = cast(
-            FetchRawProductDetailsUseCase,
-            request.app.state.fetch_raw_product_details_client,
-        ).fetch(similar_product_ids)
-
-        logging.info(f"similar_product_details_ids = {[product.product_id if product is not None else None for product in similar_product_details]}")
-
-        if similar_product_details is None:
-            return JSONResponse(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                content=jsonable_encoder(
-                    ResponseClass(
-                        message="Fetch Similar Products failed",
-                        error=ApiResponseError(
-                            message=str(e),
-                            code="FETCH_SIMILAR_PRODUCTS_FAILED",
-                        ),
-                    )
-                ),
+            logging.info(
+                f"similar_product_details_ids = {[product.product_id if product is not None else None for product in similar_product_details]}"
             )
 
-        valid_similar_product_details = [
-            product for product in similar_product_details if product is not None
-        ]
+            if similar_product_details is None:
+                return JSONResponse(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    content=jsonable_encoder(
+                        ResponseClass(
+                            message="Fetch Similar Products failed",
+                            error=ApiResponseError(
+                                message="Fetch Similar Products failed",
+                                code="FETCH_SIMILAR_PRODUCTS_FAILED",
+                            ),
+                        )
+                    ),
+                )
+
+            valid_similar_product_details = [
+                product for product in similar_product_details if product is not None
+            ]
+
+            valid_similar_product_scores = [
+                score
+                for score, product in zip(
+                    similar_product_scores, similar_product_details
+                )
+                if product is not None
+            ]
 
-        valid_similar_product_scores = [
-            score
-            for score, product in zip(similar_product_scores, similar_product_details)
-            if product is not None
-        ]
+            similar_products_result = list(
+                zip(valid_similar_product_details, valid_similar_product_scores)
+            )
+            #! A product missing here may be a failed fetch, which must not be
+            #! cached as a truncated result
+            if len(valid_similar_product_details) == len(similar_product_details):
+                similar_products_cache.put(
+                    request_model.query,
+                    request_model.threshold,
+                    request_model.limit,
+                    similar_products_result,
+                    watermark,
+                )
 
         return JSONResponse(
             status_code=status.HTTP_201_CREATED,
@@ -131,10 +193,7 @@ def similar_products(
                                 "created_date": product.created_date,
                                 "score": min(1, max(-1, score)),
                             }
-                            for product, score in zip(
-                                valid_similar_product_details,
-                                valid_similar_product_scores,
-                            )
+                            for product, score in similar_products_result
                         ],
                         "query": request_model.query,
                         "created_date": datetime.now(),
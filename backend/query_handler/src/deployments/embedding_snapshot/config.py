@@ -0,0 +1,18 @@
+import os
+
+
+class PostgresConfig:
+    POSTGRES_HOST = str(os.environ.get("POSTGRES_HOST"))
+    POSTGRES_PORT = int(os.environ.get("POSTGRES_PORT", 5432))
+    POSTGRES_USER = str(os.environ.get("POSTGRES_USER"))
+    POSTGRES_PASSWORD = str(os.environ.get("POSTGRES_PASSWORD"))
+    POSTGRES_DB = str(os.environ.get("POSTGRES_DB"))
+    EMBEDDED_PRODUCT_TABLE_NAME = str(
+        os.environ.get("POSTGRES_EMBEDDED_PRODUCT_TABLE_NAME")
+    )
+    FETCH_BATCH_SIZE = int(os.environ.get("POSTGRES_FETCH_BATCH_SIZE", 1000))
+
+
+class EmbeddingSnapshotConfig:
+    SNAPSHOT_DIR = str(os.environ.get("EMBEDDING_SNAPSHOT_DIR", "./snapshots"))
+    KEEP_VERSIONS = int(os.environ.get("EMBEDDING_SNAPSHOT_KEEP_VERSIONS", 2))
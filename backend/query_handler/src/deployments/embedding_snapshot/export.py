@@ -0,0 +1,80 @@
+"""Export EMBEDDED_PRODUCTS into a new embedding snapshot version.
+
+Usage: python -m deployments.embedding_snapshot.export [--snapshot-dir DIR]
+"""
+
+from adapters.connection_pools.postgres import PostgresConnectionPool
+from adapters.embedding_snapshots.local_file import LocalFileEmbeddingSnapshotStore
+from adapters.fetch_embedded_product_details.postgres import (
+    PostgresFetchEmbeddedProductDetailsClient,
+)
+from adapters.query_similar_product_details.in_memory import (
+    EmbeddedProductsMatrixBuilder,
+)
+from .config import PostgresConfig, EmbeddingSnapshotConfig
+import argparse
+import logging
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="[%(asctime)s | %(levelname)s] (%(name)s) >> %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S",
+)
+
+
+def export_embedding_snapshot(snapshot_dir: str, keep_versions: int) -> str:
+    """Page through all the embedded products and write them as a snapshot"""
+
+    connection_pool = PostgresConnectionPool(
+        host=PostgresConfig.POSTGRES_HOST,
+        port=PostgresConfig.POSTGRES_PORT,
+        username=PostgresConfig.POSTGRES_USER,
+        password=PostgresConfig.POSTGRES_PASSWORD,
+        database=PostgresConfig.POSTGRES_DB,
+        min_size=0,
+        max_size=1,
+        max_idle_seconds=60,
+        max_lifetime_seconds=60 * 60,
+    )
+    try:
+        fetch_embedded_product_details_client = (
+            PostgresFetchEmbeddedProductDetailsClient(
+                connection_pool=connection_pool,
+                embedded_product_table_name=PostgresConfig.EMBEDDED_PRODUCT_TABLE_NAME,
+            )
+        )
+        embedded_products_matrix_builder = EmbeddedProductsMatrixBuilder()
+        while True:
+            embedded_product_details = fetch_embedded_product_details_client.fetch(
+                embedded_products_matrix_builder.cursor,
+                PostgresConfig.FETCH_BATCH_SIZE,
+            )
+            if embedded_product_details is None:
+                raise Exception("Error exporting embedded product details!")
+            if not embedded_product_details:
+                break
+            embedded_products_matrix_builder.add(embedded_product_details)
+
+        product_ids, embeddings = embedded_products_matrix_builder.build()
+        version = LocalFileEmbeddingSnapshotStore(snapshot_dir).write(
+            product_ids,
+            embeddings,
+            embedded_products_matrix_builder.cursor,
+            keep_versions=keep_versions,
+        )
+        logging.info(
+            f"Exported {len(product_ids)} embedded products to snapshot {version}"
+        )
+        return version
+    finally:
+        connection_pool.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--snapshot-dir", default=EmbeddingSnapshotConfig.SNAPSHOT_DIR)
+    parser.add_argument(
+        "--keep-versions", type=int, default=EmbeddingSnapshotConfig.KEEP_VERSIONS
+    )
+    args = parser.parse_args()
+    export_embedding_snapshot(args.snapshot_dir, args.keep_versions)
@@ -1,5 +1,7 @@
 from datetime import datetime
 import json
+import os
+from time import monotonic
 from typing import Optional, cast
 import boto3
 import json
@@ -18,22 +20,61 @@ from usecases import (
     EmbedRawQueryDetailsUseCase,
     FetchRawProductDetailsUseCase,
     QuerySimilarProductDetailsUseCase,
+    FetchEmbeddedProductsWatermarkUseCase,
+    FetchEmbeddedProductDetailsUseCase,
+    UpsertEmbeddedProductDetailsUseCase,
 )
 from adapters.embed_raw_query_details.aws_sagemaker import (
     AWSSageMakerEmbedRawQueryDetailsClient,
 )
+from adapters.embed_raw_query_details.cached import CachedEmbedRawQueryDetailsClient
+from adapters.connection_pools.postgres import PostgresConnectionPool
 from adapters.fetch_raw_product_details.postgres import (
     PostgresFetchRawProductDetailsClient,
 )
+from adapters.fetch_raw_product_details.cached import (
+    CachedFetchRawProductDetailsClient,
+)
+from adapters.fetch_modified_product_ids.postgres import (
+    PostgresFetchModifiedProductIdsClient,
+)
 from adapters.query_similar_product_details.postgres import (
     PostgresQuerySimilarProductDetailsClient,
 )
+from adapters.query_similar_product_details.in_memory import (
+    EmbeddedProductsMatrixBuilder,
+    InMemoryQuerySimilarProductDetailsClient,
+)
+from adapters.query_similar_product_details.snapshot import (
+    SnapshotQuerySimilarProductDetailsClient,
+)
+from adapters.query_similar_product_details.hnsw import (
+    HnswQuerySimilarProductDetailsClient,
+)
+from adapters.embedding_snapshots.local_file import LocalFileEmbeddingSnapshotStore
+from adapters.fetch_embedded_product_details.postgres import (
+    PostgresFetchEmbeddedProductDetailsClient,
+)
+from adapters.fetch_embedded_products_watermark.postgres import (
+    PostgresFetchEmbeddedProductsWatermarkClient,
+)
+from adapters.index_refreshers.polling import (
+    EmbeddedProductsIndexRefresher,
+    EmbeddedProductsIndexCursor,
+)
+from adapters.caches.similar_products import SimilarProductsResultCache
 from .config import (
     PostgresConfig,
     OnnxEmbedConfig,
     SearchSimilarProductsConfig,
     ProjectConfig,
     AWSSageMakerEmbedConfig,
+    EmbedCacheConfig,
+    SimilarProductsCacheConfig,
+    ProductDetailsCacheConfig,
+    EmbeddingSnapshotConfig,
+    HnswConfig,
+    IndexRefreshConfig,
 )
 
 logger = Logger(level=ProjectConfig.LOG_LEVEL)
@@ -48,9 +89,18 @@ tracer = Tracer(service="query_handler")
 cors_config = CORSConfig(allow_origin="*", allow_headers=["*"], allow_credentials=True)
 app = APIGatewayHttpResolver(cors=cors_config)
 
+postgres_connection_pool: Optional[PostgresConnectionPool] = None
 embed_raw_query_details_client: Optional[EmbedRawQueryDetailsUseCase] = None
 fetch_raw_product_details_client: Optional[FetchRawProductDetailsUseCase] = None
 query_similar_product_details_client: Optional[QuerySimilarProductDetailsUseCase] = None
+fetch_embedded_products_watermark_client: Optional[
+    FetchEmbeddedProductsWatermarkUseCase
+] = None
+similar_products_cache: Optional[SimilarProductsResultCache] = None
+similar_products_cache_watermark_poll_time: Optional[float] = None
+embedded_products_index_cursor: Optional[EmbeddedProductsIndexCursor] = None
+index_refresher: Optional[EmbeddedProductsIndexRefresher] = None
+index_refresh_time: Optional[float] = None
 
 
 def get_secrets_manager_secrets(secret_name: str) -> dict[str, str]:
@@ -62,15 +112,41 @@ def get_secrets_manager_secrets(secret_name: str) -> dict[str, str]:
     return result
 
 
+def init_postgres_connection_pool() -> None:
+    global postgres_connection_pool
+    if postgres_connection_pool is not None:
+        return
+    postgres_secrets = get_secrets_manager_secrets(
+        secret_name=PostgresConfig.SECRETS_MANAGER_NAME
+    )
+    postgres_connection_pool = PostgresConnectionPool(
+        host=postgres_secrets["readerHost"],
+        port=int(postgres_secrets["readerPort"]),
+        username=postgres_secrets["username"],
+        password=postgres_secrets["password"],
+        database=PostgresConfig.POSTGRES_DB,
+        min_size=PostgresConfig.POOL_MIN_SIZE,
+        max_size=PostgresConfig.POOL_MAX_SIZE,
+        max_idle_seconds=PostgresConfig.POOL_MAX_IDLE_SECONDS,
+        max_lifetime_seconds=PostgresConfig.POOL_MAX_LIFETIME_SECONDS,
+        acquire_timeout=PostgresConfig.POOL_ACQUIRE_TIMEOUT,
+    )
+
+
 def init_embed_raw_query_details_client() -> None:
     global embed_raw_query_details_client
     if embed_raw_query_details_client is not None:
         return
 
-    embed_raw_query_details_client = AWSSageMakerEmbedRawQueryDetailsClient(
-        client_creator=lambda: boto3.client("sagemaker-runtime"),
-        endpoint_name=AWSSageMakerEmbedConfig.AWS_SAGEMAKER_ENDPOINT_NAME,
-        embed_batch_size=AWSSageMakerEmbedConfig.EMBED_BATCH_SIZE,
+    #! The cache lives as long as the warm Lambda container
+    embed_raw_query_details_client = CachedEmbedRawQueryDetailsClient(
+        embed_raw_query_details_client=AWSSageMakerEmbedRawQueryDetailsClient(
+            client_creator=lambda: boto3.client("sagemaker-runtime"),
+            endpoint_name=AWSSageMakerEmbedConfig.AWS_SAGEMAKER_ENDPOINT_NAME,
+            embed_batch_size=AWSSageMakerEmbedConfig.EMBED_BATCH_SIZE,
+        ),
+        max_size=EmbedCacheConfig.MAX_SIZE,
+        ttl_seconds=EmbedCacheConfig.TTL_SECONDS,
     )
 
 
@@ -78,24 +154,143 @@ def init_fetch_raw_product_details_client() -> None:
     global fetch_raw_product_details_client
     if fetch_raw_product_details_client is not None:
         return
-    postgres_secrets = get_secrets_manager_secrets(
-        secret_name=PostgresConfig.SECRETS_MANAGER_NAME
-    )
-    fetch_raw_product_details_client = PostgresFetchRawProductDetailsClient(
-        host=postgres_secrets["readerHost"],
-        port=int(postgres_secrets["readerPort"]),
-        username=postgres_secrets["username"],
-        password=postgres_secrets["password"],
-        database=PostgresConfig.POSTGRES_DB,
-        raw_product_table_name=PostgresConfig.RAW_PRODUCT_TABLE_NAME,
-        fetch_batch_size=PostgresConfig.FETCH_BATCH_SIZE,
+    fetch_raw_product_details_client = CachedFetchRawProductDetailsClient(
+        fetch_raw_product_details_client=PostgresFetchRawProductDetailsClient(
+            connection_pool=cast(PostgresConnectionPool, postgres_connection_pool),
+            raw_product_table_name=PostgresConfig.RAW_PRODUCT_TABLE_NAME,
+            fetch_batch_size=PostgresConfig.FETCH_BATCH_SIZE,
+        ),
+        fetch_modified_product_ids_client=PostgresFetchModifiedProductIdsClient(
+            connection_pool=cast(PostgresConnectionPool, postgres_connection_pool),
+            raw_product_table_name=PostgresConfig.RAW_PRODUCT_TABLE_NAME,
+        ),
+        max_size=ProductDetailsCacheConfig.MAX_SIZE,
+        ttl_seconds=ProductDetailsCacheConfig.TTL_SECONDS,
+        staleness_check_seconds=ProductDetailsCacheConfig.STALENESS_CHECK_SECONDS,
+        staleness_lookback_seconds=ProductDetailsCacheConfig.STALENESS_LOOKBACK_SECONDS,
     )
 
 
+def load_embedded_products_matrix(
+    fetch_embedded_product_details_client: FetchEmbeddedProductDetailsUseCase,
+    index_cursor: EmbeddedProductsIndexCursor,
+    page_size: int,
+) -> EmbeddedProductsMatrixBuilder:
+    """Page through all the embedded products into a matrix builder, recording
+    them as applied in the index cursor"""
+
+    embedded_products_matrix_builder = EmbeddedProductsMatrixBuilder()
+    while True:
+        embedded_product_details = fetch_embedded_product_details_client.fetch(
+            embedded_products_matrix_builder.cursor, page_size
+        )
+        if embedded_product_details is None:
+            raise Exception("Error loading embedded product details!")
+        if not embedded_product_details:
+            return embedded_products_matrix_builder
+        embedded_products_matrix_builder.add(embedded_product_details)
+        index_cursor.add(embedded_product_details)
+
+
+def build_hnsw_index(
+    hnsw_query_similar_product_details_client: HnswQuerySimilarProductDetailsClient,
+    fetch_embedded_product_details_client: FetchEmbeddedProductDetailsUseCase,
+    index_cursor: EmbeddedProductsIndexCursor,
+    page_size: int,
+) -> None:
+    """Page through all the embedded products into the HNSW index, recording
+    them as applied in the index cursor"""
+
+    cursor = None
+    while True:
+        embedded_product_details = fetch_embedded_product_details_client.fetch(
+            cursor, page_size
+        )
+        if embedded_product_details is None:
+            raise Exception("Error loading embedded product details!")
+        if not embedded_product_details:
+            return
+        hnsw_query_similar_product_details_client.upsert(embedded_product_details)
+        index_cursor.add(embedded_product_details)
+        cursor = (
+            embedded_product_details[-1].created_date,
+            embedded_product_details[-1].product_id,
+        )
+
+
 def init_query_similar_product_details_client() -> None:
-    global query_similar_product_details_client
+    global query_similar_product_details_client, embedded_products_index_cursor
     if query_similar_product_details_client is not None:
         return
+    embedded_products_index_cursor = EmbeddedProductsIndexCursor(
+        lookback_seconds=IndexRefreshConfig.LOOKBACK_SECONDS
+    )
+    if SearchSimilarProductsConfig.BACKEND == "snapshot":
+        query_similar_product_details_client = SnapshotQuerySimilarProductDetailsClient(
+            fetch_embedding_snapshot_client=LocalFileEmbeddingSnapshotStore(
+                EmbeddingSnapshotConfig.SNAPSHOT_DIR
+            ),
+            default_threshold=SearchSimilarProductsConfig.DEFAULT_THRESHOLD,
+            default_top_k=SearchSimilarProductsConfig.DEFAULT_LIMIT,
+            fetch_batch_size=SearchSimilarProductsConfig.QUERY_BATCH_SIZE,
+        )
+        return
+    if SearchSimilarProductsConfig.BACKEND == "hnsw":
+        #! Ship a prebuilt index file with the image, building is only a fallback
+        hnsw_index_exists = os.path.exists(HnswConfig.INDEX_PATH)
+        hnsw_query_similar_product_details_client = (
+            HnswQuerySimilarProductDetailsClient(
+                dimension=HnswConfig.EMBEDDING_DIMENSION,
+                max_elements=HnswConfig.MAX_ELEMENTS,
+                m=HnswConfig.M,
+                ef_construction=HnswConfig.EF_CONSTRUCTION,
+                ef_search=HnswConfig.EF_SEARCH,
+                default_threshold=SearchSimilarProductsConfig.DEFAULT_THRESHOLD,
+                default_top_k=SearchSimilarProductsConfig.DEFAULT_LIMIT,
+                fetch_batch_size=SearchSimilarProductsConfig.QUERY_BATCH_SIZE,
+                index_path=HnswConfig.INDEX_PATH,
+            )
+        )
+        #! A loaded index only knows its cursor, so the first refresh
+        #! re-applies the lookback window behind it
+        embedded_products_index_cursor = EmbeddedProductsIndexCursor(
+            lookback_seconds=IndexRefreshConfig.LOOKBACK_SECONDS,
+            cursor=hnsw_query_similar_product_details_client.cursor,
+        )
+        if not hnsw_index_exists:
+            build_hnsw_index(
+                hnsw_query_similar_product_details_client,
+                PostgresFetchEmbeddedProductDetailsClient(
+                    connection_pool=cast(
+                        PostgresConnectionPool, postgres_connection_pool
+                    ),
+                    embedded_product_table_name=PostgresConfig.EMBEDDED_PRODUCT_TABLE_NAME,
+                ),
+                embedded_products_index_cursor,
+                PostgresConfig.FETCH_BATCH_SIZE,
+            )
+        query_similar_product_details_client = hnsw_query_similar_product_details_client
+        return
+    if SearchSimilarProductsConfig.BACKEND == "in_memory":
+        #! Loaded once per cold start, warm invocations reuse the matrix
+        embedded_products_matrix_builder = load_embedded_products_matrix(
+            PostgresFetchEmbeddedProductDetailsClient(
+                connection_pool=cast(PostgresConnectionPool, postgres_connection_pool),
+                embedded_product_table_name=PostgresConfig.EMBEDDED_PRODUCT_TABLE_NAME,
+            ),
+            embedded_products_index_cursor,
+            PostgresConfig.FETCH_BATCH_SIZE,
+        )
+        product_ids, embeddings = embedded_products_matrix_builder.build()
+        query_similar_product_details_client = InMemoryQuerySimilarProductDetailsClient(
+            product_ids=product_ids,
+            embeddings=embeddings,
+            default_threshold=SearchSimilarProductsConfig.DEFAULT_THRESHOLD,
+            default_top_k=SearchSimilarProductsConfig.DEFAULT_LIMIT,
+            fetch_batch_size=SearchSimilarProductsConfig.QUERY_BATCH_SIZE,
+            cursor=embedded_products_matrix_builder.cursor,
+        )
+        return
     # opensearch_secrets = get_secrets_manager_secrets(
     #     secret_name=OpenSearchConfig.SECRETS_MANAGER_NAME
     # )
@@ -111,22 +306,103 @@ def init_query_similar_product_details_client() -> None:
     #     fetch_batch_size=PostgresConfig.FETCH_BATCH_SIZE,
     #     timeout=OpenSearchConfig.TIMEOUT,
     # )
-    postgres_secrets = get_secrets_manager_secrets(
-        secret_name=PostgresConfig.SECRETS_MANAGER_NAME
-    )
     query_similar_product_details_client = PostgresQuerySimilarProductDetailsClient(
-        host=postgres_secrets["readerHost"],
-        port=int(postgres_secrets["readerPort"]),
-        username=postgres_secrets["username"],
-        password=postgres_secrets["password"],
-        database=PostgresConfig.POSTGRES_DB,
+        connection_pool=cast(PostgresConnectionPool, postgres_connection_pool),
         embedded_product_table_name=PostgresConfig.EMBEDDED_PRODUCT_TABLE_NAME,
         default_threshold=SearchSimilarProductsConfig.DEFAULT_THRESHOLD,
         default_top_k=SearchSimilarProductsConfig.DEFAULT_LIMIT,
         fetch_batch_size=PostgresConfig.FETCH_BATCH_SIZE,
+        index_type=SearchSimilarProductsConfig.PGVECTOR_INDEX_TYPE,
+        hnsw_ef_search=SearchSimilarProductsConfig.PGVECTOR_HNSW_EF_SEARCH,
+        ivfflat_probes=SearchSimilarProductsConfig.PGVECTOR_IVFFLAT_PROBES,
     )
 
 
+def init_index_refresher() -> None:
+    global index_refresher
+    if index_refresher is not None:
+        return
+    #! Only the in-process backends have an index to refresh
+    if not isinstance(
+        query_similar_product_details_client, UpsertEmbeddedProductDetailsUseCase
+    ):
+        return
+    #! The snapshot is refreshed by publishing a new version, upserting into
+    #! it would copy the shared memory mapped matrix into the process
+    if isinstance(
+        query_similar_product_details_client, SnapshotQuerySimilarProductDetailsClient
+    ):
+        return
+    index_refresher = EmbeddedProductsIndexRefresher(
+        fetch_embedded_product_details_client=PostgresFetchEmbeddedProductDetailsClient(
+            connection_pool=cast(PostgresConnectionPool, postgres_connection_pool),
+            embedded_product_table_name=PostgresConfig.EMBEDDED_PRODUCT_TABLE_NAME,
+        ),
+        upsert_embedded_product_details_client=query_similar_product_details_client,
+        index_cursor=cast(EmbeddedProductsIndexCursor, embedded_products_index_cursor),
+        page_size=PostgresConfig.FETCH_BATCH_SIZE,
+    )
+
+
+def refresh_index() -> None:
+    """Apply the products embedded since the last refresh to the in-process index"""
+
+    global index_refresh_time
+    if index_refresher is None:
+        return
+    if (
+        index_refresh_time is not None
+        and monotonic() - index_refresh_time < IndexRefreshConfig.POLL_SECONDS
+    ):
+        return
+    index_refresh_time = monotonic()
+    num_applied = index_refresher.refresh()
+    if num_applied:
+        logger.info(f"Applied {num_applied} embedded products to the index")
+
+
+def init_fetch_embedded_products_watermark_client() -> None:
+    global fetch_embedded_products_watermark_client
+    if fetch_embedded_products_watermark_client is not None:
+        return
+    fetch_embedded_products_watermark_client = (
+        PostgresFetchEmbeddedProductsWatermarkClient(
+            connection_pool=cast(PostgresConnectionPool, postgres_connection_pool),
+            embedded_product_table_name=PostgresConfig.EMBEDDED_PRODUCT_TABLE_NAME,
+        )
+    )
+
+
+def init_similar_products_cache() -> None:
+    global similar_products_cache
+    if similar_products_cache is not None:
+        return
+    similar_products_cache = SimilarProductsResultCache(
+        max_size=SimilarProductsCacheConfig.MAX_SIZE,
+        ttl_seconds=SimilarProductsCacheConfig.TTL_SECONDS,
+    )
+
+
+def refresh_similar_products_cache_watermark() -> None:
+    """Invalidate the cached results if new products were embedded since the last poll"""
+
+    global similar_products_cache_watermark_poll_time
+    if (
+        similar_products_cache_watermark_poll_time is not None
+        and monotonic() - similar_products_cache_watermark_poll_time
+        < SimilarProductsCacheConfig.WATERMARK_POLL_SECONDS
+    ):
+        return
+    similar_products_cache_watermark_poll_time = monotonic()
+    if cast(SimilarProductsResultCache, similar_products_cache).update_watermark(
+        cast(
+            FetchEmbeddedProductsWatermarkUseCase,
+            fetch_embedded_products_watermark_client,
+        ).fetch()
+    ):
+        logger.info("Embedded products watermark moved, similar products cache cleared")
+
+
 @app.post("/api/similar_products")
 @tracer.capture_method
 def similar_products() -> Response:
@@ -143,75 +419,98 @@ def similar_products() -> Response:
             query=query_body["query"], created_date=datetime.now()
         )
 
-        embedded_query_details = cast(
-            EmbedRawQueryDetailsUseCase, embed_raw_query_details_client
-        ).embed(raw_query_details)
-
-        if embedded_query_details is None:
-            return Response(
-                status_code=INTERNAL_SERVER_ERROR_CODE,
-                content_type=content_types.APPLICATION_JSON,
-                body=json.dumps(
-                    {
-                        "message": "Query Embedding failed",
-                        "error": {
+        #! Read the watermark before computing so a concurrent invalidation wins
+        watermark = cast(SimilarProductsResultCache, similar_products_cache).watermark
+        similar_products_result = cast(
+            SimilarProductsResultCache, similar_products_cache
+        ).get(query_body["query"], query_body.get("threshold"), query_body.get("limit"))
+
+        if similar_products_result is None:
+            embedded_query_details = cast(
+                EmbedRawQueryDetailsUseCase, embed_raw_query_details_client
+            ).embed(raw_query_details)
+
+            if embedded_query_details is None:
+                return Response(
+                    status_code=INTERNAL_SERVER_ERROR_CODE,
+                    content_type=content_types.APPLICATION_JSON,
+                    body=json.dumps(
+                        {
                             "message": "Query Embedding failed",
-                            "code": "QUERY_EMBEDDING_FAILED",
-                        },
-                    }
-                ),
+                            "error": {
+                                "message": "Query Embedding failed",
+                                "code": "QUERY_EMBEDDING_FAILED",
+                            },
+                        }
+                    ),
+                )
+
+            similar_products_tuples = cast(
+                QuerySimilarProductDetailsUseCase, query_similar_product_details_client
+            ).query(
+                embedded_query_details,
+                query_body.get("threshold"),
+                query_body.get("limit"),
             )
 
-        similar_products_tuples = cast(
-            QuerySimilarProductDetailsUseCase, query_similar_product_details_client
-        ).query(
-            embedded_query_details, query_body.get("threshold"), query_body.get("limit")
-        )
-
-        logger.info(f"{similar_products_tuples = }")
+            logger.info(f"{similar_products_tuples = }")
 
-        if similar_products_tuples is None:
-            return Response(
-                status_code=INTERNAL_SERVER_ERROR_CODE,
-                content_type=content_types.APPLICATION_JSON,
-                body=json.dumps(
-                    {
-                        "message": "Query Similar Products failed",
-                        "error": {
+            if similar_products_tuples is None:
+                return Response(
+                    status_code=INTERNAL_SERVER_ERROR_CODE,
+                    content_type=content_types.APPLICATION_JSON,
+                    body=json.dumps(
+                        {
                             "message": "Query Similar Products failed",
-                            "code": "QUERY_SIMILAR_PRODUCTS_FAILED",
-                        },
-                    }
-                ),
-            )
-
-        similar_product_ids = [
-            similar_product_id for similar_product_id, _ in similar_products_tuples
-        ]
-        similar_product_scores = [
-            similar_product_score
-            for _, similar_product_score in similar_products_tuples
-        ]
-
-        similar_product_details = cast(
-            FetchRawProductDetailsUseCase, fetch_raw_product_details_client
-        ).fetch(similar_product_ids)
-
-        logger.info(f"similar_product_details_ids = {[product.product_id if product is not None else None for product in similar_product_details]}")
-
-        valid_similar_product_details = [
-            similar_product_detail
-            for similar_product_detail in similar_product_details
-            if similar_product_detail is not None
-        ]
-
-        valid_similar_product_scores = [
-            similar_product_score
-            for similar_product_detail, similar_product_score in zip(
-                similar_product_details, similar_product_scores
+                            "error": {
+                                "message": "Query Similar Products failed",
+                                "code": "QUERY_SIMILAR_PRODUCTS_FAILED",
+                            },
+                        }
+                    ),
+                )
+
+            similar_product_ids = [
+                similar_product_id for similar_product_id, _ in similar_products_tuples
+            ]
+            similar_product_scores = [
+                similar_product_score
+                for _, similar_product_score in similar_products_tuples
+            ]
+
+            similar_product_details = cast(
+                FetchRawProductDetailsUseCase, fetch_raw_product_details_client
+            ).fetch(similar_product_ids)
+
+            logger.info(f"similar_product_details_ids = {[product.product_id if product is not None else None for product in similar_product_details]}")
+
+            valid_similar_product_details = [
+                similar_product_detail
+                for similar_product_detail in similar_product_details
+                if similar_product_detail is not None
+            ]
+
+            valid_similar_product_scores = [
+                similar_product_score
+                for similar_product_detail, similar_product_score in zip(
+                    similar_product_details, similar_product_scores
+                )
+                if similar_product_detail is not None
+            ]
+
+            similar_products_result = list(
+                zip(valid_similar_product_details, valid_similar_product_scores)
             )
-            if similar_product_detail is not None
-        ]
+            #! A product missing here may be a failed fetch, which must not be
+            #! cached as a truncated result
+            if len(valid_similar_product_details) == len(similar_product_details):
+                cast(SimilarProductsResultCache, similar_products_cache).put(
+                    query_body["query"],
+                    query_body.get("threshold"),
+                    query_body.get("limit"),
+                    similar_products_result,
+                    watermark,
+                )
 
         return Response(
             status_code=SUCCESS_CODE,
@@ -238,10 +537,7 @@ def similar_products() -> Response:
                                 ),
                                 "score": min(1, max(-1, score)),
                             }
-                            for product, score in zip(
-                                valid_similar_product_details,
-                                valid_similar_product_scores,
-                            )
+                            for product, score in similar_products_result
                         ],
                         "query": query_body["query"],
                         "created_date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
@@ -288,8 +584,15 @@ def similar_products() -> Response:
 )
 @tracer.capture_lambda_handler
 def handler(event: dict, context: LambdaContext) -> dict:
+    init_postgres_connection_pool()
     init_embed_raw_query_details_client()
     init_fetch_raw_product_details_client()
     init_query_similar_product_details_client()
+    init_index_refresher()
+    init_fetch_embedded_products_watermark_client()
+    init_similar_products_cache()
+    #! Refresh the index first so results cached under a new watermark include it
+    refresh_index()
+    refresh_similar_products_cache_watermark()
 
     return app.resolve(event, context)
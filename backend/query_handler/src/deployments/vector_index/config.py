@@ -0,0 +1,25 @@
+import os
+
+
+class PostgresConfig:
+    POSTGRES_HOST = str(os.environ.get("POSTGRES_HOST"))
+    POSTGRES_PORT = int(os.environ.get("POSTGRES_PORT", 5432))
+    POSTGRES_USER = str(os.environ.get("POSTGRES_USER"))
+    POSTGRES_PASSWORD = str(os.environ.get("POSTGRES_PASSWORD"))
+    POSTGRES_DB = str(os.environ.get("POSTGRES_DB"))
+    EMBEDDED_PRODUCT_TABLE_NAME = str(
+        os.environ.get("POSTGRES_EMBEDDED_PRODUCT_TABLE_NAME")
+    )
+
+
+class PgvectorIndexConfig:
+    #! One of "hnsw" or "ivfflat"
+    INDEX_TYPE = str(os.environ.get("PGVECTOR_INDEX_TYPE", "hnsw"))
+    HNSW_M = int(os.environ.get("PGVECTOR_HNSW_M", 16))
+    HNSW_EF_CONSTRUCTION = int(os.environ.get("PGVECTOR_HNSW_EF_CONSTRUCTION", 64))
+    _IVFFLAT_LISTS = os.environ.get("PGVECTOR_IVFFLAT_LISTS")
+    if _IVFFLAT_LISTS is None:
+        IVFFLAT_LISTS = None
+    else:
+        IVFFLAT_LISTS = int(_IVFFLAT_LISTS)
+    MAINTENANCE_WORK_MEM = os.environ.get("PGVECTOR_MAINTENANCE_WORK_MEM")
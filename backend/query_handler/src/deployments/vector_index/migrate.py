@@ -0,0 +1,67 @@
+"""Create, rebuild or drop the pgvector index of EMBEDDED_PRODUCTS.
+
+Usage: python -m deployments.vector_index.migrate {create,rebuild,drop} [--index-type {hnsw,ivfflat}]
+"""
+
+from adapters.connection_pools.postgres import PostgresConnectionPool
+from adapters.vector_indexes.pgvector import PgvectorIndexManager
+from .config import PostgresConfig, PgvectorIndexConfig
+import argparse
+import logging
+import sys
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="[%(asctime)s | %(levelname)s] (%(name)s) >> %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S",
+)
+
+
+def migrate_vector_index(action: str, index_type: str) -> bool:
+    """Run an index action against the embedded products table"""
+
+    connection_pool = PostgresConnectionPool(
+        host=PostgresConfig.POSTGRES_HOST,
+        port=PostgresConfig.POSTGRES_PORT,
+        username=PostgresConfig.POSTGRES_USER,
+        password=PostgresConfig.POSTGRES_PASSWORD,
+        database=PostgresConfig.POSTGRES_DB,
+        min_size=0,
+        max_size=1,
+        max_idle_seconds=60 * 60,
+        #! Building an index can take longer than any sensible connection lifetime
+        max_lifetime_seconds=24 * 60 * 60,
+    )
+    try:
+        pgvector_index_manager = PgvectorIndexManager(
+            connection_pool=connection_pool,
+            embedded_product_table_name=PostgresConfig.EMBEDDED_PRODUCT_TABLE_NAME,
+            hnsw_m=PgvectorIndexConfig.HNSW_M,
+            hnsw_ef_construction=PgvectorIndexConfig.HNSW_EF_CONSTRUCTION,
+            ivfflat_lists=PgvectorIndexConfig.IVFFLAT_LISTS,
+            maintenance_work_mem=PgvectorIndexConfig.MAINTENANCE_WORK_MEM,
+        )
+        if action == "create":
+            success = pgvector_index_manager.create(index_type)
+        elif action == "rebuild":
+            success = pgvector_index_manager.rebuild(index_type)
+        else:
+            success = pgvector_index_manager.drop()
+        if success:
+            logging.info(f"{action} {pgvector_index_manager.index_name} succeeded")
+        return success
+    finally:
+        connection_pool.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("action", choices=["create", "rebuild", "drop"])
+    parser.add_argument(
+        "--index-type",
+        choices=PgvectorIndexManager.index_types,
+        default=PgvectorIndexConfig.INDEX_TYPE,
+    )
+    args = parser.parse_args()
+    if not migrate_vector_index(args.action, args.index_type):
+        sys.exit(1)
@@ -1,2 +1,5 @@
 from .query_details import RawQueryDetails, EmbeddedQueryDetails
 from .raw_product_details import RawProductDetails
+from .embedded_product_details import EmbeddedProductDetails
+from .embedded_products_watermark import EmbeddedProductsWatermark
+from .embedding_snapshot import EmbeddingSnapshot
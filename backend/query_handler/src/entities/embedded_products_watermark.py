@@ -0,0 +1,9 @@
+from dataclasses import dataclass
+from datetime import datetime
+
+
+@dataclass(frozen=True, slots=True)
+class EmbeddedProductsWatermark:
+    modified_date: datetime
+    created_date: datetime
+    num_products: int
@@ -0,0 +1,20 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+import numpy.typing as npt
+import numpy as np
+
+
+@dataclass(frozen=True, slots=True)
+class EmbeddingSnapshot:
+    version: str
+    product_ids: npt.NDArray[np.bytes_]
+    embeddings: npt.NDArray[np.float32]
+    cursor: Optional[tuple[datetime, str]]
+
+    @property
+    def watermark(self) -> Optional[datetime]:
+        """The latest created_date contained in the snapshot"""
+        if self.cursor is None:
+            return None
+        return self.cursor[0]
@@ -1,3 +1,23 @@
 from .embed_raw_query_details import EmbedRawQueryDetailsUseCase
-from .fetch_raw_product_details import FetchRawProductDetailsUseCase
-from .query_similar_product_details import QuerySimilarProductDetailsUseCase
+from .fetch_raw_product_details import (
+    FetchRawProductDetailsUseCase,
+    AsyncFetchRawProductDetailsUseCase,
+)
+from .query_similar_product_details import (
+    QuerySimilarProductDetailsUseCase,
+    AsyncQuerySimilarProductDetailsUseCase,
+)
+from .fetch_embedded_products_watermark import (
+    FetchEmbeddedProductsWatermarkUseCase,
+    AsyncFetchEmbeddedProductsWatermarkUseCase,
+)
+from .fetch_modified_product_ids import (
+    FetchModifiedProductIdsUseCase,
+    AsyncFetchModifiedProductIdsUseCase,
+)
+from .fetch_embedded_product_details import (
+    FetchEmbeddedProductDetailsUseCase,
+    AsyncFetchEmbeddedProductDetailsUseCase,
+)
+from .upsert_embedded_product_details import UpsertEmbeddedProductDetailsUseCase
+from .fetch_embedding_snapshot import FetchEmbeddingSnapshotUseCase
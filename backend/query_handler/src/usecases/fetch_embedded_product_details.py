@@ -0,0 +1,32 @@
+from abc import abstractmethod, ABC
+from datetime import datetime
+from entities import EmbeddedProductDetails
+from typing import Optional
+
+
+class FetchEmbeddedProductDetailsUseCase(ABC):
+    @abstractmethod
+    def fetch(
+        self, cursor: Optional[tuple[datetime, str]], page_size: int
+    ) -> Optional[list[EmbeddedProductDetails]]:
+        """Fetch the page of embedded products ordered by (created_date, product_id)
+        right after the cursor, or the first page if the cursor is None"""
+        ...
+
+    @abstractmethod
+    def close(self) -> bool:
+        ...
+
+
+class AsyncFetchEmbeddedProductDetailsUseCase(ABC):
+    @abstractmethod
+    async def fetch(
+        self, cursor: Optional[tuple[datetime, str]], page_size: int
+    ) -> Optional[list[EmbeddedProductDetails]]:
+        """Fetch the page of embedded products ordered by (created_date, product_id)
+        right after the cursor, or the first page if the cursor is None"""
+        ...
+
+    @abstractmethod
+    async def close(self) -> bool:
+        ...
@@ -0,0 +1,23 @@
+from abc import abstractmethod, ABC
+from entities import EmbeddedProductsWatermark
+from typing import Optional
+
+
+class FetchEmbeddedProductsWatermarkUseCase(ABC):
+    @abstractmethod
+    def fetch(self) -> Optional[EmbeddedProductsWatermark]:
+        ...
+
+    @abstractmethod
+    def close(self) -> bool:
+        ...
+
+
+class AsyncFetchEmbeddedProductsWatermarkUseCase(ABC):
+    @abstractmethod
+    async def fetch(self) -> Optional[EmbeddedProductsWatermark]:
+        ...
+
+    @abstractmethod
+    async def close(self) -> bool:
+        ...
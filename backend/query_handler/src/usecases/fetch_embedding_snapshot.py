@@ -0,0 +1,14 @@
+from abc import abstractmethod, ABC
+from entities import EmbeddingSnapshot
+from typing import Optional
+
+
+class FetchEmbeddingSnapshotUseCase(ABC):
+    @abstractmethod
+    def fetch(self, version: Optional[str] = None) -> EmbeddingSnapshot:
+        """Fetch a snapshot version, the latest one if the version is None"""
+        ...
+
+    @abstractmethod
+    def close(self) -> bool:
+        ...
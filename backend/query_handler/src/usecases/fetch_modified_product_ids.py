@@ -0,0 +1,23 @@
+from abc import abstractmethod, ABC
+from datetime import datetime
+from typing import Optional
+
+
+class FetchModifiedProductIdsUseCase(ABC):
+    @abstractmethod
+    def fetch(self, modified_since: datetime) -> Optional[dict[str, datetime]]:
+        ...
+
+    @abstractmethod
+    def close(self) -> bool:
+        ...
+
+
+class AsyncFetchModifiedProductIdsUseCase(ABC):
+    @abstractmethod
+    async def fetch(self, modified_since: datetime) -> Optional[dict[str, datetime]]:
+        ...
+
+    @abstractmethod
+    async def close(self) -> bool:
+        ...
@@ -21,3 +21,25 @@ class FetchRawProductDetailsUseCase(ABC):
     @abstractmethod
     def close(self) -> bool:
         ...
+
+
+class AsyncFetchRawProductDetailsUseCase(ABC):
+    @overload
+    async def fetch(self, product_id: str) -> Optional[RawProductDetails]:
+        ...
+
+    @overload
+    async def fetch(
+        self, product_id: Sequence[str]
+    ) -> list[Optional[RawProductDetails]]:
+        ...
+
+    @abstractmethod
+    async def fetch(
+        self, product_id: str | Sequence[str]
+    ) -> Optional[RawProductDetails] | list[Optional[RawProductDetails]]:
+        ...
+
+    @abstractmethod
+    async def close(self) -> bool:
+        ...
@@ -34,3 +34,36 @@ class QuerySimilarProductDetailsUseCase(ABC):
     @abstractmethod
     def close(self) -> bool:
         ...
+
+
+class AsyncQuerySimilarProductDetailsUseCase(ABC):
+    @overload
+    async def query(
+        self,
+        embedded_query_details: EmbeddedQueryDetails,
+        threshold: Optional[float],
+        top_k: Optional[int],
+    ) -> Optional[list[tuple[str, float]]]:
+        ...
+
+    @overload
+    async def query(
+        self,
+        embedded_query_details: Sequence[EmbeddedQueryDetails],
+        threshold: Optional[float],
+        top_k: Optional[int],
+    ) -> list[Optional[list[tuple[str, float]]]]:
+        ...
+
+    @abstractmethod
+    async def query(
+        self,
+        embedded_query_details: EmbeddedQueryDetails | Sequence[EmbeddedQueryDetails],
+        threshold: Optional[float],
+        top_k: Optional[int],
+    ) -> Optional[list[tuple[str, float]]] | list[Optional[list[tuple[str, float]]]]:
+        ...
+
+    @abstractmethod
+    async def close(self) -> bool:
+        ...
@@ -4,3 +4,16 @@ import os
 class LogConfig:
     LOG_LEVEL: bool = str(os.environ.get("LOG_LEVEL"))
     FORMAT: str = str(os.environ.get("LOG_FORMAT"))
+
+
+class InferenceConfig:
+    INTRA_OP_NUM_THREADS = int(os.environ.get("INFERENCE_INTRA_OP_NUM_THREADS", 1))
+    #! Size the executor so that the executor threads times the intra-op threads
+    #! of each inference run do not oversubscribe the available cores
+    EXECUTOR_MAX_WORKERS = int(
+        os.environ.get(
+            "INFERENCE_EXECUTOR_MAX_WORKERS",
+            max(1, (os.cpu_count() or 1) // INTRA_OP_NUM_THREADS),
+        )
+    )
+    MAX_PENDING_REQUESTS = int(os.environ.get("INFERENCE_MAX_PENDING_REQUESTS", 64))
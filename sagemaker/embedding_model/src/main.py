@@ -1,16 +1,17 @@
 from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from typing import AsyncIterator
 from contextlib import asynccontextmanager
-from onnxruntime import InferenceSession
+from concurrent.futures import ThreadPoolExecutor
+from onnxruntime import InferenceSession, SessionOptions
 from transformers import AutoTokenizer
 import uvloop
 import logging
 import asyncio
 import numpy.typing as npt
 import numpy as np
-from config import LogConfig
+from config import LogConfig, InferenceConfig
 
 uvloop.install()
 
@@ -22,17 +23,27 @@ logging.basicConfig(
 
 logging.getLogger("uvicorn.access").handlers = logging.root.handlers
 
+#! Embeddings are returned as raw little-endian float32 rows when the client
+#! sends this content type in the Accept header, otherwise as JSON
+BINARY_CONTENT_TYPE = "application/octet-stream"
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    session_options = SessionOptions()
+    session_options.intra_op_num_threads = InferenceConfig.INTRA_OP_NUM_THREADS
+    app.state.inference_executor = ThreadPoolExecutor(
+        max_workers=InferenceConfig.EXECUTOR_MAX_WORKERS
+    )
+    app.state.pending_requests = 0
     try:
         app.state.inference_session = InferenceSession(
-            "./model", providers=["CPUExecutionProvider"]
+            "./model", sess_options=session_options, providers=["CPUExecutionProvider"]
         )
         app.state.tokenizer = AutoTokenizer.from_pretrained("./tokenizer")
         yield
     finally:
-        pass
+        app.state.inference_executor.shutdown(wait=True)
 
 
 app = FastAPI(lifespan=lifespan)
@@ -54,21 +65,64 @@ async def ping(request: Request) -> JSONResponse:
     )
 
 
+def embed_texts(texts: list[str]) -> npt.NDArray[np.float_]:
+    """Tokenize and embed a batch of texts, run inside the inference executor"""
+
+    tokenized_texts = app.state.tokenizer(
+        texts, return_tensors="np", padding=True, truncation=True
+    )
+    text_embeddings: npt.NDArray[np.float_] = app.state.inference_session.run(
+        ["output"], dict(tokenized_texts)
+    )[0]
+    return text_embeddings
+
+
 @app.post("/invocations")
-def invocations(request: Request) -> JSONResponse:
-    request_body: dict = asyncio.run(request.json())
-    logging.info(request_body)
+async def invocations(request: Request) -> Response:
+    if app.state.pending_requests >= InferenceConfig.MAX_PENDING_REQUESTS:
+        return JSONResponse(
+            status_code=429,
+            content={"message": "Too many pending requests, please retry later"},
+        )
 
-    text = request_body["text"]
+    app.state.pending_requests += 1
+    try:
+        request_body: dict = await request.json()
+        logging.info(request_body)
 
-    tokenized_text = app.state.tokenizer(
-        [text], return_tensors="np", padding=True, truncation=True
-    )
-    text_embedding: npt.NDArray[np.float_] = app.state.inference_session.run(
-        ["output"], dict(tokenized_text)
-    )[0][0]
+        #! Accept either a single text {"text": str} which returns a single vector,
+        #! or a batch of texts {"texts": list[str]} which returns a matrix
+        texts: list[str] = (
+            request_body["texts"] if "texts" in request_body else [request_body["text"]]
+        )
+
+        binary_response = BINARY_CONTENT_TYPE in request.headers.get("accept", "")
+
+        if len(texts) == 0:
+            if binary_response:
+                return Response(content=b"", media_type=BINARY_CONTENT_TYPE)
+            return JSONResponse(
+                status_code=200,
+                content={"result": []},
+            )
+
+        text_embeddings = await asyncio.get_running_loop().run_in_executor(
+            app.state.inference_executor, embed_texts, texts
+        )
+    finally:
+        app.state.pending_requests -= 1
+
+    if binary_response:
+        return Response(
+            content=text_embeddings.astype("<f4").tobytes(),
+            media_type=BINARY_CONTENT_TYPE,
+        )
 
     return JSONResponse(
         status_code=200,
-        content={"result": text_embedding.tolist()},
+        content={
+            "result": text_embeddings.tolist()
+            if "texts" in request_body
+            else text_embeddings[0].tolist()
+        },
     )
@@ -6,4 +6,15 @@ CREATE TABLE IF NOT EXISTS EMBEDDED_PRODUCTS (
     modified_date TIMESTAMP NOT NULL,
     created_date TIMESTAMP NOT NULL,
     PRIMARY KEY (product_id)
-);
\ No newline at end of file
+);
+
+-- vector_ip_ops serves the `<#>` inner product ordering of the similar products query.
+-- Rebuild or switch to IVFFlat with `python -m deployments.vector_index.migrate` in the query handler.
+CREATE INDEX IF NOT EXISTS embedded_products_embedding_idx
+    ON EMBEDDED_PRODUCTS
+    USING hnsw (embedding vector_ip_ops)
+    WITH (m = 16, ef_construction = 64);
+
+-- Serves the query handler's (created_date, product_id) keyset pages of newly embedded products.
+CREATE INDEX IF NOT EXISTS embedded_products_created_date_idx
+    ON EMBEDDED_PRODUCTS (created_date, product_id);
@@ -10,4 +10,7 @@ CREATE TABLE IF NOT EXISTS RAW_PRODUCTS (
     modified_date TIMESTAMP NOT NULL,
     created_date TIMESTAMP NOT NULL,
     PRIMARY KEY (product_id)
-);
\ No newline at end of file
+);
+-- Serves the query handler's `modified_date >=` scans for stale cached product details.
+CREATE INDEX IF NOT EXISTS raw_products_modified_date_idx
+    ON RAW_PRODUCTS (modified_date);
@@ -178,7 +178,8 @@ module "data_embedding_handler_lambda" {
 
   event_source_mapping = {
     sqs = {
-      event_source_arn = module.embedding_handler_queue.queue_arn
+      event_source_arn        = module.embedding_handler_queue.queue_arn
+      function_response_types = ["ReportBatchItemFailures"]
     }
   }
 